@@ -77,6 +77,14 @@ class UserAdmin(BaseUserAdmin):
     
     def reset_honor_points(self, request, queryset):
         """Bulk action to reset honor points to default (100)"""
+        from core.notifications import send_player_updates, HONOR_STAT_FIELDS
+        from core.ranking import schedule_rankings_refresh
+        
+        players = list(queryset.filter(role='player'))
         count = queryset.filter(role='player').update(honor_points=100)
+        schedule_rankings_refresh()
+        for player in players:
+            player.honor_points = 100
+        send_player_updates(players, fields=HONOR_STAT_FIELDS)
         self.message_user(request, f'{count} player(s) honor points reset to 100.')
     reset_honor_points.short_description = 'Reset honor points to 100 (players only)'
@@ -24,8 +24,12 @@ class RoleBasedRedirectMiddleware:
             response = self.get_response(request)
             return response
 
+        # User hanya di-load untuk path yang mungkin di-redirect, request lain
+        # (mis. AJAX yang dijawab 304) tidak perlu query user
+        redirect_path = request.path == '/' or request.path.startswith(('/admin-dashboard/', '/player-dashboard/'))
+
         # Jika user sudah login dan mengakses root atau path tertentu
-        if request.user.is_authenticated:
+        if redirect_path and request.user.is_authenticated:
             # Jika user mengakses root, redirect berdasarkan role
             if request.path == '/':
                 if request.user.is_admin():
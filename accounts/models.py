@@ -45,3 +45,10 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Urutan ranking leaderboard (lihat core/ranking.py): keyset pagination + window function
+            models.Index(
+                fields=['role', '-current_level', '-total_exp', '-honor_points', 'id'],
+                name='accounts_user_ranking_idx'
+            ),
+        ]
@@ -2,6 +2,8 @@
 ASGI config for classcraft project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP request ditangani Django, WebSocket diteruskan ke consumers di core/routing.py
+(session auth lewat AuthMiddlewareStack, Origin dicek terhadap ALLOWED_HOSTS).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,4 +14,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'classcraft.settings')
 
-application = get_asgi_application()
+# Inisialisasi Django (apps registry) sebelum import consumers/models
+django_asgi_app = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from core.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+    ),
+})
@@ -32,12 +32,15 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    # daphne harus paling atas: runserver melayani ASGI (HTTP + WebSocket)
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'channels',
     # Local apps
     'accounts',
     'core',
@@ -79,14 +82,83 @@ WSGI_APPLICATION = 'classcraft.wsgi.application'
 ASGI_APPLICATION = 'classcraft.asgi.application'
 
 # Caching configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'KEY_PREFIX': 'classcraft',
-        'TIMEOUT': 300,  # 5 minutes default timeout
+# Cache menyimpan state yang harus sama di semua process (web workers, ASGI, worker
+# deliver_outbox, cron): generation multiplier, ranking version, snapshot leaderboard
+# dan presence. Production: set CACHE_REDIS_URL (mis. redis://localhost:6379/1).
+# LocMemCache hanya berlaku di satu process, jadi cukup untuk development/test saja
+# (lihat check core.W001 di `manage.py check --deploy`).
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'classcraft',
+            'TIMEOUT': 300,  # 5 minutes default timeout
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'KEY_PREFIX': 'classcraft',
+            'TIMEOUT': 300,  # 5 minutes default timeout
+        }
     }
-}
+
+# Channel layer untuk WebSocket (core/consumers.py)
+# Production: set CHANNEL_REDIS_URL (mis. redis://localhost:6379/0). Worker deliver_outbox
+# berjalan di process terpisah, jadi InMemoryChannelLayer hanya cukup untuk development/test.
+# CHANNEL_LAYER_BACKEND bisa diganti dengan backend Redis-compatible lain
+# (mis. channels_redis.pubsub.RedisPubSubChannelLayer).
+CHANNEL_REDIS_URL = os.environ.get('CHANNEL_REDIS_URL', '')
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': os.environ.get('CHANNEL_LAYER_BACKEND', 'channels_redis.core.RedisChannelLayer'),
+            'CONFIG': {
+                'hosts': [CHANNEL_REDIS_URL],
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+# Leaderboard WebSocket broadcast
+# Maksimal satu broadcast per window (detik); level-up di dalam window digabung
+LEADERBOARD_BROADCAST_INTERVAL = 1
+
+# TTL snapshot top players (core/leaderboard.py). Dengan cache shared, ranking version
+# sudah menandai snapshot stale dan TTL hanya membersihkan version lama; dengan
+# LocMemCache version bump dari process lain tidak terlihat, jadi TTL pendek membatasi
+# berapa lama snapshot stale dipakai.
+LEADERBOARD_SNAPSHOT_TIMEOUT = 60 * 60 if CACHE_REDIS_URL else 5
+
+# Ranking (core/ranking.py) dihitung ulang paling banyak sekali per window (detik)
+LEADERBOARD_RANK_REFRESH_INTERVAL = 1
+
+# Presence (core/presence.py): player dianggap offline setelah PRESENCE_TIMEOUT detik
+# tanpa heartbeat (client mengirim heartbeat tiap 30 detik)
+PRESENCE_TIMEOUT = 90
+# Perubahan presence dikumpulkan dan di-broadcast sebagai satu diff per window (detik)
+PRESENCE_BROADCAST_INTERVAL = 2
+# Process ASGI dengan client online status men-sweep presence (player yang expire
+# tanpa disconnect) tiap PRESENCE_SWEEP_INTERVAL detik
+PRESENCE_SWEEP_INTERVAL = 15
+
+# Notification inbox (core/inbox.py) dihapus setelah NOTIFICATION_TTL_DAYS hari
+# (command prune_notifications)
+NOTIFICATION_TTL_DAYS = 30
+
+# ExpLog archive (command archive_exp_logs)
+# Log yang lebih lama dari EXP_ARCHIVE_DAYS hari dipindah ke gzip JSONL segments
+EXP_ARCHIVE_ROOT = BASE_DIR / 'archive' / 'exp_logs'
+EXP_ARCHIVE_DAYS = 180
 
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
@@ -104,6 +176,9 @@ SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_AGE = 86400  # 24 hours
+# Session dibaca dari cache (fallback database), jadi endpoint AJAX player bisa
+# menjawab 304 tanpa query (lihat core/player_state.py)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
@@ -134,6 +209,15 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Tunggu write lock (lock_users) selama N detik sebelum "database is locked"
+                'timeout': 20,
+            },
+            # Test database berbasis file (bukan shared in-memory) supaya test concurrency
+            # bisa memakai beberapa koneksi yang saling menunggu write lock
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 
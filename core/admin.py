@@ -4,7 +4,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import Level, ExpLog, Dungeon, Attendance, Sidequest, SidequestSubmission, Boss, Punishment, StatusEffect
+from .models import Level, ExpLog, ExpDailyRollup, ExpLogArchive, LeaderboardScore, LevelUpEvent, PlayerStats, Dungeon, Attendance, Sidequest, SidequestSubmission, Boss, Punishment, StatusEffect, OutboxMessage, Notification
 from accounts.models import User
 
 
@@ -122,6 +122,95 @@ class ExpLogAdmin(admin.ModelAdmin):
     export_selected_to_csv.short_description = 'Export selected EXP logs to CSV'
 
 
+@admin.register(ExpDailyRollup)
+class ExpDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'day', 'activity_type', 'exp_earned', 'exp_lost', 'log_count')
+    list_filter = ('activity_type', 'day')
+    search_fields = ('user__username',)
+    date_hierarchy = 'day'
+    ordering = ('-day',)
+    
+    # Rollup di-maintain otomatis, jangan diedit manual
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LevelUpEvent)
+class LevelUpEventAdmin(admin.ModelAdmin):
+    list_display = ('user', 'old_level', 'new_level', 'honor_points_bonus', 'created_at')
+    list_filter = ('new_level',)
+    search_fields = ('user__username',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    
+    # Event ditulis oleh add_exp, jangan diedit manual
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LeaderboardScore)
+class LeaderboardScoreAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period', 'period_start', 'activity_type', 'score', 'expires_at')
+    list_filter = ('period', 'activity_type', 'period_start')
+    search_fields = ('user__username',)
+    ordering = ('period', '-period_start', 'activity_type', '-score')
+    
+    # Skor di-maintain oleh add_exp (lihat core/boards.py), jangan diedit manual
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExpLogArchive)
+class ExpLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('user', 'row_count', 'first_log_at', 'last_log_at', 'path', 'created_at')
+    search_fields = ('user__username', 'path')
+    date_hierarchy = 'last_log_at'
+    ordering = ('-last_log_at',)
+    
+    # Index di-maintain oleh archive_exp_logs, jangan diedit manual
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PlayerStats)
+class PlayerStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'dungeons_attended', 'sidequests_submitted', 'boss_battles', 'punishments', 'exp_earned', 'exp_lost')
+    search_fields = ('user__username',)
+    ordering = ('user__username',)
+    actions = ['recount_selected']
+    
+    # Counter di-maintain otomatis, jangan diedit manual
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def recount_selected(self, request, queryset):
+        """Hitung ulang counter dari data asli"""
+        from core.stats import refresh_player_stats
+        
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        refresh_player_stats(user_ids)
+        self.message_user(request, f'{len(user_ids)} player stats dihitung ulang.')
+    recount_selected.short_description = 'Recount selected player stats'
+
+
 @admin.register(Dungeon)
 class DungeonAdmin(admin.ModelAdmin):
     list_display = ('name', 'scheduled_date', 'status', 'exp_reward', 'created_at')
@@ -235,6 +324,7 @@ class PunishmentAdmin(admin.ModelAdmin):
         """Bulk action to resolve selected punishments"""
         from django.utils import timezone
         from core.models import StatusEffect
+        from core.multipliers import invalidate_exp_multipliers
         
         count = 0
         for punishment in queryset.filter(resolved=False):
@@ -248,6 +338,7 @@ class PunishmentAdmin(admin.ModelAdmin):
                 is_active=True,
                 description__startswith=f"Punishment effect: {punishment.description}"
             ).update(is_active=False)
+            invalidate_exp_multipliers([punishment.user_id])
             
             count += 1
         
@@ -293,10 +384,44 @@ class StatusEffectAdmin(admin.ModelAdmin):
     
     def deactivate_selected(self, request, queryset):
         """Bulk action to deactivate selected status effects"""
-        count = queryset.filter(is_active=True).update(is_active=False)
+        from core.multipliers import invalidate_exp_multipliers
+        
+        active = queryset.filter(is_active=True)
+        user_ids = set(active.values_list('user_id', flat=True))
+        count = active.update(is_active=False)
+        invalidate_exp_multipliers(user_ids)
         self.message_user(request, f'{count} status effect(s) deactivated successfully.')
     deactivate_selected.short_description = 'Deactivate selected status effects'
 
 
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'role', 'notification_type', 'message', 'is_read', 'created_at')
+    list_filter = ('notification_type', 'role', 'is_read')
+    search_fields = ('user__username', 'message')
+    ordering = ('-id',)
+    
+    # Ditulis oleh send_notification (lihat core/inbox.py)
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'created_at', 'delivered_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'delivered_at', 'last_error')
+    ordering = ('-id',)
+    
+    # Bulk actions
+    actions = ['retry_selected']
+    
+    def retry_selected(self, request, queryset):
+        """Bulk action to re-queue failed messages"""
+        count = queryset.filter(status='failed').update(status='pending', attempts=0, available_at=timezone.now())
+        self.message_user(request, f'{count} message(s) re-queued.')
+    retry_selected.short_description = 'Retry selected failed messages'
+
+
 # Note: User model is registered in accounts/admin.py
 # To add bulk actions to User admin, modify accounts/admin.py instead
@@ -6,4 +6,5 @@ class CoreConfig(AppConfig):
     name = 'core'
     
     def ready(self):
+        import core.checks  # noqa
         import core.signals.handlers  # noqa
\ No newline at end of file
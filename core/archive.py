@@ -0,0 +1,242 @@
+"""
+Cold storage untuk ExpLog lama
+
+Command archive_exp_logs memindahkan ExpLog yang lebih lama dari EXP_ARCHIVE_DAYS ke
+segment gzip JSONL di EXP_ARCHIVE_ROOT. Satu segment berisi log beberapa user; log
+setiap user ditulis sebagai gzip member terpisah dan dicatat di ExpLogArchive
+(offset + length), jadi history satu user bisa dibaca tanpa decompress seluruh file.
+
+ExpDailyRollup untuk hari yang diarsip tetap di database, jadi total, chart dan
+PlayerStats tidak berubah. ExpLogHistory menggabungkan hot table dan archive untuk
+halaman exp_history.
+"""
+import gzip
+import json
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, time, timedelta
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .models import ExpDailyRollup, ExpLog, ExpLogArchive
+from .rollups import ROLLUP_FIELDS, build_rollups
+from .stats import schedule_player_stats_refresh
+
+ARCHIVE_FIELDS = ['id', 'activity_type', 'exp_earned', 'description', 'created_at']
+
+
+def get_archive_root():
+    return Path(settings.EXP_ARCHIVE_ROOT)
+
+
+def get_archive_cutoff(days=None):
+    """
+    Batas waktu archive: awal hari lokal `days` hari yang lalu
+    Cutoff selalu di batas hari, jadi setiap hari yang diarsip diarsip lengkap
+    (rollup hari tersebut tidak lagi butuh ExpLog)
+
+    Args:
+        days: Umur minimal log (default: settings.EXP_ARCHIVE_DAYS)
+
+    Returns:
+        datetime: Log dengan created_at < cutoff diarsip
+    """
+    if days is None:
+        days = settings.EXP_ARCHIVE_DAYS
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_archived_until(user_ids):
+    """
+    Hari terakhir yang sudah diarsip per user
+
+    Returns:
+        dict: {user_id: date}; rollup sampai hari ini tidak bisa dibangun ulang dari ExpLog
+    """
+    rows = ExpLogArchive.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        last=Max('last_log_at')
+    ).order_by()
+    return {row['user_id']: timezone.localdate(row['last']) for row in rows}
+
+
+def _serialize(row):
+    return json.dumps({
+        'id': row['id'],
+        'activity_type': row['activity_type'],
+        'exp_earned': row['exp_earned'],
+        'description': row['description'],
+        'created_at': row['created_at'].isoformat(),
+    })
+
+
+def archive_exp_logs(user_ids, cutoff):
+    """
+    Pindahkan ExpLog milik user_ids dengan created_at < cutoff ke satu segment baru
+
+    Rollup hari yang diarsip dihitung ulang dari log yang dipindah sebelum log dihapus,
+    jadi rollup lama yang belum lengkap (sebelum backfill) ikut diperbaiki.
+
+    Args:
+        user_ids: List of user IDs (satu segment)
+        cutoff: datetime dari get_archive_cutoff()
+
+    Returns:
+        int: Jumlah ExpLog yang diarsip
+    """
+    from .services import lock_users
+
+    relative = Path(f'{cutoff:%Y%m%d}') / f'{uuid.uuid4().hex}.jsonl.gz'
+    path = get_archive_root() / relative
+
+    try:
+        with transaction.atomic():
+            # Lock user supaya tidak bersamaan dengan add_exp / backfill_exp_rollups
+            lock_users(user_ids)
+            logs = ExpLog.objects.filter(user_id__in=user_ids, created_at__lt=cutoff)
+            rows = list(logs.order_by('user_id', '-created_at', '-id').values('user_id', *ARCHIVE_FIELDS))
+            if not rows:
+                return 0
+
+            ExpDailyRollup.objects.bulk_create(
+                build_rollups(user_ids, before=cutoff),
+                update_conflicts=True,
+                unique_fields=['user', 'day', 'activity_type'],
+                update_fields=ROLLUP_FIELDS
+            )
+            schedule_player_stats_refresh(user_ids, ['exp_earned', 'exp_lost'])
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            entries = []
+            with open(path, 'wb') as segment:
+                for user_id, user_rows in groupby(rows, key=itemgetter('user_id')):
+                    user_rows = list(user_rows)
+                    data = gzip.compress(''.join(_serialize(row) + '\n' for row in user_rows).encode())
+                    entries.append(ExpLogArchive(
+                        user_id=user_id,
+                        path=relative.as_posix(),
+                        offset=segment.tell(),
+                        length=len(data),
+                        row_count=len(user_rows),
+                        activity_counts=dict(Counter(row['activity_type'] for row in user_rows)),
+                        first_log_at=user_rows[-1]['created_at'],
+                        last_log_at=user_rows[0]['created_at']
+                    ))
+                    segment.write(data)
+                # Segment harus sudah di disk sebelum log dihapus
+                segment.flush()
+                os.fsync(segment.fileno())
+
+            ExpLogArchive.objects.bulk_create(entries)
+            logs.delete()
+    except BaseException:
+        # Transaction di-rollback: segment yang sudah ditulis tidak dipakai
+        path.unlink(missing_ok=True)
+        raise
+
+    return len(rows)
+
+
+def read_archive(entry, activity_type=None, user=None):
+    """
+    Baca ExpLog dari satu index entry (terbaru dulu)
+
+    Args:
+        entry: ExpLogArchive instance
+        activity_type: Filter activity type (optional)
+        user: User instance untuk di-set ke log (menghindari query per log)
+
+    Returns:
+        list: Unsaved ExpLog instances
+    """
+    with open(get_archive_root() / entry.path, 'rb') as segment:
+        segment.seek(entry.offset)
+        data = gzip.decompress(segment.read(entry.length))
+
+    logs = []
+    for line in data.decode().splitlines():
+        row = json.loads(line)
+        if activity_type and row['activity_type'] != activity_type:
+            continue
+        log = ExpLog(
+            id=row['id'],
+            user_id=entry.user_id,
+            activity_type=row['activity_type'],
+            exp_earned=row['exp_earned'],
+            description=row['description'],
+            created_at=parse_datetime(row['created_at'])
+        )
+        if user is not None:
+            log.user = user
+        logs.append(log)
+    return logs
+
+
+class ExpLogHistory:
+    """
+    History ExpLog satu user (terbaru dulu): hot table, lalu archive
+
+    Mendukung count() dan slicing, jadi bisa langsung dipakai oleh Paginator.
+    Segment archive hanya dibaca ketika halaman melewati hot table.
+    """
+
+    def __init__(self, user, activity_type=''):
+        self.user = user
+        self.activity_type = activity_type
+        self.queryset = ExpLog.objects.filter(user=user).order_by('-created_at', '-id')
+        if activity_type:
+            self.queryset = self.queryset.filter(activity_type=activity_type)
+
+    @cached_property
+    def hot_count(self):
+        return self.queryset.count()
+
+    @cached_property
+    def archive_entries(self):
+        """[(entry, jumlah log yang cocok dengan filter)] dari index, terbaru dulu"""
+        entries = ExpLogArchive.objects.filter(user=self.user).order_by('-last_log_at')
+        result = []
+        for entry in entries:
+            count = entry.activity_counts.get(self.activity_type, 0) if self.activity_type else entry.row_count
+            if count:
+                result.append((entry, count))
+        return result
+
+    def count(self):
+        return self.hot_count + sum(count for _, count in self.archive_entries)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('ExpLogHistory hanya mendukung slicing')
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+
+        result = []
+        if start < self.hot_count:
+            result.extend(self.queryset[start:min(stop, self.hot_count)])
+
+        skip = max(start - self.hot_count, 0)
+        remaining = stop - max(start, self.hot_count)
+        for entry, count in self.archive_entries:
+            if remaining <= 0:
+                break
+            if skip >= count:
+                skip -= count
+                continue
+            logs = read_archive(entry, self.activity_type, user=self.user)[skip:skip + remaining]
+            result.extend(logs)
+            remaining -= len(logs)
+            skip = 0
+        return result
@@ -0,0 +1,312 @@
+"""
+Leaderboard per periode (minggu/bulan ini) dan per activity_type
+
+Setiap board adalah (period, activity_type); activity_type '' = semua activity.
+Skor disimpan di LeaderboardScore, satu row per (user, period, period_start,
+activity_type), dan di-increment oleh record_exp_logs() di transaction yang sama
+dengan insert ExpLog. Top N dibaca lewat index core_leaderboard_board_idx tanpa
+GROUP BY atas ExpLog.
+
+Seperti PlayerRank untuk leaderboard utama, posisi setiap row disimpan di
+LeaderboardScore.rank dan dihitung ulang dengan satu query window function
+(refresh_board_ranks, dipanggil oleh refresh_rankings). Halaman leaderboard membaca
+top N, rank user dan baris di sekitarnya dari rank yang sama lewat index
+core_leaderboard_rank_idx, tanpa COUNT atau OFFSET. Snapshot WebSocket membaca top N
+terbaru langsung dalam urutan index core_leaderboard_board_idx (get_board_top).
+
+Bucket minggu/bulan punya expires_at (akhir periode); bucket lama tidak pernah
+dibaca lagi dan dihapus oleh command prune_leaderboard_scores. Command
+rebuild_leaderboard_scores menghitung ulang bucket dari ExpDailyRollup.
+
+Board (all, '') adalah leaderboard utama dan tidak disimpan di sini: urutannya
+(level, EXP, honor) dibaca dari User / PlayerRank (lihat core/ranking.py).
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import ExpDailyRollup, ExpLog, LeaderboardScore
+
+PERIODS = [period for period, _ in LeaderboardScore.PERIODS]
+ACTIVITY_TYPES = [activity_type for activity_type, _ in ExpLog.ACTIVITY_TYPES]
+
+MAIN_BOARD = ('all', '')
+
+# period_start untuk bucket all-time
+ALL_TIME_START = date(1970, 1, 1)
+
+
+def parse_board(period=None, activity_type=None):
+    """
+    Board dari query params; nilai yang tidak dikenal diganti default
+
+    Returns:
+        tuple: (period, activity_type)
+    """
+    period = period if period in PERIODS else 'all'
+    activity_type = activity_type if activity_type in ACTIVITY_TYPES else ''
+    return period, activity_type
+
+
+def get_period_start(period, day=None):
+    """Hari pertama periode yang memuat `day` (default: hari ini, timezone lokal)"""
+    if period == 'all':
+        return ALL_TIME_START
+    day = day or timezone.localdate()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def get_period_expiry(period, start):
+    """Akhir periode (awal periode berikutnya) sebagai aware datetime, None untuk all-time"""
+    if period == 'all':
+        return None
+    if period == 'week':
+        end = start + timedelta(days=7)
+    else:
+        end = (start + timedelta(days=32)).replace(day=1)
+    return timezone.make_aware(datetime.combine(end, time.min))
+
+
+def _board_keys(day, activity_type):
+    """Semua bucket (kecuali leaderboard utama) yang memuat log di hari `day`"""
+    for period in PERIODS:
+        start = get_period_start(period, day)
+        for board_activity in ('', activity_type):
+            if (period, board_activity) != MAIN_BOARD:
+                yield period, start, board_activity
+
+
+def add_leaderboard_scores(deltas):
+    """
+    Increment LeaderboardScore untuk EXP baru (2 query: select + upsert)
+
+    Harus dipanggil di dalam transaction yang sama dengan insert ExpLog,
+    dengan row user sudah di-lock.
+
+    Args:
+        deltas: {(user_id, day, activity_type): net EXP}
+    """
+    scores = {}
+    for (user_id, day, activity_type), exp in deltas.items():
+        if not exp:
+            continue
+        for period, start, board_activity in _board_keys(day, activity_type):
+            key = (user_id, period, start, board_activity)
+            scores[key] = scores.get(key, 0) + exp
+
+    if not scores:
+        return
+
+    existing = {
+        row[:4]: row[4]
+        for row in LeaderboardScore.objects.filter(
+            user_id__in={user_id for user_id, _, _, _ in scores},
+            period_start__in={start for _, _, start, _ in scores},
+            activity_type__in={activity_type for _, _, _, activity_type in scores}
+        ).values_list('user_id', 'period', 'period_start', 'activity_type', 'score')
+    }
+
+    # Nilai akhir dihitung di Python (row user di-lock), lalu satu upsert
+    LeaderboardScore.objects.bulk_create(
+        [
+            LeaderboardScore(
+                user_id=user_id,
+                period=period,
+                period_start=start,
+                activity_type=activity_type,
+                score=existing.get((user_id, period, start, activity_type), 0) + exp,
+                expires_at=get_period_expiry(period, start)
+            )
+            for (user_id, period, start, activity_type), exp in scores.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'period', 'period_start', 'activity_type'],
+        update_fields=['score']
+    )
+
+
+# Urutan ranking board: score desc, lalu user id sebagai tie-break
+BOARD_ORDER = [F('score').desc(), F('user_id').asc()]
+
+
+def get_current_scores(day=None):
+    """LeaderboardScore semua bucket periode berjalan (all-time, minggu dan bulan ini)"""
+    return LeaderboardScore.objects.filter(
+        Q(period='all')
+        | Q(period='week', period_start=get_period_start('week', day))
+        | Q(period='month', period_start=get_period_start('month', day))
+    )
+
+
+def get_board_scores(board, day=None):
+    """
+    LeaderboardScore untuk periode berjalan di board, dalam urutan ranking
+    (score desc, lalu user id sebagai tie-break)
+    """
+    period, activity_type = board
+    return LeaderboardScore.objects.filter(
+        period=period,
+        period_start=get_period_start(period, day),
+        activity_type=activity_type,
+        user__role='player'
+    ).order_by(*BOARD_ORDER)
+
+
+def refresh_board_ranks():
+    """
+    Hitung ulang LeaderboardScore.rank untuk bucket periode berjalan
+    (satu query window function, partisi per board). Hanya rank yang berubah yang ditulis
+
+    Returns:
+        int: Jumlah rank yang berubah
+    """
+    positions = get_current_scores().filter(user__role='player').annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('period'), F('period_start'), F('activity_type')],
+            order_by=BOARD_ORDER
+        )
+    ).values_list('pk', 'rank', 'position')
+
+    # Hanya kolom rank yang ditulis: score bisa di-increment add_exp bersamaan
+    changed = [
+        LeaderboardScore(pk=pk, rank=position)
+        for pk, rank, position in positions
+        if rank != position
+    ]
+    LeaderboardScore.objects.bulk_update(changed, ['rank'], batch_size=500)
+    return len(changed)
+
+
+def get_board_rank(user, board):
+    """
+    Rank user di board (1 = teratas) dari refresh_board_ranks terakhir,
+    None jika user belum punya skor (atau belum di-rank) di periode ini
+
+    Returns:
+        int or None
+    """
+    return get_board_scores(board).filter(user_id=user.pk).values_list('rank', flat=True).first()
+
+
+def _board_columns(fields):
+    return ('user_id', *(f'user__{field}' for field in fields), 'score')
+
+
+def get_board_top(board, limit, fields=()):
+    """
+    Top `limit` baris board terbaru, dibaca dalam urutan index core_leaderboard_board_idx
+
+    Returns:
+        list: [(rank, user_id, *fields, score), ...]
+    """
+    rows = get_board_scores(board).values_list(*_board_columns(fields))[:limit]
+    return [(rank, *row) for rank, row in enumerate(rows, start=1)]
+
+
+def get_board_rows(board, first_rank=1, last_rank=None, fields=()):
+    """
+    Baris board untuk rank first_rank..last_rank (inklusif) dari rank yang tersimpan
+    (core_leaderboard_rank_idx) tanpa OFFSET, sama dengan get_ranked_players
+
+    Args:
+        board: (period, activity_type)
+        fields: Field User yang ikut dibaca (lewat join)
+
+    Returns:
+        list: [(rank, user_id, *fields, score), ...]
+    """
+    scores = get_board_scores(board).filter(rank__gte=first_rank)
+    if last_rank is not None:
+        scores = scores.filter(rank__lte=last_rank)
+    return list(scores.order_by('rank').values_list('rank', *_board_columns(fields)))
+
+
+def build_leaderboard_scores(user_ids=None, day=None):
+    """
+    Hitung LeaderboardScore periode berjalan dari ExpDailyRollup
+
+    Args:
+        user_ids: Iterable of user IDs (default: semua user)
+        day: Hari acuan periode (default: hari ini)
+
+    Returns:
+        list: Unsaved LeaderboardScore instances
+    """
+    rollups = ExpDailyRollup.objects.all()
+    if user_ids is not None:
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    # Satu query agregat per (user, hari pertama bucket, activity)
+    deltas = {}
+    for period in PERIODS:
+        start = get_period_start(period, day)
+        rows = rollups.filter(day__gte=start).values('user_id', 'activity_type').annotate(
+            earned=Sum('exp_earned'),
+            lost=Sum('exp_lost')
+        ).order_by()
+        for row in rows:
+            exp = (row['earned'] or 0) - (row['lost'] or 0)
+            for board_activity in ('', row['activity_type']):
+                if (period, board_activity) == MAIN_BOARD:
+                    continue
+                key = (row['user_id'], period, start, board_activity)
+                deltas[key] = deltas.get(key, 0) + exp
+
+    return [
+        LeaderboardScore(
+            user_id=user_id,
+            period=period,
+            period_start=start,
+            activity_type=activity_type,
+            score=score,
+            expires_at=get_period_expiry(period, start)
+        )
+        for (user_id, period, start, activity_type), score in deltas.items()
+    ]
+
+
+def rebuild_leaderboard_scores(user_ids=None):
+    """
+    Tulis ulang LeaderboardScore periode berjalan dari ExpDailyRollup
+
+    Args:
+        user_ids: Iterable of user IDs (default: semua user)
+
+    Returns:
+        int: Jumlah bucket yang ditulis
+    """
+    from accounts.models import User
+    from .services import lock_users
+
+    day = timezone.localdate()
+    with transaction.atomic():
+        current = get_current_scores(day)
+        # Lock user supaya tidak bersamaan dengan add_exp (tanpa user_ids: semua user,
+        # karena semua row periode berjalan dihapus dan ditulis ulang)
+        if user_ids is None:
+            lock_users(User.objects.values_list('pk', flat=True))
+        else:
+            user_ids = list(user_ids)
+            lock_users(user_ids)
+            current = current.filter(user_id__in=user_ids)
+        scores = build_leaderboard_scores(user_ids, day)
+        current.delete()
+        LeaderboardScore.objects.bulk_create(scores)
+    return len(scores)
+
+
+def prune_leaderboard_scores(now=None):
+    """
+    Hapus bucket periode yang sudah lewat
+
+    Returns:
+        int: Jumlah bucket yang dihapus
+    """
+    deleted, _ = LeaderboardScore.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,34 @@
+"""
+System checks untuk konfigurasi core
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backend cache yang tidak di-share antar process
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cache default harus di-share oleh semua process: invalidation multiplier dan level curve,
+    ranking version, snapshot leaderboard dan presence ditulis oleh satu process dan dibaca
+    process lain (web workers, deliver_outbox, cron)
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            f'Cache default memakai {backend}, yang tidak di-share antar process.',
+            hint=(
+                'Set CACHE_REDIS_URL (atau backend cache shared lain). Tanpa cache shared, '
+                'perubahan dari satu process (version bump, invalidation, presence) tidak '
+                'terlihat oleh web workers dan worker deliver_outbox lain.'
+            ),
+            id='core.W001',
+        )
+    ]
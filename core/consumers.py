@@ -1,248 +1,576 @@
 """
 WebSocket consumers untuk real-time features
+
+Setiap fitur real-time adalah satu Stream (notifications, stats, leaderboard,
+presence) yang bisa dijalankan di atas koneksi mana pun:
+
+- StreamMultiplexConsumer (ws/stream/): satu koneksi per client; client subscribe
+  ke stream yang dibutuhkan dan setiap pesan dibungkus {'stream': name, 'payload': {...}}
+- NotificationConsumer, LeaderboardConsumer, OnlineStatusConsumer: endpoint lama,
+  satu koneksi per fitur dengan format pesan tanpa pembungkus
 """
+import asyncio
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from datetime import timedelta
 
 User = get_user_model()
 
 
-class NotificationConsumer(AsyncWebsocketConsumer):
-    """Consumer untuk real-time notifications"""
-    
-    async def connect(self):
-        self.user_id = self.scope['url_route']['kwargs']['user_id']
-        self.room_group_name = f'notifications_{self.user_id}'
-        
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        
-        await self.accept()
-        
+class Stream:
+    """
+    Satu stream real-time di atas koneksi WebSocket
+
+    Subclass menentukan group channel layer yang di-join (groups), pesan awal
+    (start), action dari client (receive) dan handler group event: method dengan
+    nama event type yang terdaftar di `events`.
+    """
+    name = None
+    events = ()
+
+    def __init__(self, consumer, params):
+        self.consumer = consumer
+        self.user = consumer.scope['user']
+        self.params = params
+
+    def allowed(self):
+        """False jika user tidak boleh subscribe stream ini"""
+        return True
+
+    def groups(self):
+        return []
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def receive(self, content):
+        pass
+
+    async def send(self, payload):
+        await self.consumer.send_stream(self.name, payload)
+
+    async def send_text(self, text):
+        """Kirim payload yang sudah di-encode (sama untuk semua client)"""
+        await self.consumer.send_stream_text(self.name, text)
+
+
+class NotificationStream(Stream):
+    """
+    Notification per user (group notifications_{user_id}) dan broadcast per role
+    (group notifications_role_{role})
+
+    Notification per user dan broadcast membawa seq (core/inbox.py). Client yang
+    reconnect dengan after=<seq terakhir> menerima 'notifications_missed' berisi
+    notification dan broadcast role-nya yang terlewat. Action 'mark_read' ({'seqs': [...]} atau {'up_to': seq}) menandai
+    notification sudah dibaca dan dibalas dengan jumlah unread.
+    """
+    name = 'notifications'
+    events = ('notification_message', 'notification_broadcast')
+
+    def allowed(self):
+        # Hanya user itu sendiri yang boleh menerima notifikasinya
+        user_id = self.params.get('user_id')
+        return user_id is None or str(user_id) == str(self.user.pk)
+
+    def groups(self):
+        from core.notifications import role_group_name
+        return [f'notifications_{self.user.pk}', role_group_name(self.user.role)]
+
+    async def start(self):
         # Send welcome message
-        await self.send(text_data=json.dumps({
+        await self.send({
             'type': 'connection',
-            'message': 'Connected to notifications'
-        }))
-    
-    async def disconnect(self, close_code):
-        # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-    
-    # Receive message from WebSocket
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message = text_data_json.get('message', '')
-        
+            'message': 'Connected to notifications',
+            'unread': await self.get_unread_count()
+        })
+
+        # Catch-up notification yang terlewat selama socket terputus
+        after = str(self.params.get('after') or '')
+        if after.isdigit():
+            await self.send_missed(int(after))
+
+    async def receive(self, content):
+        action = content.get('action')
+
+        if action == 'catch_up':
+            try:
+                after = int(content.get('after') or 0)
+            except (TypeError, ValueError):
+                await self.consumer.send_error('Invalid after')
+                return
+            await self.send_missed(after)
+            return
+        if action == 'mark_read':
+            seqs, up_to = content.get('seqs'), content.get('up_to')
+            try:
+                seqs = None if seqs is None else [int(seq) for seq in seqs]
+                up_to = None if up_to is None else int(up_to)
+            except (TypeError, ValueError):
+                await self.consumer.send_error('Invalid seqs/up_to')
+                return
+            await self.mark_read(seqs, up_to)
+            await self.send({
+                'type': 'unread',
+                'count': await self.get_unread_count()
+            })
+            return
+
         # Echo message back (for testing)
-        await self.send(text_data=json.dumps({
+        await self.send({
             'type': 'echo',
-            'message': message
-        }))
-    
-    # Receive message from room group
+            'message': content.get('message', '')
+        })
+
+    async def send_missed(self, after):
+        await self.send({
+            'type': 'notifications_missed',
+            'notifications': await self.get_missed(after),
+            'unread': await self.get_unread_count()
+        })
+
     async def notification_message(self, event):
         """Handle notification message from group"""
-        message = event['message']
-        notification_type = event.get('notification_type', 'info')
-        data = event.get('data', {})
-        
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
+        await self.send({
             'type': 'notification',
-            'notification_type': notification_type,
-            'message': message,
-            'data': data,
+            'seq': event.get('seq'),
+            'notification_type': event.get('notification_type', 'info'),
+            'message': event['message'],
+            'data': event.get('data', {}),
             'timestamp': timezone.now().isoformat()
-        }))
+        })
 
+    async def notification_broadcast(self, event):
+        """
+        Handle broadcast notification dari group role
+        Dilewati jika user tidak termasuk user_ids; overlay user di-merge ke data
+        """
+        user_ids = event.get('user_ids')
+        if user_ids is not None and self.user.pk not in user_ids:
+            return
+        await self.notification_message({
+            'seq': event.get('seq'),
+            'message': event['message'],
+            'notification_type': event.get('notification_type', 'info'),
+            'data': {**event.get('data', {}), **event.get('overlays', {}).get(str(self.user.pk), {})}
+        })
 
-class LeaderboardConsumer(AsyncWebsocketConsumer):
-    """Consumer untuk live leaderboard updates"""
-    
-    async def connect(self):
-        self.room_group_name = 'leaderboard_updates'
-        
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        
-        await self.accept()
-        
+    @database_sync_to_async
+    def get_missed(self, after):
+        from core.inbox import get_missed_notifications
+        return get_missed_notifications(self.user.pk, after, self.user.role)
+
+    @database_sync_to_async
+    def get_unread_count(self):
+        from core.inbox import get_unread_count
+        return get_unread_count(self.user.pk)
+
+    @database_sync_to_async
+    def mark_read(self, seqs, up_to):
+        from core.inbox import mark_notifications_read
+        return mark_notifications_read(self.user.pk, seqs=seqs, up_to=up_to)
+
+
+class StatsStream(Stream):
+    """Stats/activity dashboard player (pengganti polling ajax_user_stats)"""
+    name = 'stats'
+    events = ('player_update',)
+
+    def allowed(self):
+        user_id = self.params.get('user_id')
+        return user_id is None or str(user_id) == str(self.user.pk)
+
+    def groups(self):
+        return [f'notifications_{self.user.pk}']
+
+    async def player_update(self, event):
+        await self.send({
+            'type': 'player_update',
+            'stats': event['stats'],
+            'activities': event['activities']
+        })
+
+
+class LeaderboardStream(Stream):
+    """
+    Live leaderboard updates
+
+    Board dipilih lewat params period/activity atau action 'subscribe' dengan field
+    period/activity; default leaderboard utama.
+
+    Client menerima 'leaderboard_snapshot' (seq + semua row) saat subscribe, lalu
+    'leaderboard_delta' (seq + row yang berubah + id yang keluar) dari group board
+    tersebut. Jika seq delta bukan seq terakhir + 1, client mengirim action 'resync'.
+    """
+    name = 'leaderboard'
+    events = ('leaderboard_delta',)
+
+    def __init__(self, consumer, params):
+        from core.boards import parse_board
+
+        super().__init__(consumer, params)
+        self.board = parse_board(params.get('period'), params.get('activity'))
+
+    def groups(self):
+        from core.leaderboard import leaderboard_group_name
+        return [leaderboard_group_name(self.board)]
+
+    async def start(self):
         # Send initial leaderboard data
-        leaderboard_data = await self.get_leaderboard_data()
-        await self.send(text_data=json.dumps({
-            'type': 'leaderboard_update',
-            'data': leaderboard_data
-        }))
-    
-    async def disconnect(self, close_code):
-        # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-    
-    async def receive(self, text_data):
-        # Handle refresh request
-        text_data_json = json.loads(text_data)
-        if text_data_json.get('action') == 'refresh':
-            leaderboard_data = await self.get_leaderboard_data()
-            await self.send(text_data=json.dumps({
-                'type': 'leaderboard_update',
-                'data': leaderboard_data
+        await self.send_snapshot()
+
+    async def receive(self, content):
+        action = content.get('action')
+
+        if action == 'subscribe':
+            # Ganti board: pindah ke group board baru lalu kirim snapshot-nya
+            await self.consumer.subscribe(LeaderboardStream(self.consumer, {
+                'period': content.get('period'),
+                'activity': content.get('activity')
             }))
-    
-    async def leaderboard_update(self, event):
-        """Handle leaderboard update from group"""
-        leaderboard_data = event.get('data', {})
-        
-        await self.send(text_data=json.dumps({
-            'type': 'leaderboard_update',
-            'data': leaderboard_data
-        }))
-    
+        elif action in ('resync', 'refresh'):
+            await self.send_snapshot()
+
+    async def leaderboard_delta(self, event):
+        """Handle leaderboard delta from group (sudah di-encode sekali untuk semua client board ini)"""
+        await self.send_text(event['text'])
+
+    async def send_snapshot(self):
+        seq, rows = await self.get_snapshot()
+        period, activity_type = self.board
+        await self.send({
+            'type': 'leaderboard_snapshot',
+            'period': period,
+            'activity': activity_type,
+            'seq': seq,
+            'data': rows
+        })
+
     @database_sync_to_async
-    def get_leaderboard_data(self):
-        """Get current leaderboard data"""
-        from accounts.models import User
-        
-        players = User.objects.filter(role='player').order_by(
-            '-current_level', '-total_exp', '-honor_points'
-        )[:20]
-        
-        leaderboard = []
-        for idx, player in enumerate(players, start=1):
-            leaderboard.append({
-                'rank': idx,
-                'username': player.username,
-                'level': player.current_level,
-                'total_exp': player.total_exp,
-                'honor_points': player.honor_points
-            })
-        
-        return leaderboard
+    def get_snapshot(self):
+        """
+        (seq, rows) yang terakhir di-publish untuk board saat ini (lihat core/leaderboard.py)
+        Hanya membaca: publish dilakukan outbox worker dengan debounce broadcast, jadi
+        connect/resync tidak memicu broadcast. Perubahan yang belum di-publish sampai
+        lewat delta berikutnya dengan seq lanjutan snapshot ini.
+        """
+        from core.leaderboard import get_published_leaderboard
 
+        return get_published_leaderboard(self.board)
+
+
+class PresenceStream(Stream):
+    """
+    Online status tracking
+    Presence player disimpan di core/presence.py dan di-refresh oleh heartbeat client.
+
+    Client menerima 'online_users' (snapshot + seq) saat subscribe, lalu 'presence_diff'
+    (joined + left) paling banyak sekali per PRESENCE_BROADCAST_INTERVAL. Jika seq diff
+    bukan seq terakhir + 1, client mengirim action 'get_online_users'.
+
+    Selama ada stream presence di process ini, satu task sweep mem-publish diff tiap
+    PRESENCE_SWEEP_INTERVAL, supaya player yang heartbeat-nya berhenti tanpa disconnect
+    terkirim sebagai 'left' dari process yang sama dengan cache presence-nya.
+    """
+    name = 'presence'
+    events = ('presence_diff',)
+
+    # Jumlah stream presence aktif di process ini dan task sweep-nya
+    active_streams = 0
+    sweep_task = None
+
+    def groups(self):
+        return ['online_status']
+
+    async def start(self):
+        await self.send_snapshot()
+        PresenceStream.active_streams += 1
+        self.start_sweep()
 
-class OnlineStatusConsumer(AsyncWebsocketConsumer):
-    """Consumer untuk online status tracking"""
-    
-    async def connect(self):
-        self.user = self.scope['user']
-        
-        if not self.user.is_authenticated:
-            await self.close()
-            return
-        
-        self.room_group_name = 'online_status'
-        
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        
-        await self.accept()
-        
         # Mark user as online
-        await self.mark_user_online(self.user.id)
-        
-        # Broadcast user online status
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_status',
-                'user_id': self.user.id,
-                'username': self.user.username,
-                'status': 'online'
-            }
-        )
-    
-    async def disconnect(self, close_code):
+        if await self.mark_user_online():
+            await self.schedule_flush()
+
+    async def stop(self):
+        PresenceStream.active_streams -= 1
+
         # Mark user as offline
-        if hasattr(self, 'user') and self.user.is_authenticated:
-            await self.mark_user_offline(self.user.id)
-            
-            # Broadcast user offline status
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'user_status',
-                    'user_id': self.user.id,
-                    'username': self.user.username,
-                    'status': 'offline'
-                }
-            )
-        
-        # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-    
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        action = text_data_json.get('action')
-        
+        if self.user.is_player():
+            await self.mark_user_offline()
+            await self.schedule_flush()
+
+    @classmethod
+    def start_sweep(cls):
+        """Jalankan task sweep jika belum ada yang berjalan di event loop ini"""
+        loop = asyncio.get_running_loop()
+        task = cls.sweep_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            cls.sweep_task = loop.create_task(cls.sweep())
+
+    @classmethod
+    async def sweep(cls):
+        """Sweep + publish presence berkala sampai stream presence terakhir berhenti"""
+        from core.notifications import deliver_presence_update
+        from core.presence import get_presence_sweep_interval
+
+        while cls.active_streams > 0:
+            await asyncio.sleep(get_presence_sweep_interval())
+            await database_sync_to_async(deliver_presence_update)()
+
+    async def receive(self, content):
+        action = content.get('action')
+
         if action == 'get_online_users':
-            online_users = await self.get_online_users()
-            await self.send(text_data=json.dumps({
-                'type': 'online_users',
-                'users': online_users
-            }))
-    
-    async def user_status(self, event):
-        """Handle user status update from group"""
-        await self.send(text_data=json.dumps({
-            'type': 'user_status',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'status': event['status']
-        }))
-    
+            await self.send_snapshot()
+        elif action == 'heartbeat':
+            # User bisa offline lagi jika tab lain ditutup atau heartbeat terlambat
+            if await self.mark_user_online():
+                await self.schedule_flush()
+
+    async def send_snapshot(self):
+        await self.send(await self.get_snapshot())
+
+    async def schedule_flush(self):
+        """
+        Jadwalkan satu broadcast diff di akhir window; perubahan lain di window yang
+        sama (dari consumer/process mana pun) ikut diff tersebut
+        """
+        from core.presence import get_presence_broadcast_interval
+        if await self.acquire_flush():
+            asyncio.get_running_loop().create_task(self.flush_after(get_presence_broadcast_interval()))
+
+    async def flush_after(self, delay):
+        from core.notifications import deliver_presence_update
+        from core.presence import release_presence_flush
+
+        await asyncio.sleep(delay)
+        await database_sync_to_async(release_presence_flush)()
+        if await database_sync_to_async(deliver_presence_update)() is False:
+            # Publish lain sedang berjalan dan bisa saja sudah membaca set sebelum
+            # perubahan ini: jadwalkan flush lagi di window berikutnya
+            await self.schedule_flush()
+
+    async def presence_diff(self, event):
+        """Handle diff presence from group (sudah di-encode sekali untuk semua client)"""
+        await self.send_text(event['text'])
+
     @database_sync_to_async
-    def mark_user_online(self, user_id):
-        """Mark user as online"""
-        from django.core.cache import cache
-        cache.set(f'user_{user_id}_online', True, timeout=300)  # 5 minutes
-        cache.set(f'user_{user_id}_last_seen', timezone.now().isoformat(), timeout=300)
-    
+    def mark_user_online(self):
+        """
+        Mark player as online / refresh heartbeat (admin tidak dilacak)
+
+        Returns:
+            bool: True jika player baru online
+        """
+        from core.presence import touch_presence
+        if not self.user.is_player():
+            return False
+        return touch_presence(self.user.id, self.user.username)
+
     @database_sync_to_async
-    def mark_user_offline(self, user_id):
-        """Mark user as offline"""
-        from django.core.cache import cache
-        cache.delete(f'user_{user_id}_online')
-    
+    def mark_user_offline(self):
+        """Mark player as offline"""
+        from core.presence import remove_presence
+        remove_presence(self.user.id)
+
+    @database_sync_to_async
+    def get_snapshot(self):
+        """Presence yang terakhir di-publish (tanpa query database)"""
+        from core.presence import get_presence_snapshot
+        return get_presence_snapshot()
+
     @database_sync_to_async
-    def get_online_users(self):
-        """Get list of online users"""
-        from django.core.cache import cache
-        from accounts.models import User
-        
-        online_users = []
-        players = User.objects.filter(role='player')
-        
-        for player in players:
-            is_online = cache.get(f'user_{player.id}_online', False)
-            if is_online:
-                last_seen = cache.get(f'user_{player.id}_last_seen', '')
-                online_users.append({
-                    'id': player.id,
-                    'username': player.username,
-                    'last_seen': last_seen
-                })
-        
-        return online_users
+    def acquire_flush(self):
+        from core.presence import acquire_presence_flush
+        return acquire_presence_flush()
+
+
+STREAMS = {
+    stream.name: stream
+    for stream in (NotificationStream, StatsStream, LeaderboardStream, PresenceStream)
+}
+
+
+class StreamConsumer(AsyncWebsocketConsumer):
+    """
+    Base consumer yang menjalankan satu atau lebih Stream di atas satu koneksi
+
+    Group di-join sekali per koneksi walaupun dipakai beberapa stream (notifications
+    dan stats sama-sama memakai notifications_{user_id}), dan setiap group event
+    diteruskan ke stream yang menanganinya.
+    """
+    # Bungkus setiap pesan dengan {'stream': name, 'payload': ...}
+    multiplexed = False
+
+    # Stream yang langsung di-subscribe saat connect
+    default_streams = ()
+
+    def get_params(self):
+        """Params stream dari query string dan URL route"""
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        params = {key: values[0] for key, values in query.items()}
+        params.update(self.scope.get('url_route', {}).get('kwargs', {}))
+        return params
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.streams = {}
+        self.group_streams = {}
+
+        params = self.get_params()
+        streams = [STREAMS[name](self, params) for name in self.default_streams]
+        if not all(stream.allowed() for stream in streams):
+            await self.close()
+            return
+
+        await self.accept()
+        for stream in streams:
+            await self.subscribe(stream)
+
+    async def disconnect(self, close_code):
+        # Tidak ada stream jika connect ditolak
+        for name in list(getattr(self, 'streams', {})):
+            await self.unsubscribe(name)
+
+    async def subscribe(self, stream):
+        """Join group stream (yang belum di-join koneksi ini) lalu kirim pesan awalnya"""
+        await self.unsubscribe(stream.name)
+        self.streams[stream.name] = stream
+        for group in stream.groups():
+            if group not in self.group_streams:
+                await self.channel_layer.group_add(group, self.channel_name)
+            self.group_streams.setdefault(group, set()).add(stream.name)
+        await stream.start()
+
+    async def unsubscribe(self, name):
+        """Stop stream dan leave group yang tidak dipakai stream lain"""
+        stream = self.streams.pop(name, None)
+        if stream is None:
+            return
+        await stream.stop()
+        for group in stream.groups():
+            names = self.group_streams.get(group, set())
+            names.discard(name)
+            if not names:
+                self.group_streams.pop(group, None)
+                await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def send_stream(self, name, payload):
+        if self.multiplexed:
+            payload = {'stream': name, 'payload': payload}
+        await self.send(text_data=json.dumps(payload))
+
+    async def send_stream_text(self, name, text):
+        if self.multiplexed:
+            # Payload yang sudah di-encode cukup dibungkus, tidak di-decode ulang
+            text = f'{{"stream": {json.dumps(name)}, "payload": {text}}}'
+        await self.send(text_data=text)
+
+    # Receive message from WebSocket
+    async def receive(self, text_data):
+        # Endpoint satu fitur: action diteruskan ke stream utamanya
+        content = await self.decode(text_data)
+        if content is None:
+            return
+        stream = self.streams.get(self.default_streams[0])
+        if stream:
+            await stream.receive(content)
+
+    async def decode(self, text_data):
+        """
+        Parse pesan client; pesan yang bukan JSON object dibalas error frame
+        dan koneksi tetap terbuka
+
+        Returns:
+            dict or None
+        """
+        try:
+            content = json.loads(text_data or '')
+        except (TypeError, ValueError):
+            content = None
+        if not isinstance(content, dict):
+            await self.send_error('Invalid message: expected a JSON object')
+            return None
+        return content
+
+    async def send_error(self, message):
+        """Error frame di luar stream (tidak dibungkus, juga di koneksi multiplexed)"""
+        await self.send(text_data=json.dumps({'type': 'error', 'message': message}))
+
+    # Receive message from group
+    async def route_event(self, event):
+        """Teruskan group event ke stream yang menangani event type ini"""
+        for stream in list(self.streams.values()):
+            if event['type'] in stream.events:
+                await getattr(stream, event['type'])(event)
+
+    notification_message = route_event
+    notification_broadcast = route_event
+    player_update = route_event
+    leaderboard_delta = route_event
+    presence_diff = route_event
+
+
+class StreamMultiplexConsumer(StreamConsumer):
+    """
+    Satu koneksi WebSocket untuk semua stream (ws/stream/)
+
+    Client mengirim:
+        {'action': 'subscribe', 'stream': name, ...params}   (params: after, period, activity)
+        {'action': 'unsubscribe', 'stream': name}
+        {'stream': name, 'action': ..., ...}                  (action milik stream)
+    dan menerima {'stream': name, 'payload': {...}}; payload sama dengan pesan di
+    endpoint satu fitur.
+    """
+    multiplexed = True
+
+    async def receive(self, text_data):
+        content = await self.decode(text_data)
+        if content is None:
+            return
+        name = content.get('stream')
+        action = content.get('action')
+        if not isinstance(name, str):
+            await self.send_error(f'Invalid stream: {name!r}')
+            return
+
+        if action == 'subscribe':
+            if name not in STREAMS:
+                await self.send_error(f'Unknown stream: {name}')
+                return
+            # Stream notifications/stats selalu milik user yang login
+            params = {
+                key: value for key, value in content.items()
+                if key not in ('action', 'stream', 'user_id')
+            }
+            await self.subscribe(STREAMS[name](self, params))
+        elif action == 'unsubscribe':
+            await self.unsubscribe(name)
+        elif name in self.streams:
+            await self.streams[name].receive(content)
+        else:
+            await self.send_error(f'Not subscribed to stream: {name}')
+
+
+class NotificationConsumer(StreamConsumer):
+    """Consumer untuk real-time notifications dan stats dashboard (ws/notifications/<user_id>/)"""
+    default_streams = ('notifications', 'stats')
+
+
+class LeaderboardConsumer(StreamConsumer):
+    """Consumer untuk live leaderboard updates (ws/leaderboard/?period=&activity=)"""
+    default_streams = ('leaderboard',)
+
 
+class OnlineStatusConsumer(StreamConsumer):
+    """Consumer untuk online status tracking (ws/online-status/)"""
+    default_streams = ('presence',)
@@ -0,0 +1,192 @@
+"""
+Inbox notification per user dengan cursor seq
+
+Setiap notification per user (send_notification / enqueue_notifications) disimpan
+sebagai row Notification di INSERT yang sama dengan batch outbox-nya, dan seq
+(ID row) ikut dikirim ke client. Client yang reconnect mengirim seq terakhir yang
+diterima dan mendapat notifikasi yang terlewat dengan satu range read di index
+(user, id).
+
+Jumlah unread di-cache per user dan dihitung ulang (satu COUNT di partial index
+unread) setelah ada notification baru atau mark as read.
+
+Broadcast notification per role (broadcast_notification) disimpan sebagai satu
+row bersama (user kosong, role diisi) untuk semua penerima, di seq yang sama dengan
+notification per user, jadi player yang offline tetap menerimanya saat catch-up.
+Row bersama tidak punya status read per user: tidak dihitung di unread dan tidak
+ikut mark as read.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+# Maksimal notification per catch-up; client yang tertinggal lebih jauh cukup
+# menerima yang terbaru
+CATCH_UP_LIMIT = 50
+
+
+def _unread_cache_key(user_id):
+    return f'notifications_unread_{user_id}'
+
+
+def _invalidate_unread(user_ids):
+    keys = [_unread_cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def store_notifications(messages):
+    """
+    Simpan OutboxMessage kind 'notification' ke inbox (satu INSERT) dan isi
+    payload['seq'] dengan ID row Notification
+
+    Args:
+        messages: Unsaved OutboxMessage instances (kind 'notification')
+    """
+    if not messages:
+        return
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            user_id=message.payload['user_id'],
+            notification_type=message.payload['notification_type'],
+            message=message.payload['message'],
+            data=message.payload['data']
+        )
+        for message in messages
+    ])
+    for message, notification in zip(messages, notifications):
+        message.payload['seq'] = notification.pk
+    _invalidate_unread(notification.user_id for notification in notifications)
+
+
+def store_broadcasts(messages):
+    """
+    Simpan OutboxMessage kind 'broadcast' ke inbox sebagai row bersama per role
+    (satu INSERT) dan isi payload['seq'] dengan ID row Notification
+
+    Args:
+        messages: Unsaved OutboxMessage instances (kind 'broadcast')
+    """
+    if not messages:
+        return
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            role=message.payload['role'],
+            notification_type=message.payload['notification_type'],
+            message=message.payload['message'],
+            data=message.payload['data'],
+            recipients=message.payload['user_ids'],
+            overlays=message.payload['overlays']
+        )
+        for message in messages
+    ])
+    for message, notification in zip(messages, notifications):
+        message.payload['seq'] = notification.pk
+
+
+def serialize_notification(notification, user_id=None):
+    """
+    Notification untuk client (format sama dengan pesan 'notification' di socket)
+    Untuk broadcast, overlay milik user_id di-merge ke data
+    """
+    data = notification.data
+    if notification.user_id is None:
+        data = {**data, **notification.overlays.get(str(user_id), {})}
+    return {
+        'type': 'notification',
+        'seq': notification.pk,
+        'notification_type': notification.notification_type,
+        'message': notification.message,
+        'data': data,
+        'is_read': notification.is_read,
+        'timestamp': notification.created_at.isoformat()
+    }
+
+
+def get_missed_notifications(user_id, after_seq, role=None, limit=CATCH_UP_LIMIT):
+    """
+    Notification dengan seq > after_seq (satu query: range read di index user + id,
+    ditambah index role + id untuk broadcast role user)
+
+    Args:
+        user_id: Penerima
+        after_seq: Seq terakhir yang diterima client
+        role: Role user; broadcast untuk role ini ikut dikembalikan
+        limit: Maksimal notification
+
+    Returns:
+        list: Serialized notifications, urut seq
+    """
+    recipient = Q(user_id=user_id)
+    if role:
+        recipient |= Q(user__isnull=True, role=role)
+    notifications = [
+        notification
+        for notification in Notification.objects.filter(recipient, pk__gt=after_seq).order_by('-pk')[:limit]
+        # Broadcast yang dibatasi ke user lain dilewati
+        if notification.recipients is None or user_id in notification.recipients
+    ]
+    return [serialize_notification(notification, user_id) for notification in reversed(notifications)]
+
+
+def get_unread_count(user_id):
+    """Jumlah notification yang belum dibaca (cached)"""
+    key = _unread_cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(key, count, timeout=None)
+    return count
+
+
+def mark_notifications_read(user_id, seqs=None, up_to=None):
+    """
+    Tandai notification sudah dibaca (satu UPDATE)
+
+    Args:
+        user_id: Pemilik notification
+        seqs: Seq tertentu
+        up_to: Semua seq <= up_to (jika seqs dan up_to kosong: semua)
+
+    Returns:
+        int: Jumlah notification yang ditandai
+    """
+    notifications = Notification.objects.filter(user_id=user_id, is_read=False)
+    if seqs is not None:
+        notifications = notifications.filter(pk__in=seqs)
+    if up_to is not None:
+        notifications = notifications.filter(pk__lte=up_to)
+    count = notifications.update(is_read=True)
+    if count:
+        cache.delete(_unread_cache_key(user_id))
+        _invalidate_unread([user_id])
+    return count
+
+
+def get_notification_ttl():
+    """Umur maksimal notification di inbox (hari)"""
+    return getattr(settings, 'NOTIFICATION_TTL_DAYS', 30)
+
+
+def prune_notifications(now=None):
+    """
+    Hapus notification yang lebih lama dari NOTIFICATION_TTL_DAYS
+
+    Returns:
+        int: Jumlah notification yang dihapus
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=get_notification_ttl())
+    expired = Notification.objects.filter(created_at__lt=cutoff)
+    user_ids = list(
+        expired.filter(is_read=False, user__isnull=False).values_list('user_id', flat=True).distinct()
+    )
+    deleted, _ = expired.delete()
+    if user_ids:
+        cache.delete_many([_unread_cache_key(user_id) for user_id in user_ids])
+    return deleted
@@ -0,0 +1,238 @@
+"""
+Shared leaderboard snapshot untuk leaderboard view, WebSocket broadcast dan LeaderboardConsumer
+
+Setiap board (period, activity_type) punya snapshot sendiri: leaderboard utama dari
+User (urutan level, EXP, honor), board minggu/bulan/per activity dari LeaderboardScore
+(lihat core/boards.py). Snapshot top players disimpan di cache sebagai kolom paralel (tuple ids, usernames,
+levels, ...) di bawah key yang memuat ranking version (core/ranking.py). Perubahan
+EXP/honor menaikkan version setelah commit, jadi reader selalu mendapat snapshot
+terbaru, dan value yang di-cache kecil serta cepat di-unpickle (tanpa model
+instances). Version hanya terlihat lintas process (web workers, worker
+deliver_outbox) jika cache di-share (CACHE_REDIS_URL); dengan cache per process
+snapshot dibatasi settings.LEADERBOARD_SNAPSHOT_TIMEOUT yang pendek supaya version
+bump dari process lain tetap terlihat setelah paling lama satu TTL. Key juga memuat awal periode, jadi board minggu/bulan
+berganti sendiri di pergantian periode.
+
+Broadcast dari outbox worker dibatasi satu per window
+(settings.LEADERBOARD_BROADCAST_INTERVAL) berapapun jumlah level-up yang terjadi.
+
+Client menerima snapshot penuh board-nya saat connect, lalu hanya delta
+(row yang berubah/masuk dan id yang keluar dari top) dengan sequence number.
+Snapshot terakhir yang sudah dikirim disimpan per board bersama seq-nya
+(publish_leaderboard), jadi delta dihitung sekali per board per broadcast, bukan
+per client, dan dikirim ke group board tersebut (leaderboard_group_name). Client
+yang melihat seq loncat meminta resync.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .boards import ACTIVITY_TYPES, MAIN_BOARD, PERIODS, get_board_top, get_period_start
+
+SNAPSHOT_CACHE_KEY = 'leaderboard_snapshot_{period}_{activity_type}_{start}_v{version}'
+BROADCAST_SLOT_CACHE_KEY = 'leaderboard_broadcast_slot'
+PUBLISHED_CACHE_KEY = 'leaderboard_published_{period}_{activity_type}'
+PUBLISH_LOCK_CACHE_KEY = 'leaderboard_publish_lock'
+
+# Batas waktu lock publish (detik) jika process mati di tengah publish
+PUBLISH_LOCK_TIMEOUT = 10
+
+# Semua board yang di-publish ke client
+BOARDS = [(period, activity_type) for period in PERIODS for activity_type in ('', *ACTIVITY_TYPES)]
+
+# Jumlah player di snapshot
+TOP_PLAYERS = 20
+
+
+USER_FIELDS = ['username', 'current_level', 'total_exp', 'current_exp', 'honor_points']
+
+# score = total_exp di leaderboard utama, net EXP periode/activity di board lain
+SNAPSHOT_FIELDS = ['id'] + USER_FIELDS + ['score']
+
+# Satu baris snapshot; punya atribut yang sama dengan User untuk template dan encode_cursor
+LeaderboardEntry = namedtuple('LeaderboardEntry', ['rank'] + SNAPSHOT_FIELDS)
+
+
+def get_broadcast_interval():
+    """Window debounce broadcast dalam detik (0 = tanpa debounce)"""
+    return getattr(settings, 'LEADERBOARD_BROADCAST_INTERVAL', 1)
+
+
+def get_snapshot_timeout():
+    """TTL snapshot dalam detik; snapshot version lama dibiarkan expire sendiri"""
+    return getattr(settings, 'LEADERBOARD_SNAPSHOT_TIMEOUT', 5)
+
+
+def compute_snapshot(board=MAIN_BOARD, limit=TOP_PLAYERS):
+    """
+    Top players board dalam urutan ranking, satu query lewat index
+    (accounts_user_ranking_idx atau core_leaderboard_board_idx)
+
+    Returns:
+        tuple: Satu tuple per kolom di SNAPSHOT_FIELDS
+    """
+    from accounts.models import User
+    from .ranking import RANKING_ORDER
+
+    if board == MAIN_BOARD:
+        rows = User.objects.filter(role='player').annotate(score=F('total_exp')).order_by(
+            *RANKING_ORDER
+        ).values_list(*SNAPSHOT_FIELDS)[:limit]
+    else:
+        rows = [row[1:] for row in get_board_top(board, limit, fields=USER_FIELDS)]
+    columns = tuple(zip(*rows))
+    return columns or tuple(() for _ in SNAPSHOT_FIELDS)
+
+
+def get_snapshot_columns(board=MAIN_BOARD):
+    """Kolom snapshot board untuk ranking version saat ini, dihitung jika belum ada"""
+    from .ranking import get_ranking_version
+
+    period, activity_type = board
+    key = SNAPSHOT_CACHE_KEY.format(
+        period=period,
+        activity_type=activity_type,
+        start=get_period_start(period).isoformat(),
+        version=get_ranking_version()
+    )
+    columns = cache.get(key)
+    if columns is None:
+        columns = compute_snapshot(board)
+        cache.set(key, columns, timeout=get_snapshot_timeout())
+    return columns
+
+
+def get_top_entries(limit=TOP_PLAYERS, board=MAIN_BOARD):
+    """
+    Top `limit` players board dari snapshot (limit maksimal TOP_PLAYERS)
+
+    Returns:
+        list: LeaderboardEntry, urut dari rank 1
+    """
+    columns = get_snapshot_columns(board)
+    return [
+        LeaderboardEntry(rank, *row)
+        for rank, row in enumerate(zip(*columns), start=1)
+    ][:limit]
+
+
+def get_leaderboard_snapshot(board=MAIN_BOARD):
+    """
+    Snapshot board untuk WebSocket
+
+    Returns:
+        list: [{'id', 'rank', 'username', 'level', 'total_exp', 'current_exp', 'honor_points', 'score'}, ...]
+    """
+    return [
+        {
+            'id': entry.id,
+            'rank': entry.rank,
+            'username': entry.username,
+            'level': entry.current_level,
+            'total_exp': entry.total_exp,
+            'current_exp': entry.current_exp,
+            'honor_points': entry.honor_points,
+            'score': entry.score
+        }
+        for entry in get_top_entries(board=board)
+    ]
+
+
+def diff_leaderboard(old_rows, new_rows):
+    """
+    Delta antara dua snapshot (list dari get_leaderboard_snapshot)
+
+    Returns:
+        dict: {
+            'upsert': row baru atau yang berubah (rank/skor), urut rank,
+            'remove': id player yang keluar dari snapshot
+        }
+    """
+    old = {row['id']: row for row in old_rows}
+    new_ids = {row['id'] for row in new_rows}
+    return {
+        'upsert': [row for row in new_rows if old.get(row['id']) != row],
+        'remove': [player_id for player_id in old if player_id not in new_ids],
+    }
+
+
+def leaderboard_group_name(board):
+    """Group channel layer yang menerima delta board"""
+    if board == MAIN_BOARD:
+        return 'leaderboard_updates'
+    period, activity_type = board
+    return f'leaderboard_updates_{period}_{activity_type or "any"}'
+
+
+def get_published_leaderboard(board=MAIN_BOARD):
+    """
+    Snapshot board terakhir yang dikirim ke client
+
+    Returns:
+        tuple: (seq, rows)
+    """
+    period, activity_type = board
+    key = PUBLISHED_CACHE_KEY.format(period=period, activity_type=activity_type)
+    published = cache.get(key)
+    if published is None:
+        # seq awal dari waktu sekarang, jadi client yang memegang seq sebelum cache
+        # hilang tidak pernah menerima delta yang cocok dan pasti resync
+        cache.add(key, (int(time.time() * 1000), get_leaderboard_snapshot(board)), timeout=None)
+        published = cache.get(key)
+    return published
+
+
+def publish_leaderboard(boards=BOARDS):
+    """
+    Bandingkan snapshot terbaru setiap board dengan snapshot yang terakhir dikirim
+    dan simpan sebagai seq berikutnya board tersebut
+
+    Returns:
+        list: [(board, delta)] untuk board yang berubah; delta =
+              {'type': 'leaderboard_delta', 'period', 'activity', 'seq', 'upsert', 'remove'}.
+              Kosong jika tidak ada perubahan. None jika publish lain sedang berjalan
+              (belum ada yang dibandingkan, caller harus mencoba lagi)
+    """
+    if not cache.add(PUBLISH_LOCK_CACHE_KEY, True, timeout=PUBLISH_LOCK_TIMEOUT):
+        return None
+    try:
+        deltas = []
+        for board in boards:
+            seq, rows = get_published_leaderboard(board)
+            current = get_leaderboard_snapshot(board)
+            delta = diff_leaderboard(rows, current)
+            if not delta['upsert'] and not delta['remove']:
+                continue
+            period, activity_type = board
+            cache.set(
+                PUBLISHED_CACHE_KEY.format(period=period, activity_type=activity_type),
+                (seq + 1, current),
+                timeout=None
+            )
+            deltas.append((board, {
+                'type': 'leaderboard_delta',
+                'period': period,
+                'activity': activity_type,
+                'seq': seq + 1,
+                **delta
+            }))
+        return deltas
+    finally:
+        cache.delete(PUBLISH_LOCK_CACHE_KEY)
+
+
+def acquire_broadcast_slot():
+    """
+    Ambil slot broadcast untuk window saat ini
+
+    Returns:
+        bool: True jika broadcast boleh dikirim sekarang, False jika sudah ada
+              broadcast di window ini (update harus ditunda)
+    """
+    interval = get_broadcast_interval()
+    if interval <= 0:
+        return True
+    return cache.add(BROADCAST_SLOT_CACHE_KEY, True, timeout=interval)
@@ -0,0 +1,214 @@
+"""
+Compiled level curve untuk lookup level tanpa query database
+
+Tabel Level kecil dan jarang berubah, jadi di-load sekali per process dan
+disimpan sebagai sorted arrays. Lookup memakai bisect (O(log n)).
+Curve di-reload otomatis ketika Level disimpan atau dihapus (lihat core/signals/handlers.py).
+
+Curve per process disimpan bersama generation counter di shared cache. Setiap
+lookup membandingkan generation tersebut (satu cache get, tanpa query database);
+invalidation menaikkan generation sehingga process lain (web workers,
+deliver_outbox, cron) ikut reload. Generation dibaca sebelum query Level, jadi
+curve yang di-load bersamaan dengan invalidation langsung dianggap stale.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+
+GENERATION_CACHE_KEY = 'level_curve_generation'
+
+
+def level_bonus(level, bonus_description=None):
+    """
+    Menghitung bonus honor points untuk level tertentu
+
+    Args:
+        level: Level number (int)
+        bonus_description: Deskripsi bonus dari tabel Level (optional)
+
+    Returns:
+        dict: {
+            'honor_points': int,
+            'description': str
+        }
+    """
+    # Bonus honor points berdasarkan level
+    # Level 1-5: 10 points per level
+    # Level 6-10: 20 points per level
+    # Level 11+: 30 points per level
+    if level <= 5:
+        honor_points = level * 10
+    elif level <= 10:
+        honor_points = 50 + (level - 5) * 20
+    else:
+        honor_points = 150 + (level - 10) * 30
+
+    return {
+        'honor_points': honor_points,
+        'description': bonus_description or f"Reached Level {level}!"
+    }
+
+
+class LevelCurve:
+    """
+    Snapshot immutable dari tabel Level
+
+    Menyimpan:
+        - levels / exp_by_level: level numbers (sorted) dan exp_required-nya
+        - thresholds / best_levels: exp_required (sorted) dan level tertinggi yang
+          bisa dicapai pada threshold tersebut
+        - bonuses: bonus yang sudah dihitung untuk setiap level
+    """
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: Iterable of (level, exp_required, bonus_description)
+        """
+        rows = sorted(rows)
+        self.levels = [level for level, _, _ in rows]
+        self.exp_by_level = [exp_required for _, exp_required, _ in rows]
+        self.bonuses = {
+            level: level_bonus(level, bonus_description)
+            for level, _, bonus_description in rows
+        }
+
+        # Sama dengan "Level dengan exp_required <= total_exp, level tertinggi"
+        by_exp = sorted((exp_required, level) for level, exp_required, _ in rows)
+        self.thresholds = [exp_required for exp_required, _ in by_exp]
+        self.best_levels = []
+        best = None
+        for _, level in by_exp:
+            best = level if best is None else max(best, level)
+            self.best_levels.append(best)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def table(self):
+        """List of {'level', 'exp_required'} dicts, urut berdasarkan level"""
+        return [
+            {'level': level, 'exp_required': exp_required}
+            for level, exp_required in zip(self.levels, self.exp_by_level)
+        ]
+
+    def exp_required(self, level):
+        """EXP required untuk level tertentu, atau None jika level tidak ada"""
+        idx = bisect_left(self.levels, level)
+        if idx < len(self.levels) and self.levels[idx] == level:
+            return self.exp_by_level[idx]
+        return None
+
+    def level_for_exp(self, total_exp):
+        """Level tertinggi yang bisa dicapai dengan total_exp, atau None"""
+        idx = bisect_right(self.thresholds, total_exp) - 1
+        if idx < 0:
+            return None
+        return self.best_levels[idx]
+
+    def next_level(self, level):
+        """
+        Level berikutnya setelah level tertentu
+
+        Returns:
+            tuple: (level, exp_required) atau None jika sudah level maksimal
+        """
+        idx = bisect_right(self.levels, level)
+        if idx < len(self.levels):
+            return self.levels[idx], self.exp_by_level[idx]
+        return None
+
+    def bonus(self, level):
+        """Bonus untuk level tertentu, atau None jika level tidak ada"""
+        return self.bonuses.get(level)
+
+    def progress(self, total_exp, current_level):
+        """
+        Progress EXP menuju level berikutnya
+
+        Returns:
+            dict: {
+                'exp_for_current_level': int,
+                'exp_for_next_level': int,
+                'exp_needed': int,
+                'exp_progress': float (0-100, belum di-clamp)
+            }
+        """
+        exp_for_current_level = self.exp_required(current_level)
+
+        if exp_for_current_level is None:
+            return {
+                'exp_for_current_level': 0,
+                'exp_for_next_level': 1000,
+                'exp_needed': 1000 - total_exp,
+                'exp_progress': total_exp / 1000 * 100,
+            }
+
+        next_level = self.next_level(current_level)
+        if next_level is None:
+            return {
+                'exp_for_current_level': exp_for_current_level,
+                'exp_for_next_level': total_exp,
+                'exp_needed': 0,
+                'exp_progress': 100,
+            }
+
+        exp_for_next_level = next_level[1]
+        span = exp_for_next_level - exp_for_current_level
+        return {
+            'exp_for_current_level': exp_for_current_level,
+            'exp_for_next_level': exp_for_next_level,
+            'exp_needed': exp_for_next_level - total_exp,
+            'exp_progress': ((total_exp - exp_for_current_level) / span * 100) if span > 0 else 0,
+        }
+
+
+_curve = None
+_curve_generation = None
+_curve_lock = threading.Lock()
+
+
+def _get_generation():
+    """
+    Generation curve di shared cache; counter yang belum ada dimulai dari waktu
+    sekarang, jadi tidak pernah sama dengan generation curve yang sudah di-load
+    """
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, int(time.time() * 1000), timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def get_level_curve():
+    """Return compiled LevelCurve untuk process ini (load dari DB jika belum ada atau stale)"""
+    global _curve, _curve_generation
+    generation = _get_generation()
+    curve = _curve
+    if curve is None or _curve_generation != generation:
+        with _curve_lock:
+            curve = _curve
+            if curve is None or _curve_generation != generation:
+                from .models import Level
+                curve = LevelCurve(
+                    Level.objects.values_list('level', 'exp_required', 'bonus_description')
+                )
+                _curve, _curve_generation = curve, generation
+    return curve
+
+
+def invalidate_level_curve():
+    """
+    Buang compiled curve di semua process dengan menaikkan generation;
+    lookup berikutnya akan reload dari DB
+    """
+    global _curve
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        # Counter belum ada: generation baru dari waktu sekarang
+        cache.add(GENERATION_CACHE_KEY, int(time.time() * 1000), timeout=None)
+    with _curve_lock:
+        _curve = None
@@ -0,0 +1,56 @@
+"""
+Management command untuk memindahkan ExpLog lama ke archive (gzip JSONL segments)
+Jalankan berkala via cron supaya tabel ExpLog tetap kecil
+"""
+
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from core.archive import archive_exp_logs, get_archive_cutoff
+from core.models import ExpLog
+
+
+class Command(BaseCommand):
+    help = 'Pindahkan ExpLog yang lebih lama dari EXP_ARCHIVE_DAYS ke archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Arsipkan log yang lebih lama dari N hari (default: settings.EXP_ARCHIVE_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Jumlah user per segment (default: 200)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Hanya tampilkan jumlah log yang akan diarsip'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = get_archive_cutoff(options['days'])
+
+        old_logs = ExpLog.objects.filter(created_at__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f'{old_logs.count()} ExpLog sebelum {cutoff:%Y-%m-%d} akan diarsip')
+            return
+
+        user_ids = list(
+            User.objects.filter(pk__in=old_logs.values('user_id')).order_by('pk').values_list('pk', flat=True)
+        )
+        self.stdout.write(f'Mengarsipkan ExpLog sebelum {cutoff:%Y-%m-%d} untuk {len(user_ids)} users...')
+
+        total_logs = 0
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            total_logs += archive_exp_logs(chunk, cutoff)
+            self.stdout.write(f'{min(start + batch_size, len(user_ids))}/{len(user_ids)} users selesai')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\nArchive selesai! {total_logs} ExpLog dipindahkan')
+        )
@@ -0,0 +1,59 @@
+"""
+Management command untuk membangun ulang ExpDailyRollup dari histori ExpLog
+Jalankan sekali setelah migration, atau untuk memperbaiki rollup setelah ExpLog diubah manual
+Rollup untuk hari yang sudah diarsip (archive_exp_logs) tidak diubah
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User
+from core.models import ExpDailyRollup
+from core.archive import get_archived_until
+from core.rollups import build_rollups
+from core.services import lock_users
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang ExpDailyRollup dari histori ExpLog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Jumlah user per batch (default: 200)'
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Hanya rebuild rollup untuk username tertentu'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        users = User.objects.order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        self.stdout.write(f'Membangun ulang EXP rollups untuk {len(user_ids)} users...')
+
+        total_rollups = 0
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                # Lock user supaya add_exp tidak menulis rollup di tengah rebuild
+                lock_users(chunk)
+                # Rollup hari yang sudah diarsip tidak punya ExpLog lagi, jadi dipertahankan
+                stale = ExpDailyRollup.objects.filter(user_id__in=chunk)
+                for user_id, archived_until in get_archived_until(chunk).items():
+                    stale = stale.exclude(user_id=user_id, day__lte=archived_until)
+                stale.delete()
+                rollups = ExpDailyRollup.objects.bulk_create(build_rollups(chunk))
+            total_rollups += len(rollups)
+            self.stdout.write(f'{min(start + batch_size, len(user_ids))}/{len(user_ids)} users selesai')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\nBackfill selesai! {total_rollups} rollup rows dibuat')
+        )
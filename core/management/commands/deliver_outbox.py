@@ -0,0 +1,81 @@
+"""
+Management command untuk mengirim notifications dan leaderboard broadcast dari outbox
+Jalankan sebagai worker terpisah (--loop) atau berkala via cron
+
+Setiap putaran juga me-refresh PlayerRank jika ada perubahan ranking yang belum
+di-refresh oleh writer, dan mem-publish diff presence (player yang expire tanpa
+disconnect). Presence hanya terlihat dari worker jika cache di-share dengan process
+ASGI (CACHE_REDIS_URL); tanpa itu sweep di process ASGI (PresenceStream) yang
+mengirim 'left'.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.notifications import deliver_presence_update
+from core.outbox import deliver_outbox, purge_outbox
+from core.ranking import ensure_rankings
+
+
+class Command(BaseCommand):
+    help = 'Kirim message pending di outbox ke channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Terus berjalan sebagai worker'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Jeda (detik) ketika outbox kosong dalam mode --loop (default: 1.0)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Jumlah message per batch (default: 100)'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Jumlah percobaan sebelum message ditandai failed (default: 5)'
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=7,
+            help='Hapus message delivered yang lebih lama dari N hari (default: 7)'
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_outbox(options['purge_days'])
+        if purged:
+            self.stdout.write(f'{purged} delivered messages dihapus dari outbox')
+
+        while True:
+            while True:
+                result = deliver_outbox(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts']
+                )
+                processed = sum(result.values())
+                if processed:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Outbox: {result['delivered']} delivered, "
+                            f"{result['retried']} retried, {result['failed']} failed, "
+                            f"{result['deferred']} deferred"
+                        )
+                    )
+                if processed < options['batch_size']:
+                    break
+
+            ensure_rankings()
+            deliver_presence_update()
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+"""
+Management command untuk deactivate status effects yang sudah expired
+Jalankan command ini secara berkala (misalnya via cron job setiap beberapa menit)
+"""
+
+from django.core.management.base import BaseCommand
+from core.services import expire_status_effects
+
+
+class Command(BaseCommand):
+    help = 'Deactivate semua status effects yang sudah melewati end_date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Jumlah status effects per batch UPDATE (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        expired_count = expire_status_effects(batch_size=options['batch_size'])
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Status effect expiry selesai! {expired_count} effects di-deactivate')
+        )
@@ -0,0 +1,15 @@
+"""
+Management command untuk menghapus LeaderboardScore periode yang sudah lewat
+Jalankan berkala via cron (mis. harian) supaya tabel LeaderboardScore tetap kecil
+"""
+
+from django.core.management.base import BaseCommand
+from core.boards import prune_leaderboard_scores
+
+
+class Command(BaseCommand):
+    help = 'Hapus bucket leaderboard mingguan/bulanan yang sudah expire'
+
+    def handle(self, *args, **options):
+        deleted = prune_leaderboard_scores()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} leaderboard bucket dihapus'))
@@ -0,0 +1,17 @@
+"""
+Management command untuk menghapus notification inbox yang sudah melewati TTL
+Jalankan berkala via cron (mis. harian) supaya tabel Notification tetap kecil
+"""
+
+from django.core.management.base import BaseCommand
+from core.inbox import get_notification_ttl, prune_notifications
+
+
+class Command(BaseCommand):
+    help = 'Hapus notification yang lebih lama dari NOTIFICATION_TTL_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_notifications()
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} notification lebih lama dari {get_notification_ttl()} hari dihapus'
+        ))
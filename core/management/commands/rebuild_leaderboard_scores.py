@@ -0,0 +1,34 @@
+"""
+Management command untuk menghitung ulang LeaderboardScore periode berjalan
+Skor dihitung dari ExpDailyRollup, jadi jalankan backfill_exp_rollups dulu jika
+rollup belum lengkap
+"""
+
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from core.boards import rebuild_leaderboard_scores
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang leaderboard minggu ini, bulan ini dan per activity dari ExpDailyRollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Jumlah user per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+        self.stdout.write(f'Menghitung ulang leaderboard scores untuk {len(user_ids)} users...')
+
+        total = 0
+        for start in range(0, len(user_ids), batch_size):
+            total += rebuild_leaderboard_scores(user_ids[start:start + batch_size])
+            self.stdout.write(f'{min(start + batch_size, len(user_ids))}/{len(user_ids)} users selesai')
+
+        self.stdout.write(self.style.SUCCESS(f'\nSelesai! {total} leaderboard bucket ditulis'))
@@ -0,0 +1,71 @@
+"""
+Management command untuk memeriksa PlayerStats terhadap data asli
+EXP totals dihitung dari ExpDailyRollup, jadi jalankan backfill_exp_rollups dulu
+jika rollup belum lengkap
+"""
+
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from core.models import PlayerStats
+from core.stats import STAT_FIELDS, compute_player_stats, refresh_player_stats
+
+
+class Command(BaseCommand):
+    help = 'Periksa (dan perbaiki dengan --repair) lifetime counters di PlayerStats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Tulis ulang counter yang tidak sesuai'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Jumlah user per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+        self.stdout.write(f'Memeriksa player stats untuk {len(user_ids)} users...')
+
+        mismatched = []
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            stored = {
+                row['user_id']: row
+                for row in PlayerStats.objects.filter(user_id__in=chunk).values('user_id', *STAT_FIELDS)
+            }
+            expected = compute_player_stats(chunk)
+
+            bad = []
+            for user_id, values in expected.items():
+                row = stored.get(user_id)
+                if row is None:
+                    self.stdout.write(self.style.WARNING(f'User {user_id}: PlayerStats tidak ada'))
+                    bad.append(user_id)
+                    continue
+                diffs = [
+                    f'{field} {row[field]} != {value}'
+                    for field, value in values.items() if row[field] != value
+                ]
+                if diffs:
+                    self.stdout.write(self.style.WARNING(f"User {user_id}: {', '.join(diffs)}"))
+                    bad.append(user_id)
+
+            if bad and options['repair']:
+                # Recount ulang di bawah lock, bukan nilai yang dihitung di atas
+                refresh_player_stats(bad)
+            mismatched.extend(bad)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('\nSemua player stats sesuai'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'\n{len(mismatched)} player stats diperbaiki'))
+        else:
+            self.stdout.write(
+                self.style.ERROR(f'\n{len(mismatched)} player stats tidak sesuai (jalankan dengan --repair)')
+            )
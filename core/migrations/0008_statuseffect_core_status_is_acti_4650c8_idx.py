@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_attendance_core_attend_user_id_7832d4_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='statuseffect',
+            index=models.Index(fields=['is_active', 'end_date'], name='core_status_is_acti_4650c8_idx'),
+        ),
+    ]
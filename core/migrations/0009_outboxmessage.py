@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_statuseffect_core_status_is_acti_4650c8_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('notification', 'Notification'), ('leaderboard', 'Leaderboard Update')], help_text='Tipe message', max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text='Data yang dikirim ke channel layer')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', help_text='Status pengiriman', max_length=20)),
+                ('attempts', models.IntegerField(default=0, help_text='Jumlah percobaan pengiriman')),
+                ('last_error', models.TextField(blank=True, help_text='Error dari percobaan pengiriman terakhir')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Message tidak dikirim sebelum waktu ini (retry backoff)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Message',
+                'verbose_name_plural': 'Outbox Messages',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='core_outbox_status_79e487_idx')],
+            },
+        ),
+    ]
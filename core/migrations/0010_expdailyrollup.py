@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_outboxmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Tanggal (timezone lokal) dari ExpLog')),
+                ('activity_type', models.CharField(choices=[('quest', 'Quest'), ('assignment', 'Assignment'), ('participation', 'Participation'), ('bonus', 'Bonus'), ('admin', 'Admin Grant'), ('other', 'Other')], default='other', max_length=20)),
+                ('exp_earned', models.IntegerField(default=0, help_text='Total EXP positif')),
+                ('earned_count', models.IntegerField(default=0, help_text='Jumlah log dengan EXP positif')),
+                ('exp_lost', models.IntegerField(default=0, help_text='Total EXP negatif (nilai absolut)')),
+                ('lost_count', models.IntegerField(default=0, help_text='Jumlah log dengan EXP negatif')),
+                ('log_count', models.IntegerField(default=0, help_text='Jumlah semua log (termasuk EXP 0)')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exp_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'EXP Daily Rollup',
+                'verbose_name_plural': 'EXP Daily Rollups',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='core_expdai_user_id_7c622c_idx')],
+                'unique_together': {('user', 'day', 'activity_type')},
+            },
+        ),
+    ]
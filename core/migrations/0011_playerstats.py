@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_player_stats(apps, schema_editor):
+    """Hitung counter awal untuk semua user yang sudah ada"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    PlayerStats = apps.get_model('core', 'PlayerStats')
+    sources = [
+        (apps.get_model('core', 'Attendance'), {
+            'dungeons_attended': Count('id', filter=Q(attended=True)),
+        }),
+        (apps.get_model('core', 'SidequestSubmission'), {
+            'sidequests_submitted': Count('id'),
+            'sidequests_graded': Count('id', filter=Q(grade__isnull=False)),
+        }),
+        (apps.get_model('core', 'Boss'), {
+            'boss_battles': Count('id'),
+        }),
+        (apps.get_model('core', 'Punishment'), {
+            'punishments': Count('id'),
+            'resolved_punishments': Count('id', filter=Q(resolved=True)),
+        }),
+        (apps.get_model('core', 'ExpLog'), {
+            'exp_earned': Sum('exp_earned', filter=Q(exp_earned__gt=0)),
+            'exp_lost': -Sum('exp_earned', filter=Q(exp_earned__lt=0)),
+        }),
+    ]
+
+    stats = {user_id: {} for user_id in User.objects.values_list('pk', flat=True)}
+    for model, aggregates in sources:
+        rows = model.objects.values('user_id').annotate(
+            **{f'{field}_total': aggregate for field, aggregate in aggregates.items()}
+        ).order_by()
+        for row in rows:
+            if row['user_id'] in stats:
+                stats[row['user_id']].update({field: row[f'{field}_total'] or 0 for field in aggregates})
+
+    PlayerStats.objects.bulk_create(
+        [PlayerStats(user_id=user_id, **values) for user_id, values in stats.items()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0010_expdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('dungeons_attended', models.IntegerField(default=0)),
+                ('sidequests_submitted', models.IntegerField(default=0)),
+                ('sidequests_graded', models.IntegerField(default=0)),
+                ('boss_battles', models.IntegerField(default=0)),
+                ('punishments', models.IntegerField(default=0)),
+                ('resolved_punishments', models.IntegerField(default=0)),
+                ('exp_earned', models.IntegerField(default=0, help_text='Total EXP positif')),
+                ('exp_lost', models.IntegerField(default=0, help_text='Total EXP negatif (nilai absolut)')),
+            ],
+            options={
+                'verbose_name': 'Player Stats',
+                'verbose_name_plural': 'Player Stats',
+            },
+        ),
+        migrations.RunPython(populate_player_stats, migrations.RunPython.noop),
+    ]
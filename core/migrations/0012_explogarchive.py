@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_playerstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Path segment relatif terhadap EXP_ARCHIVE_ROOT', max_length=255)),
+                ('offset', models.BigIntegerField(help_text='Byte offset gzip member di segment')),
+                ('length', models.BigIntegerField(help_text='Panjang gzip member (bytes)')),
+                ('row_count', models.IntegerField(help_text='Jumlah ExpLog di member ini')),
+                ('activity_counts', models.JSONField(default=dict, help_text='Jumlah log per activity_type')),
+                ('first_log_at', models.DateTimeField(help_text='created_at ExpLog paling lama')),
+                ('last_log_at', models.DateTimeField(help_text='created_at ExpLog paling baru')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exp_log_archives', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'EXP Log Archive',
+                'verbose_name_plural': 'EXP Log Archives',
+                'ordering': ['-last_log_at'],
+                'indexes': [models.Index(fields=['user', '-last_log_at'], name='core_explog_user_id_2f16c0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:53
+
+import re
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+LEVEL_UP_PATTERN = re.compile(r'Level Up! (\d+) → (\d+)\. Bonus: (\d+) Honor Points')
+
+
+def convert_level_up_logs(apps, schema_editor):
+    """Buat LevelUpEvent dari ExpLog level up lama (description 'Level Up! X → Y. Bonus: N Honor Points')"""
+    ExpLog = apps.get_model('core', 'ExpLog')
+    LevelUpEvent = apps.get_model('core', 'LevelUpEvent')
+
+    logs = ExpLog.objects.filter(
+        activity_type='bonus',
+        description__contains='Level Up'
+    ).values_list('user_id', 'description', 'created_at').iterator()
+
+    events = []
+    for user_id, description, created_at in logs:
+        match = LEVEL_UP_PATTERN.search(description)
+        if match:
+            old_level, new_level, bonus = map(int, match.groups())
+            events.append(LevelUpEvent(
+                user_id=user_id,
+                old_level=old_level,
+                new_level=new_level,
+                honor_points_bonus=bonus,
+                created_at=created_at
+            ))
+    LevelUpEvent.objects.bulk_create(events, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_explogarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LevelUpEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_level', models.IntegerField()),
+                ('new_level', models.IntegerField()),
+                ('honor_points_bonus', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='level_up_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Level Up Event',
+                'verbose_name_plural': 'Level Up Events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='core_levelu_user_id_4940e3_idx')],
+            },
+        ),
+        migrations.RunPython(convert_level_up_logs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('core', '0013_levelupevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerRank',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('rank', models.IntegerField(db_index=True, help_text='1 = teratas')),
+            ],
+            options={
+                'verbose_name': 'Player Rank',
+                'verbose_name_plural': 'Player Ranks',
+                'ordering': ['rank'],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:04
+
+from datetime import date, datetime, time, timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def populate_leaderboard_scores(apps, schema_editor):
+    """
+    Bucket minggu ini, bulan ini dan all-time per activity dari ExpLog
+    (ExpDailyRollup hanya berisi log sejak migration 0010, jadi kosong untuk log lama)
+    """
+    ExpLog = apps.get_model('core', 'ExpLog')
+    LeaderboardScore = apps.get_model('core', 'LeaderboardScore')
+
+    today = timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    periods = [
+        ('week', week_start, week_start + timedelta(days=7)),
+        ('month', month_start, (month_start + timedelta(days=32)).replace(day=1)),
+        ('all', date(1970, 1, 1), None),
+    ]
+
+    scores = {}
+    for period, start, end in periods:
+        # Awal periode di timezone lokal, sama dengan hari yang dipakai record_exp_logs
+        rows = ExpLog.objects.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(start, time.min))
+        ).values('user_id', 'activity_type').annotate(total=Sum('exp_earned')).order_by()
+        expires_at = timezone.make_aware(datetime.combine(end, time.min)) if end else None
+        for row in rows:
+            for activity_type in ('', row['activity_type']):
+                if period == 'all' and not activity_type:
+                    continue
+                key = (row['user_id'], period, start, activity_type, expires_at)
+                scores[key] = scores.get(key, 0) + (row['total'] or 0)
+
+    LeaderboardScore.objects.bulk_create(
+        [
+            LeaderboardScore(
+                user_id=user_id,
+                period=period,
+                period_start=start,
+                activity_type=activity_type,
+                score=score,
+                expires_at=expires_at
+            )
+            for (user_id, period, start, activity_type, expires_at), score in scores.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_playerrank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'This Week'), ('month', 'This Month'), ('all', 'All Time')], max_length=10)),
+                ('period_start', models.DateField(help_text='Hari pertama periode (timezone lokal)')),
+                ('activity_type', models.CharField(blank=True, default='', help_text='Kosong = semua activity', max_length=20)),
+                ('score', models.IntegerField(default=0, help_text='Net EXP di bucket ini')),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, help_text='Kosong = tidak expire', null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Score',
+                'verbose_name_plural': 'Leaderboard Scores',
+                'indexes': [models.Index(fields=['period', 'period_start', 'activity_type', '-score', 'user'], name='core_leaderboard_board_idx')],
+                'unique_together': {('user', 'period', 'period_start', 'activity_type')},
+            },
+        ),
+        migrations.RunPython(populate_leaderboard_scores, migrations.RunPython.noop),
+    ]
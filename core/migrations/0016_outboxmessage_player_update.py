@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_leaderboardscore'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='kind',
+            field=models.CharField(choices=[('notification', 'Notification'), ('leaderboard', 'Leaderboard Update'), ('player_update', 'Player Stats Update')], help_text='Tipe message', max_length=20),
+        ),
+    ]
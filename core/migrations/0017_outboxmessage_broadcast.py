@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_outboxmessage_player_update'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='kind',
+            field=models.CharField(choices=[('notification', 'Notification'), ('leaderboard', 'Leaderboard Update'), ('player_update', 'Player Stats Update'), ('broadcast', 'Broadcast Notification')], help_text='Tipe message', max_length=20),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_outboxmessage_broadcast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(default='info', help_text='Tipe notification (info, level_up, punishment, ...)', max_length=20)),
+                ('message', models.TextField(help_text='Notification message')),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Data tambahan untuk client')),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification',
+                'verbose_name_plural': 'Notifications',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='core_notification_seq_idx'), models.Index(condition=models.Q(('is_read', False)), fields=['user'], name='core_notification_unread_idx')],
+            },
+        ),
+    ]
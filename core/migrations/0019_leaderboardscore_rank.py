@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def populate_board_ranks(apps, schema_editor):
+    """Rank awal setiap bucket (score desc, user id sebagai tie-break)"""
+    LeaderboardScore = apps.get_model('core', 'LeaderboardScore')
+    positions = LeaderboardScore.objects.filter(user__role='player').annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('period'), F('period_start'), F('activity_type')],
+            order_by=[F('score').desc(), F('user_id').asc()]
+        )
+    ).values_list('pk', 'position')
+    LeaderboardScore.objects.bulk_update(
+        [LeaderboardScore(pk=pk, rank=position) for pk, position in positions],
+        ['rank'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboardscore',
+            name='rank',
+            field=models.IntegerField(blank=True, help_text='Posisi di board (1 = teratas), dihitung ulang oleh refresh_board_ranks', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardscore',
+            index=models.Index(fields=['period', 'period_start', 'activity_type', 'rank'], name='core_leaderboard_rank_idx'),
+        ),
+        migrations.RunPython(populate_board_ranks, migrations.RunPython.noop),
+    ]
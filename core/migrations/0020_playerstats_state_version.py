@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:00
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_leaderboardscore_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstats',
+            name='state_version',
+            field=models.BigIntegerField(default=core.models.initial_state_version, help_text='Naik setiap kali state dashboard berubah (ETag endpoint AJAX, lihat core/player_state.py)'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_playerstats_state_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='overlays',
+            field=models.JSONField(blank=True, default=dict, help_text='Data tambahan per user untuk broadcast ({user_id: dict})'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipients',
+            field=models.JSONField(blank=True, help_text='Batasi broadcast ke user IDs ini (kosong = semua user di role)', null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='role',
+            field=models.CharField(blank=True, default='', help_text='Role penerima broadcast (kosong untuk notification per user)', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(blank=True, help_text='Kosong untuk broadcast per role', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['role', 'id'], name='core_notification_role_seq_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
 
@@ -68,6 +69,222 @@ class ExpLog(models.Model):
         return f"{self.user.username} - {self.get_activity_type_display()} (+{self.exp_earned} EXP)"
 
 
+class ExpDailyRollup(models.Model):
+    """
+    Ringkasan ExpLog per (user, hari, activity_type)
+    Di-update di transaction yang sama dengan setiap insert ExpLog (lihat core/rollups.py),
+    jadi chart dan total di halaman player cukup membaca O(hari) rows
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='exp_rollups'
+    )
+    day = models.DateField(help_text="Tanggal (timezone lokal) dari ExpLog")
+    activity_type = models.CharField(
+        max_length=20,
+        choices=ExpLog.ACTIVITY_TYPES,
+        default='other'
+    )
+    exp_earned = models.IntegerField(default=0, help_text="Total EXP positif")
+    earned_count = models.IntegerField(default=0, help_text="Jumlah log dengan EXP positif")
+    exp_lost = models.IntegerField(default=0, help_text="Total EXP negatif (nilai absolut)")
+    lost_count = models.IntegerField(default=0, help_text="Jumlah log dengan EXP negatif")
+    log_count = models.IntegerField(default=0, help_text="Jumlah semua log (termasuk EXP 0)")
+    
+    class Meta:
+        ordering = ['-day']
+        verbose_name = 'EXP Daily Rollup'
+        verbose_name_plural = 'EXP Daily Rollups'
+        unique_together = ['user', 'day', 'activity_type']
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.day} {self.get_activity_type_display()} (+{self.exp_earned}/-{self.exp_lost} EXP)"
+
+
+class LevelUpEvent(models.Model):
+    """
+    Level up player (ditulis oleh add_exp / add_exp_bulk)
+    Dipakai dashboard, honor history dan polling ajax_user_stats dengan index (user, created_at),
+    menggantikan pencarian description 'Level Up' di ExpLog
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='level_up_events'
+    )
+    old_level = models.IntegerField()
+    new_level = models.IntegerField()
+    honor_points_bonus = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Level Up Event'
+        verbose_name_plural = 'Level Up Events'
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - Level {self.old_level} → {self.new_level}"
+    
+    @property
+    def description(self):
+        """Teks yang sama dengan ExpLog level up"""
+        return f"Level Up! {self.old_level} → {self.new_level}. Bonus: {self.honor_points_bonus} Honor Points"
+
+
+class PlayerRank(models.Model):
+    """
+    Posisi player di leaderboard, dihitung ulang dengan window function (lihat core/ranking.py)
+    Rank user, top N dan halaman K dibaca lewat index rank
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking'
+    )
+    rank = models.IntegerField(db_index=True, help_text="1 = teratas")
+    
+    class Meta:
+        ordering = ['rank']
+        verbose_name = 'Player Rank'
+        verbose_name_plural = 'Player Ranks'
+    
+    def __str__(self):
+        return f"#{self.rank} {self.user.username}"
+
+
+class LeaderboardScore(models.Model):
+    """
+    Skor EXP player di satu leaderboard bucket: periode (minggu/bulan/all-time) x activity_type
+    Di-increment di transaction yang sama dengan insert ExpLog (lihat core/boards.py),
+    bucket periode lama dihapus oleh command prune_leaderboard_scores setelah expires_at
+    """
+    PERIODS = [
+        ('week', 'This Week'),
+        ('month', 'This Month'),
+        ('all', 'All Time'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_scores'
+    )
+    period = models.CharField(max_length=10, choices=PERIODS)
+    period_start = models.DateField(help_text="Hari pertama periode (timezone lokal)")
+    activity_type = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        help_text="Kosong = semua activity"
+    )
+    score = models.IntegerField(default=0, help_text="Net EXP di bucket ini")
+    rank = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Posisi di board (1 = teratas), dihitung ulang oleh refresh_board_ranks"
+    )
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True, help_text="Kosong = tidak expire")
+
+    class Meta:
+        verbose_name = 'Leaderboard Score'
+        verbose_name_plural = 'Leaderboard Scores'
+        unique_together = ['user', 'period', 'period_start', 'activity_type']
+        indexes = [
+            models.Index(
+                fields=['period', 'period_start', 'activity_type', '-score', 'user'],
+                name='core_leaderboard_board_idx'
+            ),
+            models.Index(
+                fields=['period', 'period_start', 'activity_type', 'rank'],
+                name='core_leaderboard_rank_idx'
+            ),
+        ]
+
+    def __str__(self):
+        board = self.activity_type or 'all activities'
+        return f"{self.user.username} - {self.period} {self.period_start} {board}: {self.score}"
+
+
+class ExpLogArchive(models.Model):
+    """
+    Index untuk ExpLog yang sudah dipindah ke archive (lihat core/archive.py)
+    Satu row = log milik satu user di satu segment file (gzip member di offset tertentu),
+    diurutkan dari yang terbaru
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='exp_log_archives'
+    )
+    path = models.CharField(max_length=255, help_text="Path segment relatif terhadap EXP_ARCHIVE_ROOT")
+    offset = models.BigIntegerField(help_text="Byte offset gzip member di segment")
+    length = models.BigIntegerField(help_text="Panjang gzip member (bytes)")
+    row_count = models.IntegerField(help_text="Jumlah ExpLog di member ini")
+    activity_counts = models.JSONField(default=dict, help_text="Jumlah log per activity_type")
+    first_log_at = models.DateTimeField(help_text="created_at ExpLog paling lama")
+    last_log_at = models.DateTimeField(help_text="created_at ExpLog paling baru")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-last_log_at']
+        verbose_name = 'EXP Log Archive'
+        verbose_name_plural = 'EXP Log Archives'
+        indexes = [
+            models.Index(fields=['user', '-last_log_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.row_count} logs ({self.first_log_at:%Y-%m-%d} - {self.last_log_at:%Y-%m-%d})"
+
+
+def initial_state_version():
+    """
+    State version awal dari waktu sekarang (ms), jadi row PlayerStats yang dibuat
+    ulang tidak pernah memakai version (ETag) yang pernah dikirim sebelumnya
+    """
+    return int(timezone.now().timestamp() * 1000)
+
+
+class PlayerStats(models.Model):
+    """
+    Lifetime counters per player untuk dashboard dan profile (satu row per user)
+    Di-maintain oleh core/stats.py; cek dan perbaiki dengan command verify_player_stats
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    dungeons_attended = models.IntegerField(default=0)
+    sidequests_submitted = models.IntegerField(default=0)
+    sidequests_graded = models.IntegerField(default=0)
+    boss_battles = models.IntegerField(default=0)
+    punishments = models.IntegerField(default=0)
+    resolved_punishments = models.IntegerField(default=0)
+    exp_earned = models.IntegerField(default=0, help_text="Total EXP positif")
+    exp_lost = models.IntegerField(default=0, help_text="Total EXP negatif (nilai absolut)")
+    state_version = models.BigIntegerField(
+        default=initial_state_version,
+        help_text="Naik setiap kali state dashboard berubah (ETag endpoint AJAX, lihat core/player_state.py)"
+    )
+    
+    class Meta:
+        verbose_name = 'Player Stats'
+        verbose_name_plural = 'Player Stats'
+    
+    def __str__(self):
+        return f"{self.user.username} stats"
+
+
 class Dungeon(models.Model):
     """
     Model untuk pertemuan kelas (Dungeon)
@@ -419,7 +636,6 @@ class Punishment(models.Model):
     
     def apply_punishment(self):
         """Menerapkan punishment ke user"""
-        from django.utils import timezone
         from core.services import add_exp
         
         # Kurangi EXP
@@ -432,25 +648,40 @@ class Punishment(models.Model):
             )
         
         # Apply status effect jika ada
-        if self.status_effect:
-            # Set exp_multiplier berdasarkan effect type
-            exp_multiplier_map = {
-                'curse': 0.5,      # 50% EXP
-                'weakness': 0.75,   # 75% EXP
-                'silence': 0.9,     # 90% EXP
-                'fatigue': 0.8,     # 80% EXP
-            }
-            exp_multiplier = exp_multiplier_map.get(self.status_effect, 1.0)
-            
-            StatusEffect.objects.create(
-                user=self.user,
-                effect_type=self.status_effect,
-                description=f"Punishment effect: {self.description}",
-                exp_multiplier=exp_multiplier,
-                start_date=timezone.now(),
-                end_date=timezone.now() + timezone.timedelta(days=self.duration_days) if self.duration_days > 0 else None,
-                is_active=True
-            )
+        status_effect = self.build_status_effect()
+        if status_effect:
+            status_effect.save()
+
+    def build_status_effect(self):
+        """
+        Buat StatusEffect (belum disimpan) sesuai punishment ini
+
+        Returns:
+            StatusEffect instance atau None jika punishment tanpa status effect
+        """
+        from django.utils import timezone
+
+        if not self.status_effect:
+            return None
+
+        # Set exp_multiplier berdasarkan effect type
+        exp_multiplier_map = {
+            'curse': 0.5,      # 50% EXP
+            'weakness': 0.75,   # 75% EXP
+            'silence': 0.9,     # 90% EXP
+            'fatigue': 0.8,     # 80% EXP
+        }
+        exp_multiplier = exp_multiplier_map.get(self.status_effect, 1.0)
+
+        return StatusEffect(
+            user=self.user,
+            effect_type=self.status_effect,
+            description=f"Punishment effect: {self.description}",
+            exp_multiplier=exp_multiplier,
+            start_date=timezone.now(),
+            end_date=timezone.now() + timezone.timedelta(days=self.duration_days) if self.duration_days > 0 else None,
+            is_active=True
+        )
 
 
 class StatusEffect(models.Model):
@@ -508,6 +739,7 @@ class StatusEffect(models.Model):
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['is_active', '-start_date']),
             models.Index(fields=['effect_type', 'is_active']),
+            models.Index(fields=['is_active', 'end_date']),
         ]
     
     def __str__(self):
@@ -527,3 +759,138 @@ class StatusEffect(models.Model):
         """Deactivate effect"""
         self.is_active = False
         self.save()
+
+
+class Notification(models.Model):
+    """
+    Inbox notification per user (level up, punishment, status effect, ...)
+    Ditulis bersama OutboxMessage-nya, jadi notifikasi yang dikirim saat socket
+    client terputus tetap bisa diambil ketika reconnect. ID dipakai sebagai seq:
+    naik monoton, jadi client cukup menyimpan seq terakhir yang diterima.
+    Dihapus oleh command prune_notifications setelah NOTIFICATION_TTL_DAYS.
+
+    Broadcast per role disimpan sebagai satu row bersama (user kosong, role diisi)
+    untuk semua penerimanya. Row bersama tidak punya status read per user.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications',
+        help_text="Kosong untuk broadcast per role"
+    )
+    role = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+        help_text="Role penerima broadcast (kosong untuk notification per user)"
+    )
+    recipients = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Batasi broadcast ke user IDs ini (kosong = semua user di role)"
+    )
+    overlays = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Data tambahan per user untuk broadcast ({user_id: dict})"
+    )
+    notification_type = models.CharField(
+        max_length=20,
+        default='info',
+        help_text="Tipe notification (info, level_up, punishment, ...)"
+    )
+    message = models.TextField(help_text="Notification message")
+    data = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Data tambahan untuk client"
+    )
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Notification'
+        verbose_name_plural = 'Notifications'
+        indexes = [
+            # Catch-up: WHERE user_id = ? AND id > seq ORDER BY id
+            models.Index(fields=['user', 'id'], name='core_notification_seq_idx'),
+            # Unread counter: hanya row yang belum dibaca
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='core_notification_unread_idx'),
+            # Catch-up broadcast: WHERE user_id IS NULL AND role = ? AND id > seq
+            models.Index(fields=['role', 'id'], condition=models.Q(user__isnull=True),
+                         name='core_notification_role_seq_idx'),
+        ]
+    
+    @property
+    def seq(self):
+        return self.pk
+    
+    def __str__(self):
+        recipient = self.user.username if self.user_id else f'role:{self.role}'
+        return f"{recipient} #{self.pk}: {self.message}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Transactional outbox untuk side effects real-time (notifications, broadcast notification
+    per role, leaderboard broadcast, stats dashboard player)
+    Ditulis di dalam transaction yang sama dengan perubahan data, lalu dikirim
+    setelah commit oleh command deliver_outbox
+    """
+    KIND_CHOICES = [
+        ('notification', 'Notification'),
+        ('leaderboard', 'Leaderboard Update'),
+        ('player_update', 'Player Stats Update'),
+        ('broadcast', 'Broadcast Notification'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        help_text="Tipe message"
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Data yang dikirim ke channel layer"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text="Status pengiriman"
+    )
+    attempts = models.IntegerField(
+        default=0,
+        help_text="Jumlah percobaan pengiriman"
+    )
+    last_error = models.TextField(
+        blank=True,
+        help_text="Error dari percobaan pengiriman terakhir"
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Message tidak dikirim sebelum waktu ini (retry backoff)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
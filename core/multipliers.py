@@ -0,0 +1,169 @@
+"""
+Cached EXP multiplier dari status effects per player
+
+Hasil perkalian exp_multiplier semua StatusEffect aktif disimpan di cache per user,
+bersama waktu expire effect terdekat. add_exp tidak perlu membaca StatusEffect
+selama entry masih valid. Entry di-invalidate ketika StatusEffect dibuat, diubah
+atau dihapus (lihat core/signals/handlers.py), dan dianggap stale sendiri ketika
+effect terdekat sudah expired.
+
+Setiap user juga punya generation counter. Pembaca membaca generation sebelum
+query StatusEffect dan menyimpannya di entry; invalidation menaikkan generation.
+Entry yang ditulis pembaca setelah invalidation yang bersamaan (on_commit
+set_many dari snapshot lama) membawa generation lama dan diabaikan, jadi
+multiplier lama tidak bisa kembali ke cache.
+
+Cache harus di-share oleh semua process (web workers, deliver_outbox, cron):
+invalidation di satu process tidak terlihat oleh LocMemCache process lain.
+Lihat CACHE_REDIS_URL di settings.
+
+Honor tier tidak di-cache: dihitung dari honor_points row user yang sudah di-lock,
+jadi perubahan tier langsung berlaku tanpa invalidation.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Batas umur entry, jaga-jaga jika ada update StatusEffect yang tidak lewat signal
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f'exp_multiplier_{user_id}'
+
+
+def _generation_key(user_id):
+    return f'exp_multiplier_generation_{user_id}'
+
+
+def _get_generations(user_ids, cached):
+    """
+    Generation setiap user dari hasil get_many; counter yang belum ada dimulai dari
+    waktu sekarang, jadi generation baru tidak pernah sama dengan entry lama
+    """
+    generations = {}
+    for user_id in user_ids:
+        key = _generation_key(user_id)
+        generation = cached.get(key)
+        if generation is None:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            generation = cache.get(key)
+        generations[user_id] = generation
+    return generations
+
+
+def _store_entries(entries):
+    """
+    Tulis entry yang generation-nya masih sama dengan generation saat ini
+    (dipanggil setelah commit)
+    """
+    current = cache.get_many([_generation_key(user_id) for user_id in entries])
+    cache.set_many({
+        _cache_key(user_id): entry
+        for user_id, entry in entries.items()
+        if current.get(_generation_key(user_id)) == entry['generation']
+    }, CACHE_TIMEOUT)
+
+
+def _load_status_effect_multipliers(user_ids, now):
+    """
+    Hitung multiplier dari database
+    Effect yang sudah lewat end_date diabaikan; deactivation dilakukan oleh
+    expire_status_effects() (lihat command expire_status_effects)
+
+    Returns:
+        dict: {user_id: {'multiplier': float, 'expires_at': datetime or None}}
+    """
+    from .models import StatusEffect
+
+    entries = {user_id: {'multiplier': 1.0, 'expires_at': None} for user_id in user_ids}
+    effects = StatusEffect.objects.filter(
+        user_id__in=user_ids,
+        is_active=True
+    ).values_list('user_id', 'exp_multiplier', 'end_date')
+
+    for user_id, exp_multiplier, end_date in effects:
+        if end_date is not None and now > end_date:
+            continue
+        entry = entries[user_id]
+        entry['multiplier'] *= float(exp_multiplier)
+        if end_date is not None and (entry['expires_at'] is None or end_date < entry['expires_at']):
+            entry['expires_at'] = end_date
+
+    return entries
+
+
+def get_status_effect_multipliers(user_ids):
+    """
+    Multiplier gabungan dari semua StatusEffect aktif untuk setiap user
+
+    Entry yang tidak ada di cache, sudah expired atau dari generation lama dihitung
+    ulang dengan satu query (read-only, tidak ada write di hot path add_exp).
+    Entry baru ditulis ke cache setelah transaction commit, jadi data dari transaction
+    yang di-rollback tidak pernah masuk cache, dan hanya jika generation belum naik.
+
+    Args:
+        user_ids: Iterable of user IDs
+
+    Returns:
+        dict: {user_id: float}
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    now = timezone.now()
+    # Entry dan generation dalam satu round trip; generation dibaca sebelum query
+    cached = cache.get_many(
+        [_cache_key(user_id) for user_id in user_ids] + [_generation_key(user_id) for user_id in user_ids]
+    )
+    generations = _get_generations(user_ids, cached)
+
+    multipliers = {}
+    stale = []
+    for user_id in user_ids:
+        entry = cached.get(_cache_key(user_id))
+        if (
+            entry is None
+            or entry.get('generation') != generations[user_id]
+            or (entry['expires_at'] is not None and now > entry['expires_at'])
+        ):
+            stale.append(user_id)
+        else:
+            multipliers[user_id] = entry['multiplier']
+
+    if stale:
+        entries = _load_status_effect_multipliers(stale, now)
+        for user_id, entry in entries.items():
+            multipliers[user_id] = entry['multiplier']
+            entry['generation'] = generations[user_id]
+        transaction.on_commit(lambda: _store_entries(entries))
+
+    return multipliers
+
+
+def _bump_generations(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+    for user_id in user_ids:
+        key = _generation_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Counter belum ada: generation baru dari waktu sekarang
+            cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def invalidate_exp_multipliers(user_ids):
+    """
+    Buang cached multiplier untuk user tertentu dan naikkan generation-nya
+
+    Dipanggil lagi setelah commit supaya pembaca yang membaca snapshot lama
+    (sebelum commit) tidak bisa menulis entry stale.
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return
+    _bump_generations(user_ids)
+    transaction.on_commit(lambda: _bump_generations(user_ids))
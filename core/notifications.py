@@ -1,5 +1,10 @@
 """
 Notification system untuk real-time notifications via WebSocket
+
+Fungsi send_*/broadcast_* tidak langsung mengirim ke channel layer: message ditulis
+ke OutboxMessage di dalam transaction aktif dan dikirim setelah commit oleh
+command deliver_outbox (lihat core/outbox.py). Fungsi deliver_* melakukan
+pengiriman sebenarnya.
 """
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
@@ -8,7 +13,7 @@ import json
 
 def send_notification(user_id, message, notification_type='info', data=None):
     """
-    Send real-time notification to specific user
+    Queue real-time notification to specific user
     
     Args:
         user_id: User ID to send notification to
@@ -16,6 +21,15 @@ def send_notification(user_id, message, notification_type='info', data=None):
         notification_type: Type of notification ('info', 'success', 'warning', 'error', 'level_up', 'achievement', 'sidequest', 'punishment')
         data: Additional data to send with notification
     """
+    from core.outbox import enqueue_notifications
+    enqueue_notifications([user_id], message, notification_type, data)
+
+
+def deliver_notification(user_id, message, notification_type='info', data=None, seq=None):
+    """
+    Kirim notification ke group user lewat channel layer (dipanggil oleh outbox worker)
+    seq = ID Notification di inbox (core/inbox.py), disimpan client untuk catch-up
+    """
     channel_layer = get_channel_layer()
     if channel_layer:
         async_to_sync(channel_layer.group_send)(
@@ -24,7 +38,52 @@ def send_notification(user_id, message, notification_type='info', data=None):
                 'type': 'notification_message',
                 'message': message,
                 'notification_type': notification_type,
-                'data': data or {}
+                'data': data or {},
+                'seq': seq
+            }
+        )
+
+
+def role_group_name(role):
+    """Group channel layer yang di-join setiap NotificationConsumer dengan role ini"""
+    return f'notifications_role_{role}'
+
+
+def broadcast_notification(message, notification_type='info', data=None, role='player', user_ids=None, overlays=None):
+    """
+    Queue notification untuk banyak user sekaligus: satu outbox row dan satu group_send
+    ke group role, berapa pun jumlah penerimanya
+    
+    Args:
+        message: Notification message
+        notification_type: Type of notification
+        data: Data yang sama untuk semua penerima
+        role: Role penerima ('player' / 'admin')
+        user_ids: Batasi penerima ke user IDs ini (None = semua user di role)
+        overlays: {user_id: dict} data personal per user, di-merge ke `data` oleh consumer
+    """
+    from core.outbox import enqueue_broadcast_notification
+    enqueue_broadcast_notification(role, message, notification_type, data, user_ids, overlays)
+
+
+def deliver_broadcast_notification(role, message, notification_type='info', data=None, user_ids=None, overlays=None,
+                                   seq=None):
+    """
+    Kirim broadcast notification ke group role lewat channel layer (dipanggil oleh outbox worker)
+    seq = ID row bersama di inbox (core/inbox.py)
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        async_to_sync(channel_layer.group_send)(
+            role_group_name(role),
+            {
+                'type': 'notification_broadcast',
+                'message': message,
+                'notification_type': notification_type,
+                'data': data or {},
+                'user_ids': user_ids,
+                'overlays': overlays or {},
+                'seq': seq
             }
         )
 
@@ -70,6 +129,104 @@ def send_sidequest_notification(user_id, sidequest_title, sidequest_id):
     )
 
 
+# Field stats yang berubah karena perubahan EXP / honor
+EXP_STAT_FIELDS = ['current_exp', 'total_exp', 'current_level', 'exp_progress', 'exp_needed', 'honor_points', 'honor_tier']
+HONOR_STAT_FIELDS = ['honor_points', 'honor_tier']
+
+
+def build_player_stats(user, fields=EXP_STAT_FIELDS):
+    """
+    Stats player untuk dashboard (format sama dengan ajax_user_stats, tanpa query)
+    
+    Args:
+        user: User instance dengan nilai terbaru
+        fields: Field yang diambil
+    """
+    from core.levels import get_level_curve
+    from core.services import check_honor_privileges
+    
+    progress = get_level_curve().progress(user.total_exp, user.current_level)
+    stats = {
+        'current_exp': user.current_exp,
+        'total_exp': user.total_exp,
+        'current_level': user.current_level,
+        'honor_points': user.honor_points,
+        'exp_progress': round(progress['exp_progress'], 2),
+        'exp_needed': progress['exp_needed'],
+        'honor_tier': check_honor_privileges(user)['honor_tier'],
+    }
+    return {field: stats[field] for field in fields}
+
+
+def serialize_activity(exp_log):
+    """Satu ExpLog untuk recent activities di dashboard"""
+    return {
+        'id': exp_log.id,
+        'activity_type': exp_log.get_activity_type_display(),
+        'exp_earned': exp_log.exp_earned,
+        'description': exp_log.description,
+        'created_at': exp_log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def send_player_updates(users, exp_logs=(), fields=EXP_STAT_FIELDS):
+    """
+    Queue stats terbaru (hanya `fields`) dan activity baru untuk setiap user (satu INSERT)
+    Dashboard menerima message ini lewat NotificationConsumer, jadi tidak perlu polling.
+    State version (ETag endpoint AJAX) users ikut naik di transaction yang sama.
+    
+    Args:
+        users: Iterable of User instances dengan nilai terbaru
+        exp_logs: ExpLog baru (sudah disimpan) milik users
+        fields: Field stats yang berubah
+    """
+    from core.outbox import enqueue_player_updates
+    from core.player_state import mark_player_state_changed
+    
+    users = list(users)
+    mark_player_state_changed(user.pk for user in users)
+    
+    activities = {}
+    for exp_log in exp_logs:
+        activities.setdefault(exp_log.user_id, []).append(serialize_activity(exp_log))
+    
+    enqueue_player_updates([
+        {
+            'user_id': user.pk,
+            'stats': build_player_stats(user, fields),
+            # Terbaru dulu, sama dengan urutan recent activities
+            'activities': activities.get(user.pk, [])[::-1]
+        }
+        for user in users
+    ])
+
+
+def deliver_player_update(user_id, stats, activities):
+    """Kirim stats/activity baru ke group user lewat channel layer (dipanggil oleh outbox worker)"""
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        async_to_sync(channel_layer.group_send)(
+            f'notifications_{user_id}',
+            {
+                'type': 'player_update',
+                'stats': stats,
+                'activities': activities
+            }
+        )
+
+
+def broadcast_sidequest_notification(sidequest_title, sidequest_id):
+    """Send new sidequest available notification ke semua player (satu broadcast)"""
+    broadcast_notification(
+        message=f'📝 New Sidequest Available: {sidequest_title}',
+        notification_type='sidequest',
+        data={
+            'sidequest_title': sidequest_title,
+            'sidequest_id': sidequest_id
+        }
+    )
+
+
 def send_punishment_notification(user_id, punishment_type, severity, exp_penalty):
     """Send punishment applied notification"""
     send_notification(
@@ -84,32 +241,77 @@ def send_punishment_notification(user_id, punishment_type, severity, exp_penalty
     )
 
 
+def send_status_effect_expired_notification(user_id, effect_types):
+    """Send status effect expired notification"""
+    send_notification(
+        user_id=user_id,
+        message=f'✨ Status effect expired: {", ".join(effect_types)}',
+        notification_type='info',
+        data={
+            'effect_types': effect_types
+        }
+    )
+
+
 def broadcast_leaderboard_update():
-    """Broadcast leaderboard update to all connected clients"""
+    """Queue leaderboard update broadcast to all connected clients"""
+    from core.outbox import enqueue_leaderboard_update
+    enqueue_leaderboard_update()
+
+
+def deliver_leaderboard_update():
+    """
+    Broadcast delta setiap board ke group board tersebut (dipanggil oleh outbox worker)
+    Board yang top players-nya tidak berubah sejak broadcast terakhir dilewati
+
+    Returns:
+        bool: False jika publish lain sedang berjalan (tidak ada yang dikirim,
+              update harus dicoba lagi)
+    """
     channel_layer = get_channel_layer()
     if channel_layer:
-        from accounts.models import User
+        from core.leaderboard import leaderboard_group_name, publish_leaderboard
         
-        # Get updated leaderboard data
-        players = User.objects.filter(role='player').order_by(
-            '-current_level', '-total_exp', '-honor_points'
-        )[:20]
+        deltas = publish_leaderboard()
+        if deltas is None:
+            return False
+        for board, delta in deltas:
+            # Di-encode sekali di sini, consumer meneruskan text apa adanya ke setiap client
+            async_to_sync(channel_layer.group_send)(
+                leaderboard_group_name(board),
+                {
+                    'type': 'leaderboard_delta',
+                    'text': json.dumps(delta)
+                }
+            )
+    return True
+
+
+def deliver_presence_update():
+    """
+    Broadcast diff presence (joined + left) ke semua client online status
+    Dipanggil oleh OnlineStatusConsumer di akhir window dan oleh outbox worker
+    (untuk player yang expire tanpa disconnect)
+
+    Returns:
+        bool: False jika publish lain sedang berjalan (tidak ada yang dikirim,
+              perubahan harus di-flush lagi)
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        from core.presence import publish_presence
         
-        leaderboard = []
-        for idx, player in enumerate(players, start=1):
-            leaderboard.append({
-                'rank': idx,
-                'username': player.username,
-                'level': player.current_level,
-                'total_exp': player.total_exp,
-                'honor_points': player.honor_points
-            })
+        diff = publish_presence()
+        if diff is False:
+            return False
+        if diff is None:
+            return True
         
         async_to_sync(channel_layer.group_send)(
-            'leaderboard_updates',
+            'online_status',
             {
-                'type': 'leaderboard_update',
-                'data': leaderboard
+                'type': 'presence_diff',
+                'text': json.dumps(diff)
             }
         )
-
+    return True
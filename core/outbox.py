@@ -0,0 +1,267 @@
+"""
+Transactional outbox untuk notifications, broadcast notification per role, leaderboard
+broadcast dan stats dashboard player
+
+Message ditulis ke tabel OutboxMessage di dalam transaction yang sama dengan perubahan
+data, jadi request tidak pernah menunggu channel layer dan message dari transaction
+yang di-rollback tidak pernah terkirim. Notification per user dan broadcast per role juga
+disimpan di inbox (core/inbox.py) supaya bisa diambil ulang setelah reconnect. Command deliver_outbox mengirim message
+setelah commit, dengan retry (exponential backoff) jika channel layer gagal.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .leaderboard import acquire_broadcast_slot, get_broadcast_interval
+from .models import OutboxMessage
+
+# Batas backoff antar retry (detik)
+MAX_RETRY_DELAY = 300
+
+
+_local = threading.local()
+
+
+@contextmanager
+def batch():
+    """
+    Kumpulkan semua message yang di-queue di dalam block dan tulis dengan satu INSERT
+
+    Usage:
+        with outbox.batch():
+            for user_id in user_ids:
+                send_notification(user_id, ...)
+    """
+    if getattr(_local, 'buffer', None) is not None:
+        # Nested batch ikut ke batch paling luar
+        yield
+        return
+
+    _local.buffer = []
+    try:
+        yield
+        buffered = _local.buffer
+    finally:
+        _local.buffer = None
+    if buffered:
+        _create(buffered)
+
+
+def _create(messages):
+    """Simpan notification per user dan broadcast ke inbox (seq masuk payload), lalu tulis outbox"""
+    from .inbox import store_broadcasts, store_notifications
+    store_notifications([message for message in messages if message.kind == 'notification'])
+    store_broadcasts([message for message in messages if message.kind == 'broadcast'])
+    return OutboxMessage.objects.bulk_create(messages)
+
+
+def _enqueue(messages):
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        buffer.extend(messages)
+        return messages
+    return _create(messages)
+
+
+def enqueue_notifications(user_ids, message, notification_type='info', data=None):
+    """
+    Queue notification yang sama untuk beberapa user sekaligus (satu INSERT)
+
+    Args:
+        user_ids: Iterable of user IDs
+        message: Notification message
+        notification_type: Type of notification
+        data: Additional data to send with notification
+
+    Returns:
+        list: OutboxMessage instances
+    """
+    return _enqueue([
+        OutboxMessage(
+            kind='notification',
+            payload={
+                'user_id': user_id,
+                'message': message,
+                'notification_type': notification_type,
+                'data': data or {}
+            }
+        )
+        for user_id in user_ids
+    ])
+
+
+def enqueue_broadcast_notification(role, message, notification_type='info', data=None, user_ids=None, overlays=None):
+    """
+    Queue satu notification untuk semua user dengan role tertentu (satu row, satu group_send)
+
+    Args:
+        role: Role penerima ('player' / 'admin')
+        message: Notification message
+        notification_type: Type of notification
+        data: Data yang sama untuk semua penerima
+        user_ids: Batasi penerima ke user IDs ini (None = semua user di role)
+        overlays: {user_id: dict} data tambahan per user, di-merge ke `data`
+
+    Returns:
+        OutboxMessage instance
+    """
+    return _enqueue([
+        OutboxMessage(
+            kind='broadcast',
+            payload={
+                'role': role,
+                'message': message,
+                'notification_type': notification_type,
+                'data': data or {},
+                'user_ids': None if user_ids is None else sorted(set(user_ids)),
+                # Key JSON selalu string
+                'overlays': {str(user_id): overlay for user_id, overlay in (overlays or {}).items()}
+            }
+        )
+    ])[0]
+
+
+def enqueue_player_updates(payloads):
+    """
+    Queue stats/activity update untuk dashboard player (satu INSERT)
+
+    Args:
+        payloads: List of {'user_id', 'stats', 'activities'} (lihat send_player_updates)
+
+    Returns:
+        list: OutboxMessage instances
+    """
+    return _enqueue([OutboxMessage(kind='player_update', payload=payload) for payload in payloads])
+
+
+def enqueue_leaderboard_update():
+    """
+    Queue leaderboard broadcast
+    Data leaderboard dihitung saat dikirim, jadi beberapa update yang pending
+    digabung menjadi satu broadcast oleh deliver_outbox()
+    """
+    return _enqueue([OutboxMessage(kind='leaderboard')])[0]
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(2 ** attempts, MAX_RETRY_DELAY))
+
+
+def _error_message(error):
+    return f'{type(error).__name__}: {error}'
+
+
+def _attempt(func, *args, **kwargs):
+    """Jalankan func, return error message atau None jika berhasil"""
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        return _error_message(e)
+    return None
+
+
+def deliver_outbox(batch_size=100, max_attempts=5):
+    """
+    Kirim satu batch message pending ke channel layer
+
+    Message di-lock selama pengiriman (SKIP LOCKED jika database mendukung),
+    jadi beberapa worker bisa berjalan bersamaan tanpa mengirim message yang sama.
+
+    Args:
+        batch_size: Jumlah message maksimal per batch
+        max_attempts: Jumlah percobaan sebelum message ditandai failed
+
+    Returns:
+        dict: {
+            'delivered': int,
+            'retried': int,
+            'failed': int,
+            'deferred': int (leaderboard update yang ditunda ke window berikutnya)
+        }
+    """
+    from .notifications import (
+        deliver_notification, deliver_broadcast_notification, deliver_leaderboard_update, deliver_player_update
+    )
+
+    now = timezone.now()
+    result = {'delivered': 0, 'retried': 0, 'failed': 0, 'deferred': 0}
+
+    with transaction.atomic():
+        pending = OutboxMessage.objects.filter(status='pending', available_at__lte=now).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        messages = list(pending[:batch_size])
+        if not messages:
+            return result
+
+        errors = {}
+        leaderboard = []
+        for message in messages:
+            if message.kind == 'leaderboard':
+                leaderboard.append(message)
+            elif message.kind == 'player_update':
+                errors[message.pk] = _attempt(deliver_player_update, **message.payload)
+            elif message.kind == 'broadcast':
+                errors[message.pk] = _attempt(deliver_broadcast_notification, **message.payload)
+            else:
+                errors[message.pk] = _attempt(deliver_notification, **message.payload)
+
+        # Semua leaderboard update di batch ini cukup satu broadcast,
+        # dan maksimal satu broadcast per window (sisanya ditunda ke window berikutnya).
+        # Jika publish lain sedang berjalan, update juga ditunda (tetap pending)
+        deferred = set()
+        if leaderboard:
+            published = False
+            if acquire_broadcast_slot():
+                try:
+                    published = deliver_leaderboard_update() is not False
+                    error = None
+                except Exception as e:
+                    published, error = True, _error_message(e)
+            if published:
+                for message in leaderboard:
+                    errors[message.pk] = error
+            else:
+                deferred = {message.pk for message in leaderboard}
+
+        for message in messages:
+            if message.pk in deferred:
+                message.available_at = now + timedelta(seconds=get_broadcast_interval())
+                result['deferred'] += 1
+                continue
+            message.attempts += 1
+            error = errors[message.pk]
+            if error is None:
+                message.status = 'delivered'
+                message.delivered_at = now
+                message.last_error = ''
+                result['delivered'] += 1
+            elif message.attempts >= max_attempts:
+                message.status = 'failed'
+                message.last_error = error
+                result['failed'] += 1
+            else:
+                message.available_at = now + _retry_delay(message.attempts)
+                message.last_error = error
+                result['retried'] += 1
+
+        OutboxMessage.objects.bulk_update(
+            messages, ['status', 'attempts', 'last_error', 'available_at', 'delivered_at']
+        )
+
+    return result
+
+
+def purge_outbox(days=7):
+    """
+    Hapus message yang sudah delivered lebih dari `days` hari
+
+    Returns:
+        int: Jumlah message yang dihapus
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxMessage.objects.filter(status='delivered', delivered_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,55 @@
+"""
+Per-player state version untuk conditional GET (ETag/304)
+
+Setiap player punya counter PlayerStats.state_version yang naik setiap kali stats
+yang tampil di dashboard berubah: add_exp/add_exp_bulk dan perubahan honor (lewat
+send_player_updates) serta status effect (signal StatusEffect dan
+expire_status_effects). Counter dinaikkan di transaction yang sama dengan
+perubahannya, jadi version dan data selalu commit bersama dan semua process
+(web workers, worker, cron) membaca version yang sama tanpa cache shared.
+
+Endpoint AJAX player memakai version ini sebagai ETag. Request dengan
+If-None-Match yang cocok dijawab 304 setelah satu lookup primary key PlayerStats,
+sebelum user di-load dan tanpa menghitung stats.
+"""
+from django.contrib.auth import SESSION_KEY
+from django.db.models import F
+
+from .models import PlayerStats
+
+
+def get_player_state_version(user_id):
+    """
+    Version state player saat ini (satu lookup primary key)
+
+    Returns:
+        int or None: None jika user belum punya row PlayerStats
+    """
+    return PlayerStats.objects.filter(user_id=user_id).values_list('state_version', flat=True).first()
+
+
+def mark_player_state_changed(user_ids):
+    """
+    Naikkan state version user tertentu (satu UPDATE)
+    Panggil di transaction yang sama dengan perubahan state
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        PlayerStats.objects.filter(user_id__in=user_ids).update(state_version=F('state_version') + 1)
+
+
+def player_state_etag(request, *args, **kwargs):
+    """
+    etag_func untuk django.views.decorators.http.condition
+
+    User ID dibaca langsung dari session (tanpa load User), jadi request yang
+    tidak berubah dijawab 304 sebelum login_required menyentuh tabel user.
+    Request tanpa session login (atau tanpa PlayerStats) tidak mendapat ETag.
+    """
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is None:
+        return None
+    version = get_player_state_version(user_id)
+    if version is None:
+        return None
+    return f'player-{user_id}-{version}'
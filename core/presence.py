@@ -0,0 +1,233 @@
+"""
+Presence (online status) player di cache
+
+Setiap user online punya satu entry presence_{user_id} berisi username dan waktu
+heartbeat terakhir; entry di-refresh oleh heartbeat client (OnlineStatusConsumer)
+dan expire sendiri setelah PRESENCE_TIMEOUT detik tanpa heartbeat.
+
+Daftar user online disimpan sebagai satu set ID (PRESENCE_SET_CACHE_KEY) yang hanya
+berubah ketika user join/leave, bukan setiap heartbeat. Membaca user online cukup
+satu cache.get untuk set dan satu get_many untuk entry-nya: O(user online), tanpa
+query database. ID yang entry-nya sudah expire dibuang dari set saat dibaca
+(sweep_presence).
+
+Perubahan tidak di-broadcast per connect/disconnect. publish_presence()
+membandingkan set saat ini dengan set yang terakhir dikirim (seq) dan menghasilkan
+satu pesan diff (joined + left) per PRESENCE_BROADCAST_INTERVAL, jadi jumlah pesan
+saat satu kelas connect bersamaan tumbuh linear, bukan kuadratik. Client menerima
+snapshot hanya saat connect (atau resync ketika seq melompat).
+
+User yang heartbeat-nya berhenti tanpa disconnect hanya terdeteksi lewat sweep.
+Process ASGI yang punya client online status menjalankan sweep + publish tiap
+PRESENCE_SWEEP_INTERVAL (PresenceStream di core/consumers.py), jadi 'left' tetap
+terkirim walaupun worker deliver_outbox tidak berbagi cache dengan process ASGI.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRESENCE_SET_CACHE_KEY = 'presence_online'
+PRESENCE_LOCK_CACHE_KEY = 'presence_online_lock'
+PRESENCE_PUBLISHED_CACHE_KEY = 'presence_published'
+PRESENCE_PUBLISH_LOCK_CACHE_KEY = 'presence_publish_lock'
+PRESENCE_FLUSH_SLOT_CACHE_KEY = 'presence_flush_slot'
+
+# Batas waktu lock set presence (detik) jika process mati di tengah update
+PRESENCE_LOCK_TIMEOUT = 5
+
+
+def get_presence_timeout():
+    """Detik tanpa heartbeat sebelum user dianggap offline"""
+    return getattr(settings, 'PRESENCE_TIMEOUT', 90)
+
+
+def get_presence_broadcast_interval():
+    """Window (detik) pengumpulan perubahan presence sebelum satu diff di-broadcast"""
+    return getattr(settings, 'PRESENCE_BROADCAST_INTERVAL', 2)
+
+
+def get_presence_sweep_interval():
+    """Jeda (detik) antar sweep presence di process ASGI selama ada client online status"""
+    return getattr(settings, 'PRESENCE_SWEEP_INTERVAL', 15)
+
+
+def _entry_key(user_id):
+    return f'presence_{user_id}'
+
+
+def _update_set(add=(), remove=()):
+    """
+    Tambah/buang ID dari set presence (read-modify-write di bawah lock)
+
+    Returns:
+        set: ID yang benar-benar ditambahkan
+    """
+    locked = False
+    for _ in range(50):
+        locked = cache.add(PRESENCE_LOCK_CACHE_KEY, True, timeout=PRESENCE_LOCK_TIMEOUT)
+        if locked:
+            break
+        time.sleep(0.01)
+
+    # Tanpa lock (holder lama mati sebelum timeout) update tetap dijalankan
+    try:
+        online = cache.get(PRESENCE_SET_CACHE_KEY) or frozenset()
+        added = set(add) - online
+        updated = (online | added) - set(remove)
+        if updated != online:
+            cache.set(PRESENCE_SET_CACHE_KEY, frozenset(updated), timeout=None)
+        return added
+    finally:
+        if locked:
+            cache.delete(PRESENCE_LOCK_CACHE_KEY)
+
+
+def touch_presence(user_id, username, now=None):
+    """
+    Tandai user online / refresh heartbeat
+
+    Returns:
+        bool: True jika user sebelumnya offline (baru join)
+    """
+    now = now or time.time()
+    timeout = get_presence_timeout()
+    key = _entry_key(user_id)
+    entry = cache.get(key)
+    joined = entry is None or now - entry['last_seen'] > timeout
+    cache.set(key, {'username': username, 'last_seen': now}, timeout=timeout)
+    if joined:
+        joined = bool(_update_set(add=[user_id]))
+    return joined
+
+
+def remove_presence(user_id):
+    """Tandai user offline"""
+    cache.delete(_entry_key(user_id))
+    _update_set(remove=[user_id])
+
+
+def sweep_presence(now=None):
+    """
+    Buang ID dari set presence yang entry-nya sudah expire
+
+    Returns:
+        tuple: ({user_id: entry} user yang masih online, [user_id yang dibuang])
+    """
+    now = now or time.time()
+    timeout = get_presence_timeout()
+    online = cache.get(PRESENCE_SET_CACHE_KEY) or frozenset()
+    keys = {user_id: _entry_key(user_id) for user_id in online}
+    entries = cache.get_many(keys.values())
+
+    active = {}
+    expired = []
+    for user_id, key in keys.items():
+        entry = entries.get(key)
+        if entry is None or now - entry['last_seen'] > timeout:
+            expired.append(user_id)
+        else:
+            active[user_id] = entry
+
+    if expired:
+        _update_set(remove=expired)
+    return active, expired
+
+
+def _serialize(entries):
+    """Entry presence untuk client, urut username"""
+    return sorted(
+        (
+            {
+                'id': user_id,
+                'username': entry['username'],
+                'last_seen': datetime.fromtimestamp(entry['last_seen'], tz=dt_timezone.utc).isoformat()
+            }
+            for user_id, entry in entries.items()
+        ),
+        key=lambda user: user['username']
+    )
+
+
+def get_online_users(now=None):
+    """
+    User yang sedang online, urut username (O(user online), tanpa query database)
+
+    Returns:
+        list: [{'id', 'username', 'last_seen'}, ...]
+    """
+    active, _ = sweep_presence(now)
+    return _serialize(active)
+
+
+def get_published_presence(now=None):
+    """
+    Presence terakhir yang dikirim ke client
+
+    Returns:
+        tuple: (seq, {user_id: entry})
+    """
+    published = cache.get(PRESENCE_PUBLISHED_CACHE_KEY)
+    if published is None:
+        # seq awal dari waktu sekarang, jadi client yang memegang seq lama pasti resync
+        active, _ = sweep_presence(now)
+        cache.add(PRESENCE_PUBLISHED_CACHE_KEY, (int(time.time() * 1000), active), timeout=None)
+        published = cache.get(PRESENCE_PUBLISHED_CACHE_KEY)
+    return published
+
+
+def get_presence_snapshot():
+    """
+    Snapshot untuk client yang baru connect / resync
+
+    Isinya presence yang terakhir di-publish (bukan set saat ini), supaya diff
+    berikutnya (seq + 1) selalu berlaku tepat di atas snapshot.
+
+    Returns:
+        dict: {'type': 'online_users', 'seq', 'users'}
+    """
+    seq, entries = get_published_presence()
+    return {'type': 'online_users', 'seq': seq, 'users': _serialize(entries)}
+
+
+def publish_presence(now=None):
+    """
+    Bandingkan set presence saat ini dengan yang terakhir dikirim dan simpan
+    sebagai seq berikutnya
+
+    Returns:
+        dict, None or False: {'type': 'presence_diff', 'seq', 'joined', 'left'},
+                             None jika tidak ada perubahan, False jika publish lain
+                             sedang berjalan (caller harus mencoba lagi)
+    """
+    if not cache.add(PRESENCE_PUBLISH_LOCK_CACHE_KEY, True, timeout=PRESENCE_LOCK_TIMEOUT):
+        return False
+    try:
+        seq, published = get_published_presence(now)
+        active, _ = sweep_presence(now)
+        joined = {user_id: entry for user_id, entry in active.items() if user_id not in published}
+        left = sorted(user_id for user_id in published if user_id not in active)
+        if not joined and not left:
+            return None
+        cache.set(PRESENCE_PUBLISHED_CACHE_KEY, (seq + 1, active), timeout=None)
+        return {'type': 'presence_diff', 'seq': seq + 1, 'joined': _serialize(joined), 'left': left}
+    finally:
+        cache.delete(PRESENCE_PUBLISH_LOCK_CACHE_KEY)
+
+
+def acquire_presence_flush():
+    """
+    Ambil tugas flush untuk window saat ini
+
+    Returns:
+        bool: True jika caller harus publish setelah window selesai, False jika
+              flush untuk window ini sudah dijadwalkan (perubahan ikut flush itu)
+    """
+    # Timeout lebih panjang dari window: slot dilepas oleh release_presence_flush
+    return cache.add(PRESENCE_FLUSH_SLOT_CACHE_KEY, True, timeout=get_presence_broadcast_interval() * 2 + 1)
+
+
+def release_presence_flush():
+    """Lepas slot flush tepat sebelum publish (perubahan sesudahnya menjadwalkan flush baru)"""
+    cache.delete(PRESENCE_FLUSH_SLOT_CACHE_KEY)
@@ -0,0 +1,292 @@
+"""
+Ranking service untuk leaderboard
+
+Posisi setiap player disimpan di PlayerRank dan dihitung ulang dengan satu query
+window function (ROW_NUMBER) ketika data ranking berubah. Urutan ranking:
+(current_level, total_exp, honor_points) descending, lalu id sebagai tie-break.
+
+Rank satu user, top N dan halaman K dibaca lewat index PlayerRank.rank
+(O(log n) + ukuran hasil), dipakai bersama oleh leaderboard view, PlayerListView
+dan leaderboard snapshot untuk WebSocket.
+
+Perubahan EXP/honor hanya menaikkan ranking version setelah commit
+(mark_rankings_stale); PlayerRank di-refresh oleh worker deliver_outbox (ensure_rankings),
+paling banyak sekali per window (settings.LEADERBOARD_RANK_REFRESH_INTERVAL), jadi
+writer tidak membayar refresh seluruh ranking. Reader (leaderboard view,
+PlayerListView, consumer) hanya membaca PlayerRank dan tidak pernah menulis. Cache leaderboard di core/leaderboard.py juga di-key dengan version ini.
+
+Daftar player yang bisa di-scroll (leaderboard JSON, PlayerListView) memakai keyset
+pagination langsung pada tuple ranking di tabel User (accounts_user_ranking_idx),
+jadi biaya satu halaman konstan dan tidak bergeser ketika rank di-refresh.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Q, Window
+from django.db.models.functions import RowNumber
+
+from .boards import refresh_board_ranks
+from .models import PlayerRank
+
+RANKING_VERSION_CACHE_KEY = 'ranking_version'
+RANKING_REFRESHED_CACHE_KEY = 'ranking_refreshed_version'
+RANKING_REFRESH_SLOT_CACHE_KEY = 'ranking_refresh_slot'
+
+# Kolom User yang menentukan ranking
+RANKING_FIELDS = ['current_level', 'total_exp', 'honor_points']
+
+RANKING_ORDER = [
+    F('current_level').desc(),
+    F('total_exp').desc(),
+    F('honor_points').desc(),
+    F('id').asc(),
+]
+
+
+def get_refresh_interval():
+    """Window refresh ranking dalam detik (0 = refresh setiap ada perubahan)"""
+    return getattr(settings, 'LEADERBOARD_RANK_REFRESH_INTERVAL', 1)
+
+
+def get_ranking_version():
+    """
+    Version ranking saat ini (naik setiap kali data ranking berubah)
+    Version awal diambil dari waktu sekarang, jadi jika counter hilang dari cache
+    (restart/eviction) version baru tidak pernah sama dengan version lama
+    """
+    version = cache.get(RANKING_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(RANKING_VERSION_CACHE_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(RANKING_VERSION_CACHE_KEY)
+    return version
+
+
+def mark_rankings_stale():
+    """Naikkan ranking version (panggil setelah commit)"""
+    try:
+        cache.incr(RANKING_VERSION_CACHE_KEY)
+    except ValueError:
+        # Counter belum ada: version baru dari waktu sekarang
+        cache.add(RANKING_VERSION_CACHE_KEY, int(time.time() * 1000), timeout=None)
+
+
+def schedule_rankings_refresh():
+    """
+    Tandai ranking stale setelah transaction saat ini commit
+    PlayerRank di-refresh oleh worker deliver_outbox di putaran berikutnya
+    """
+    transaction.on_commit(mark_rankings_stale)
+
+
+def refresh_rankings():
+    """
+    Hitung ulang PlayerRank untuk semua player (satu query window function) dan rank
+    board periode berjalan (core/boards.py). Hanya rank yang berubah yang ditulis
+
+    Returns:
+        int: Jumlah rank yang berubah
+    """
+    from accounts.models import User
+
+    positions = User.objects.filter(role='player').annotate(
+        position=Window(RowNumber(), order_by=RANKING_ORDER)
+    ).values_list('pk', 'position')
+
+    with transaction.atomic():
+        current = dict(PlayerRank.objects.values_list('user_id', 'rank'))
+        changed = [
+            PlayerRank(user_id=user_id, rank=position)
+            for user_id, position in positions
+            if current.get(user_id) != position
+        ]
+        PlayerRank.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['rank']
+        )
+        # User yang bukan player lagi (user yang dihapus ikut terhapus lewat cascade)
+        PlayerRank.objects.exclude(user__role='player').delete()
+        changed_boards = refresh_board_ranks()
+
+    return len(changed) + changed_boards
+
+
+def ensure_rankings():
+    """
+    Refresh PlayerRank jika ranking version berubah sejak refresh terakhir
+    Dipanggil oleh worker deliver_outbox, bukan oleh writer atau reader.
+    Jika ranking sudah di-refresh di window ini, rank lama dipakai sampai window berikutnya
+
+    Returns:
+        bool: True jika PlayerRank di-refresh
+    """
+    version = get_ranking_version()
+    if cache.get(RANKING_REFRESHED_CACHE_KEY) == version:
+        return False
+
+    interval = get_refresh_interval()
+    if interval > 0 and not cache.add(RANKING_REFRESH_SLOT_CACHE_KEY, True, timeout=interval):
+        return False
+
+    try:
+        refresh_rankings()
+    except Exception:
+        # Version tetap stale dan slot dilepas supaya refresh bisa dicoba lagi
+        cache.delete(RANKING_REFRESH_SLOT_CACHE_KEY)
+        raise
+
+    # Version dibaca sebelum query: perubahan yang commit selama refresh menaikkan
+    # version lagi, jadi refresh berikutnya tetap terjadi
+    cache.set(RANKING_REFRESHED_CACHE_KEY, version, timeout=None)
+    return True
+
+
+def _ranked_users(ranks):
+    users = []
+    for ranking in ranks.select_related('user').order_by('rank'):
+        user = ranking.user
+        user.rank = ranking.rank
+        users.append(user)
+    return users
+
+
+def get_rank(user):
+    """
+    Rank user (1 = teratas), None jika bukan player
+
+    Returns:
+        int or None
+    """
+    return PlayerRank.objects.filter(user_id=user.pk).values_list('rank', flat=True).first()
+
+
+def get_top_players(limit):
+    """
+    Top `limit` players
+
+    Returns:
+        list: User instances dengan attribute `rank`, urut dari rank 1
+    """
+    return _ranked_users(PlayerRank.objects.filter(rank__lte=limit))
+
+
+def get_ranked_players(first_rank, last_rank=None):
+    """
+    Players dengan rank first_rank..last_rank (inklusif; last_rank None = sampai akhir)
+
+    Returns:
+        list: User instances dengan attribute `rank`
+    """
+    ranks = PlayerRank.objects.filter(rank__gte=first_rank)
+    if last_rank is not None:
+        ranks = ranks.filter(rank__lte=last_rank)
+    return _ranked_users(ranks)
+
+
+def get_leaderboard_page(page, per_page=20):
+    """
+    Halaman ke-`page` (mulai dari 1) dari leaderboard
+
+    Returns:
+        list: User instances dengan attribute `rank`
+    """
+    first_rank = (page - 1) * per_page + 1
+    return get_ranked_players(first_rank, first_rank + per_page - 1)
+
+
+def get_player_count():
+    """Jumlah player di ranking (rank terakhir, dibaca dari index)"""
+    return PlayerRank.objects.aggregate(last=Max('rank'))['last'] or 0
+
+
+def get_players_around(user, radius=5):
+    """
+    Player di sekitar user (rank - radius .. rank + radius)
+
+    Returns:
+        list: User instances dengan attribute `rank` (kosong jika user bukan player)
+    """
+    rank = get_rank(user)
+    if rank is None:
+        return []
+    return get_ranked_players(max(rank - radius, 1), rank + radius)
+
+
+def encode_cursor(player):
+    """Cursor keyset dari tuple ranking player (User atau LeaderboardEntry)"""
+    return f'{player.current_level}.{player.total_exp}.{player.honor_points}.{player.id}'
+
+
+def decode_cursor(cursor):
+    """
+    Parse cursor dari encode_cursor()
+
+    Raises:
+        ValueError: Jika cursor tidak valid
+    """
+    level, total_exp, honor_points, pk = (int(part) for part in cursor.split('.'))
+    return level, total_exp, honor_points, pk
+
+
+def _after(cursor):
+    """Filter player setelah cursor dalam urutan ranking (level, exp, honor desc, id asc)"""
+    level, total_exp, honor_points, pk = cursor
+    return (
+        Q(current_level__lt=level)
+        | Q(current_level=level, total_exp__lt=total_exp)
+        | Q(current_level=level, total_exp=total_exp, honor_points__lt=honor_points)
+        | Q(current_level=level, total_exp=total_exp, honor_points=honor_points, pk__gt=pk)
+    )
+
+
+def _before(cursor):
+    level, total_exp, honor_points, pk = cursor
+    return (
+        Q(current_level__gt=level)
+        | Q(current_level=level, total_exp__gt=total_exp)
+        | Q(current_level=level, total_exp=total_exp, honor_points__gt=honor_points)
+        | Q(current_level=level, total_exp=total_exp, honor_points=honor_points, pk__lt=pk)
+    )
+
+
+def seek_players(queryset, limit, after=None, before=None):
+    """
+    Satu halaman keyset pagination dalam urutan ranking
+
+    Args:
+        queryset: User queryset (mis. filter role/pencarian)
+        limit: Jumlah player per halaman
+        after: Cursor; ambil player setelah cursor (halaman berikutnya)
+        before: Cursor; ambil player sebelum cursor (halaman sebelumnya)
+
+    Returns:
+        dict: {
+            'players': list of User (urut ranking),
+            'next': cursor atau None,
+            'previous': cursor atau None
+        }
+    """
+    if before is not None:
+        rows = list(queryset.filter(_before(decode_cursor(before))).order_by(
+            *[expression.copy().reverse_ordering() for expression in RANKING_ORDER]
+        )[:limit + 1])
+        has_more = len(rows) > limit
+        players = rows[:limit][::-1]
+        return {
+            'players': players,
+            'next': encode_cursor(players[-1]) if players else None,
+            'previous': encode_cursor(players[0]) if players and has_more else None,
+        }
+
+    if after is not None:
+        queryset = queryset.filter(_after(decode_cursor(after)))
+    rows = list(queryset.order_by(*RANKING_ORDER)[:limit + 1])
+    players = rows[:limit]
+    return {
+        'players': players,
+        'next': encode_cursor(players[-1]) if len(rows) > limit else None,
+        'previous': encode_cursor(players[0]) if players and after is not None else None,
+    }
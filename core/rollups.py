@@ -0,0 +1,124 @@
+"""
+Incremental maintenance untuk ExpDailyRollup
+
+Setiap insert ExpLog di core/services.py diikuti record_exp_logs() di transaction yang
+sama. Semua writer ExpLog memegang lock row user (lihat lock_users), jadi rollup milik
+satu user tidak pernah di-update bersamaan dan increment bisa dihitung di Python.
+"""
+from django.db.models import Case, Count, IntegerField, Q, Sum, When
+from django.db.models.functions import Abs, TruncDate
+from django.utils import timezone
+
+from .boards import add_leaderboard_scores
+from .models import ExpDailyRollup, ExpLog
+from .stats import add_exp_totals
+
+ROLLUP_FIELDS = ['exp_earned', 'earned_count', 'exp_lost', 'lost_count', 'log_count']
+
+
+def _empty_delta():
+    return dict.fromkeys(ROLLUP_FIELDS, 0)
+
+
+def record_exp_logs(logs):
+    """
+    Tambahkan ExpLog yang baru dibuat ke ExpDailyRollup (2 query: select + upsert),
+    increment EXP totals di PlayerStats (1 query) dan skor leaderboard per periode /
+    activity di LeaderboardScore (2 query: select + upsert)
+
+    Harus dipanggil di dalam transaction yang sama dengan insert ExpLog,
+    dengan row user sudah di-lock.
+
+    Args:
+        logs: Iterable of saved ExpLog instances
+    """
+    deltas = {}
+    for log in logs:
+        key = (log.user_id, timezone.localdate(log.created_at), log.activity_type)
+        delta = deltas.setdefault(key, _empty_delta())
+        delta['log_count'] += 1
+        if log.exp_earned > 0:
+            delta['exp_earned'] += log.exp_earned
+            delta['earned_count'] += 1
+        elif log.exp_earned < 0:
+            delta['exp_lost'] += -log.exp_earned
+            delta['lost_count'] += 1
+
+    if not deltas:
+        return
+
+    totals = {}
+    for (user_id, _, _), delta in deltas.items():
+        earned, lost = totals.get(user_id, (0, 0))
+        totals[user_id] = (earned + delta['exp_earned'], lost + delta['exp_lost'])
+    add_exp_totals(totals)
+    add_leaderboard_scores({
+        key: delta['exp_earned'] - delta['exp_lost'] for key, delta in deltas.items()
+    })
+
+    existing = {
+        (row['user_id'], row['day'], row['activity_type']): row
+        for row in ExpDailyRollup.objects.filter(
+            user_id__in={user_id for user_id, _, _ in deltas},
+            day__in={day for _, day, _ in deltas},
+            activity_type__in={activity_type for _, _, activity_type in deltas}
+        ).values('user_id', 'day', 'activity_type', *ROLLUP_FIELDS)
+    }
+
+    # Nilai akhir dihitung di Python (row user di-lock), lalu satu upsert
+    rollups = []
+    for key, delta in deltas.items():
+        current = existing.get(key) or _empty_delta()
+        user_id, day, activity_type = key
+        rollups.append(ExpDailyRollup(
+            user_id=user_id,
+            day=day,
+            activity_type=activity_type,
+            **{field: current[field] + value for field, value in delta.items()}
+        ))
+
+    ExpDailyRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['user', 'day', 'activity_type'],
+        update_fields=ROLLUP_FIELDS
+    )
+
+
+def build_rollups(user_ids, before=None):
+    """
+    Hitung ExpDailyRollup dari seluruh ExpLog user tertentu (satu query agregat)
+
+    Args:
+        user_ids: Iterable of user IDs
+        before: Hanya ExpLog dengan created_at < before (optional)
+
+    Returns:
+        list: Unsaved ExpDailyRollup instances
+    """
+    logs = ExpLog.objects.filter(user_id__in=user_ids)
+    if before is not None:
+        logs = logs.filter(created_at__lt=before)
+    rows = logs.annotate(
+        day=TruncDate('created_at')
+    ).values('user_id', 'day', 'activity_type').annotate(
+        exp_earned_sum=Sum(Case(When(exp_earned__gt=0, then='exp_earned'), default=0, output_field=IntegerField())),
+        earned_count=Count('id', filter=Q(exp_earned__gt=0)),
+        exp_lost_sum=Sum(Case(When(exp_earned__lt=0, then=Abs('exp_earned')), default=0, output_field=IntegerField())),
+        lost_count=Count('id', filter=Q(exp_earned__lt=0)),
+        log_count=Count('id')
+    ).order_by()
+
+    return [
+        ExpDailyRollup(
+            user_id=row['user_id'],
+            day=row['day'],
+            activity_type=row['activity_type'],
+            exp_earned=row['exp_earned_sum'] or 0,
+            earned_count=row['earned_count'],
+            exp_lost=row['exp_lost_sum'] or 0,
+            lost_count=row['lost_count'],
+            log_count=row['log_count']
+        )
+        for row in rows
+    ]
@@ -5,6 +5,9 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    # Satu koneksi multiplexed untuk semua stream (dipakai static/js/websocket_client.js)
+    re_path(r'ws/stream/$', consumers.StreamMultiplexConsumer.as_asgi()),
+    # Endpoint lama, satu koneksi per fitur
     re_path(r'ws/notifications/(?P<user_id>\w+)/$', consumers.NotificationConsumer.as_asgi()),
     re_path(r'ws/leaderboard/$', consumers.LeaderboardConsumer.as_asgi()),
     re_path(r'ws/online-status/$', consumers.OnlineStatusConsumer.as_asgi()),
@@ -1,8 +1,99 @@
-from django.db import transaction
+import logging
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import F, Value, Window
+from django.db.models.functions import Greatest, Least, RowNumber
 from django.contrib import messages
 from django.utils import timezone
 from accounts.models import User
-from .models import Level, ExpLog, Punishment, StatusEffect
+from .models import ExpLog, LevelUpEvent, Punishment, StatusEffect
+from .levels import get_level_curve
+from .multipliers import get_status_effect_multipliers, invalidate_exp_multipliers
+from .rollups import record_exp_logs
+from .stats import STAT_SOURCES, schedule_player_stats_refresh
+from .ranking import schedule_rankings_refresh
+
+
+logger = logging.getLogger(__name__)
+
+# Kolom User yang diubah oleh service gamification
+USER_PROGRESS_FIELDS = ['current_exp', 'total_exp', 'current_level', 'honor_points']
+
+
+@contextmanager
+def realtime_updates():
+    """
+    Savepoint untuk write real-time (outbox, inbox, state version) di dalam transaction
+    caller. Jika gagal, hanya savepoint yang di-rollback dan error di-log, jadi
+    perubahan EXP/honor caller tetap commit.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except Exception:
+        logger.exception('Gagal menulis real-time update')
+
+
+def lock_users(user_ids):
+    """
+    Lock row user (SELECT ... FOR UPDATE) dan return instance terbaru dari database
+    Harus dipanggil di dalam transaction.atomic()
+    
+    Args:
+        user_ids: Iterable of user primary keys
+    
+    Returns:
+        dict: {user_id: User}
+    """
+    queryset = User.objects.filter(pk__in=list(user_ids))
+    if connection.features.has_select_for_update:
+        queryset = queryset.select_for_update()
+    else:
+        # SQLite tidak punya FOR UPDATE; write no-op untuk mengambil write lock lebih dulu
+        queryset.update(total_exp=F('total_exp'))
+    return {player.pk: player for player in queryset}
+
+
+def lock_user(user):
+    """Lock satu row user dan return instance terbaru dari database"""
+    return lock_users([user.pk])[user.pk]
+
+
+def _sync_user(user, player):
+    """Salin kolom progress dari instance terbaru ke instance milik caller"""
+    if user is not player:
+        for field in USER_PROGRESS_FIELDS:
+            setattr(user, field, getattr(player, field))
+
+
+def adjust_honor_points(user, delta, max_honor=None):
+    """
+    Ubah honor points secara atomic (UPDATE ... SET honor_points = honor_points + delta)
+    Honor points tidak pernah di bawah 0 dan tidak melebihi max_honor (jika diberikan)
+    
+    Args:
+        user: User instance (di-refresh setelah update)
+        delta: Perubahan honor points (positif atau negatif)
+        max_honor: Batas atas honor points (optional)
+    
+    Returns:
+        int: Jumlah row yang ter-update (0 jika sudah mencapai max_honor)
+    """
+    value = Greatest(F('honor_points') + delta, Value(0))
+    queryset = User.objects.filter(pk=user.pk)
+    if max_honor is not None:
+        value = Least(value, Value(max_honor))
+        if delta > 0:
+            queryset = queryset.filter(honor_points__lt=max_honor)
+    updated = queryset.update(honor_points=value)
+    user.refresh_from_db(fields=['honor_points'])
+    if updated:
+        schedule_rankings_refresh()
+        from core.notifications import send_player_updates, HONOR_STAT_FIELDS
+        with realtime_updates():
+            send_player_updates([user], fields=HONOR_STAT_FIELDS)
+    return updated
 
 
 def add_exp(user, amount, activity_type='other', description=''):
@@ -29,22 +120,14 @@ def add_exp(user, amount, activity_type='other', description=''):
         }
     """
     with transaction.atomic():
-        # Check active status effects
-        active_effects = StatusEffect.objects.filter(
-            user=user,
-            is_active=True
-        )
+        # Lock row user dan baca nilai terbaru dari database (bukan instance in-memory)
+        player = lock_user(user)
         
-        # Calculate exp multiplier (multiply all active effects)
-        exp_multiplier = 1.0
-        for effect in active_effects:
-            if effect.is_expired():
-                effect.deactivate()
-            else:
-                exp_multiplier *= float(effect.exp_multiplier)
+        # Calculate exp multiplier (multiply all active effects, cached per player)
+        exp_multiplier = get_status_effect_multipliers([player.pk])[player.pk]
         
-        # Apply honor points bonus/penalty (import di sini untuk avoid circular import)
-        honor_privileges = check_honor_privileges(user)
+        # Apply honor points bonus/penalty
+        honor_privileges = check_honor_privileges(player)
         exp_multiplier *= honor_privileges['exp_multiplier_bonus']
         
         # Calculate actual EXP dengan multiplier
@@ -52,22 +135,20 @@ def add_exp(user, amount, activity_type='other', description=''):
         actual_amount = int(amount * exp_multiplier)
         
         # Update user EXP
-        user.current_exp += actual_amount
-        user.total_exp += actual_amount
-        
-        # Simpan perubahan
-        user.save()
+        player.current_exp += actual_amount
+        player.total_exp += actual_amount
         
         # Catat di ExpLog dengan actual amount
-        ExpLog.objects.create(
-            user=user,
+        exp_log = ExpLog.objects.create(
+            user=player,
             activity_type=activity_type,
             exp_earned=actual_amount,
             description=description + (f" (Multiplier: {exp_multiplier:.2f}x)" if exp_multiplier != 1.0 else "")
         )
+        exp_logs = [exp_log]
         
-        # Check level up
-        level_up_result = check_level_up(user)
+        # Check level up (in-memory, row masih di-lock)
+        level_up_result = _apply_level_up(player)
         
         # Jika level up, apply bonus
         if level_up_result.get('level_up'):
@@ -75,19 +156,39 @@ def add_exp(user, amount, activity_type='other', description=''):
             old_level = level_up_result.get('old_level')
             
             # Apply bonus
-            bonus = apply_level_bonus(user, new_level)
+            bonus = level_up_result['bonus']
+            player.honor_points += bonus['honor_points']
             
             # Log level up activity
-            ExpLog.objects.create(
-                user=user,
+            exp_log = ExpLog.objects.create(
+                user=player,
                 activity_type='bonus',
                 exp_earned=0,
                 description=f"Level Up! {old_level} → {new_level}. Bonus: {bonus['honor_points']} Honor Points"
             )
-            
-            # Send real-time notification
-            try:
-                from core.notifications import send_level_up_notification, broadcast_leaderboard_update
+            exp_logs.append(exp_log)
+            LevelUpEvent.objects.create(
+                user=player,
+                old_level=old_level,
+                new_level=new_level,
+                honor_points_bonus=bonus['honor_points'],
+                created_at=exp_log.created_at
+            )
+        
+        # Update daily rollup di transaction yang sama
+        record_exp_logs(exp_logs)
+        
+        # Simpan hanya kolom gamification (satu UPDATE)
+        player.save(update_fields=USER_PROGRESS_FIELDS)
+        _sync_user(user, player)
+        
+        # Send real-time updates (satu INSERT ke outbox)
+        from core import outbox
+        from core.notifications import send_level_up_notification, broadcast_leaderboard_update, send_player_updates
+        with realtime_updates(), outbox.batch():
+            # Stats dan activity baru untuk dashboard player
+            send_player_updates([player], exp_logs)
+            if level_up_result.get('level_up'):
                 send_level_up_notification(
                     user_id=user.id,
                     old_level=old_level,
@@ -96,24 +197,149 @@ def add_exp(user, amount, activity_type='other', description=''):
                 )
                 # Broadcast leaderboard update
                 broadcast_leaderboard_update()
-            except Exception as e:
-                # Silently fail if notification system is not available
-                pass
         
         return {
             'success': True,
-            'new_exp': user.current_exp,
-            'new_total_exp': user.total_exp,
+            'new_exp': player.current_exp,
+            'new_total_exp': player.total_exp,
             'level_up': level_up_result.get('level_up', False),
             'new_level': level_up_result.get('new_level'),
             'old_level': level_up_result.get('old_level'),
             'exp_multiplier': exp_multiplier,
             'original_amount': original_amount,
             'actual_amount': actual_amount,
-            'exp_log': ExpLog.objects.filter(user=user).latest('created_at')
+            'exp_log': exp_log
         }
 
 
+def add_exp_bulk(awards):
+    """
+    Menambahkan EXP ke banyak user sekaligus dalam satu transaksi
+    Hasilnya sama dengan memanggil add_exp() berulang kali, tetapi jumlah query konstan
+    (tidak bertambah sesuai jumlah award)
+
+    Args:
+        awards: Iterable of (user, amount, activity_type, description) tuples
+
+    Returns:
+        list: Result dict per award (urutan sama dengan input), format sama dengan add_exp()
+    """
+    awards = list(awards)
+    if not awards:
+        return []
+
+    user_ids = {user.pk for user, _, _, _ in awards}
+
+    with transaction.atomic():
+        # Lock dan load semua user yang terlibat
+        players = lock_users(user_ids)
+
+        # Multiplier status effects untuk semua user sekaligus (cached, maksimal 1 query)
+        effect_multipliers = get_status_effect_multipliers(user_ids)
+
+        curve = get_level_curve()
+
+        results = []
+        exp_logs = []
+        award_logs = []
+        level_ups = []
+        level_up_logs = []
+        for user, amount, activity_type, description in awards:
+            player = players[user.pk]
+
+            exp_multiplier = effect_multipliers.get(player.pk, 1.0)
+            exp_multiplier *= check_honor_privileges(player)['exp_multiplier_bonus']
+            actual_amount = int(amount * exp_multiplier)
+
+            player.current_exp += actual_amount
+            player.total_exp += actual_amount
+
+            logs = [ExpLog(
+                user=player,
+                activity_type=activity_type,
+                exp_earned=actual_amount,
+                description=description + (f" (Multiplier: {exp_multiplier:.2f}x)" if exp_multiplier != 1.0 else "")
+            )]
+
+            # Vectorized level-up pass: lookup di compiled level curve (tanpa query)
+            reached = curve.level_for_exp(player.total_exp)
+
+            old_level = player.current_level
+            level_up = reached is not None and reached > old_level
+            if level_up:
+                player.current_level = reached
+                player.current_exp = max(0, player.total_exp - curve.exp_required(reached))
+
+                bonus = curve.bonus(reached)
+                player.honor_points += bonus['honor_points']
+
+                logs.append(ExpLog(
+                    user=player,
+                    activity_type='bonus',
+                    exp_earned=0,
+                    description=f"Level Up! {old_level} → {reached}. Bonus: {bonus['honor_points']} Honor Points"
+                ))
+                level_ups.append((player.pk, old_level, reached, bonus['honor_points']))
+                level_up_logs.append(logs[-1])
+
+            exp_logs.extend(logs)
+            award_logs.append(logs[-1])
+            results.append({
+                'success': True,
+                'new_exp': player.current_exp,
+                'new_total_exp': player.total_exp,
+                'level_up': level_up,
+                'new_level': reached if level_up else None,
+                'old_level': old_level if level_up else None,
+                'exp_multiplier': exp_multiplier,
+                'original_amount': amount,
+                'actual_amount': actual_amount,
+            })
+
+        # Satu INSERT untuk semua ExpLog, lalu update daily rollup
+        ExpLog.objects.bulk_create(exp_logs)
+        record_exp_logs(exp_logs)
+        if level_ups:
+            LevelUpEvent.objects.bulk_create([
+                LevelUpEvent(
+                    user_id=user_id,
+                    old_level=old_level,
+                    new_level=new_level,
+                    honor_points_bonus=honor_points_bonus,
+                    created_at=exp_log.created_at
+                )
+                for (user_id, old_level, new_level, honor_points_bonus), exp_log in zip(level_ups, level_up_logs)
+            ])
+        for result, exp_log in zip(results, award_logs):
+            result['exp_log'] = exp_log
+
+        # Set-based UPDATE untuk semua user yang terlibat
+        User.objects.bulk_update(players.values(), USER_PROGRESS_FIELDS)
+        schedule_rankings_refresh()
+
+        # Sinkronkan instance milik caller dengan nilai terbaru
+        for user, _, _, _ in awards:
+            _sync_user(user, players[user.pk])
+
+        from core import outbox
+        from core.notifications import send_level_up_notification, broadcast_leaderboard_update, send_player_updates
+        with realtime_updates(), outbox.batch():
+            # Stats dan activity baru untuk dashboard setiap player
+            send_player_updates(players.values(), exp_logs)
+            for user_id, old_level, new_level, honor_points_bonus in level_ups:
+                send_level_up_notification(
+                    user_id=user_id,
+                    old_level=old_level,
+                    new_level=new_level,
+                    honor_points_bonus=honor_points_bonus
+                )
+            if level_ups:
+                # Satu broadcast untuk seluruh batch
+                broadcast_leaderboard_update()
+
+        return results
+
+
 def check_level_up(user):
     """
     Mengecek apakah user bisa naik level berdasarkan total_exp
@@ -128,46 +354,57 @@ def check_level_up(user):
             'exp_remaining': int
         }
     """
-    # Refresh user dari database untuk mendapatkan data terbaru
-    user.refresh_from_db()
-    
-    # Get level berdasarkan total_exp
-    level = Level.objects.filter(exp_required__lte=user.total_exp).order_by('-level').first()
+    with transaction.atomic():
+        # Lock row dan ambil data terbaru dari database
+        player = lock_user(user)
+        result = _apply_level_up(player)
+        if result['level_up']:
+            player.save(update_fields=['current_level', 'current_exp'])
+        _sync_user(user, player)
+        return result
+
+
+def _apply_level_up(player):
+    """
+    Terapkan level up ke instance user (in-memory, tanpa save)
+    Dipakai oleh check_level_up dan add_exp yang sudah memegang row lock
+    """
+    # Get level berdasarkan total_exp (compiled level curve, tanpa query)
+    curve = get_level_curve()
+    level = curve.level_for_exp(player.total_exp)
     
-    if level and level.level > user.current_level:
-        old_level = user.current_level
-        user.current_level = level.level
+    if level is not None and level > player.current_level:
+        old_level = player.current_level
+        player.current_level = level
         
         # Calculate remaining EXP for current level
         # EXP yang sudah digunakan untuk mencapai level ini
-        exp_used = level.exp_required
+        exp_used = curve.exp_required(level)
         
         # EXP yang tersisa untuk level berikutnya
-        exp_remaining = user.total_exp - exp_used
+        exp_remaining = player.total_exp - exp_used
         
         # Update current_exp (EXP yang tersisa untuk level berikutnya)
-        user.current_exp = max(0, exp_remaining)  # Pastikan tidak negatif
-        user.save()
+        player.current_exp = max(0, exp_remaining)  # Pastikan tidak negatif
         
         return {
             'level_up': True,
             'old_level': old_level,
-            'new_level': level.level,
+            'new_level': level,
             'exp_remaining': exp_remaining,
-            'bonus': calculate_bonus(level.level)
+            'bonus': calculate_bonus(level)
         }
     
     # Calculate remaining EXP untuk level berikutnya
-    current_level_obj = Level.objects.filter(level=user.current_level).first()
-    if current_level_obj:
-        exp_used = current_level_obj.exp_required
-        exp_remaining = user.total_exp - exp_used
+    exp_used = curve.exp_required(player.current_level)
+    if exp_used is not None:
+        exp_remaining = player.total_exp - exp_used
     else:
-        exp_remaining = user.total_exp
+        exp_remaining = player.total_exp
     
     return {
         'level_up': False,
-        'current_level': user.current_level,
+        'current_level': player.current_level,
         'exp_remaining': max(0, exp_remaining)
     }
 
@@ -185,31 +422,15 @@ def calculate_bonus(level):
             'description': str
         }
     """
-    level_obj = Level.objects.filter(level=level).first()
+    bonus = get_level_curve().bonus(level)
     
-    if not level_obj:
+    if not bonus:
         return {
             'honor_points': 0,
             'description': 'No bonus available'
         }
     
-    # Bonus honor points berdasarkan level
-    # Level 1-5: 10 points per level
-    # Level 6-10: 20 points per level
-    # Level 11+: 30 points per level
-    if level <= 5:
-        honor_points = level * 10
-    elif level <= 10:
-        honor_points = 50 + (level - 5) * 20
-    else:
-        honor_points = 150 + (level - 10) * 30
-    
-    description = level_obj.bonus_description or f"Reached Level {level}!"
-    
-    return {
-        'honor_points': honor_points,
-        'description': description
-    }
+    return dict(bonus)
 
 
 def apply_level_bonus(user, level):
@@ -221,8 +442,7 @@ def apply_level_bonus(user, level):
         level: Level number (int)
     """
     bonus = calculate_bonus(level)
-    user.honor_points += bonus['honor_points']
-    user.save()
+    adjust_honor_points(user, bonus['honor_points'])
     
     return bonus
 
@@ -369,8 +589,7 @@ class PunishmentService:
             
             # Decrease honor points
             if rules.get('honor_loss', 0) > 0:
-                user.honor_points = max(0, user.honor_points - rules['honor_loss'])
-                user.save()
+                adjust_honor_points(user, -rules['honor_loss'])
             
             return punishment
     
@@ -411,8 +630,7 @@ class PunishmentService:
             
             # Decrease honor points
             if rules.get('honor_loss', 0) > 0:
-                user.honor_points = max(0, user.honor_points - rules['honor_loss'])
-                user.save()
+                adjust_honor_points(user, -rules['honor_loss'])
             
             return punishment
     
@@ -476,13 +694,126 @@ class PunishmentService:
                 
                 # Decrease honor points
                 if rules.get('honor_loss', 0) > 0:
-                    user.honor_points = max(0, user.honor_points - rules['honor_loss'])
-                    user.save()
+                    adjust_honor_points(user, -rules['honor_loss'])
                 
                 return punishment
         
         return None
     
+    @staticmethod
+    def apply_absence_punishments_bulk(users, created_by=None):
+        """
+        Versi batch dari check_and_apply_absence_punishment untuk banyak user
+        Jumlah query konstan, tidak bergantung jumlah user
+        
+        Args:
+            users: Iterable of User instances
+            created_by: Admin yang membuat punishment
+        
+        Returns:
+            list: Punishment instances yang baru dibuat
+        """
+        from .models import Attendance
+        
+        users = {user.pk: user for user in users}
+        if not users:
+            return []
+        
+        rules = ABSENCE_RULES
+        threshold = rules['threshold']
+        
+        # N attendance terakhir per user dalam satu query (window function)
+        recent_attendances = Attendance.objects.filter(
+            user_id__in=users
+        ).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('user_id'),
+                order_by=F('created_at').desc()
+            )
+        ).filter(
+            row_number__lte=threshold
+        ).order_by('user_id', 'row_number').values_list('user_id', 'attended')
+        
+        consecutive_absences = {}
+        broken = set()
+        for user_id, attended in recent_attendances:
+            if user_id in broken:
+                continue
+            if attended:
+                broken.add(user_id)
+            else:
+                consecutive_absences[user_id] = consecutive_absences.get(user_id, 0) + 1
+        
+        candidates = [
+            user_id for user_id, absences in consecutive_absences.items()
+            if absences >= threshold
+        ]
+        if not candidates:
+            return []
+        
+        with transaction.atomic():
+            # Jangan duplicate punishment untuk absence yang belum resolved
+            existing = set(Punishment.objects.filter(
+                user_id__in=candidates,
+                type='absence',
+                resolved=False
+            ).values_list('user_id', flat=True))
+            
+            punishments = [
+                Punishment(
+                    user=users[user_id],
+                    type='absence',
+                    severity='minor',
+                    description=f"Consecutive absence detected ({consecutive_absences[user_id]} times)",
+                    exp_penalty=rules['exp_penalty'],
+                    status_effect=rules.get('status_effect'),
+                    duration_days=rules.get('duration', 0),
+                    evidence={'consecutive_absences': consecutive_absences[user_id]},
+                    created_by=created_by
+                )
+                for user_id in candidates if user_id not in existing
+            ]
+            if not punishments:
+                return []
+            Punishment.objects.bulk_create(punishments)
+            
+            # Sama dengan Punishment.apply_punishment(): EXP penalty dulu, baru status effect
+            if rules['exp_penalty'] > 0:
+                add_exp_bulk([
+                    (
+                        punishment.user,
+                        -punishment.exp_penalty,
+                        'other',
+                        f"Punishment penalty: {punishment.get_type_display()}"
+                    )
+                    for punishment in punishments
+                ])
+            
+            status_effects = [punishment.build_status_effect() for punishment in punishments]
+            StatusEffect.objects.bulk_create([effect for effect in status_effects if effect])
+            invalidate_exp_multipliers([punishment.user_id for punishment in punishments])
+            schedule_player_stats_refresh(
+                [punishment.user_id for punishment in punishments],
+                STAT_SOURCES[Punishment]
+            )
+            
+            # Decrease honor points
+            honor_loss = rules.get('honor_loss', 0)
+            if honor_loss > 0:
+                punished = [punishment.user for punishment in punishments]
+                User.objects.filter(pk__in=[user.pk for user in punished]).update(
+                    honor_points=Greatest(F('honor_points') - Value(honor_loss), Value(0))
+                )
+                for user in punished:
+                    user.honor_points = max(user.honor_points - honor_loss, 0)
+                schedule_rankings_refresh()
+                from core.notifications import send_player_updates, HONOR_STAT_FIELDS
+                with realtime_updates():
+                    send_player_updates(punished, fields=HONOR_STAT_FIELDS)
+            
+            return punishments
+    
     @staticmethod
     def recover_honor_points(user, amount=1):
         """
@@ -498,12 +829,58 @@ class PunishmentService:
         # Maximum honor points (bisa disesuaikan)
         max_honor = 1000
         
-        if user.honor_points < max_honor:
-            old_honor = user.honor_points
-            user.honor_points = min(max_honor, user.honor_points + amount)
-            user.save()
-            return True
-        return False
+        return adjust_honor_points(user, amount, max_honor=max_honor) > 0
+
+
+def expire_status_effects(now=None, batch_size=1000):
+    """
+    Deactivate semua status effect yang sudah lewat end_date
+    Dijalankan berkala oleh command expire_status_effects (cron/scheduler)
+    
+    Setiap batch: satu SELECT dan satu UPDATE set-based memakai index
+    (is_active, end_date). Cached EXP multiplier user terkait di-invalidate dan
+    notifikasi untuk user ditulis ke outbox dalam transaction yang sama.
+    
+    Args:
+        now: Waktu acuan (default: timezone.now())
+        batch_size: Jumlah effect per batch
+    
+    Returns:
+        int: Jumlah status effect yang di-deactivate
+    """
+    from . import outbox
+    from .notifications import send_status_effect_expired_notification
+    from .player_state import mark_player_state_changed
+    
+    now = now or timezone.now()
+    expired = StatusEffect.objects.filter(is_active=True, end_date__lt=now)
+    total = 0
+    
+    while True:
+        with transaction.atomic():
+            rows = list(expired.order_by('end_date').values_list('pk', 'user_id', 'effect_type')[:batch_size])
+            if not rows:
+                break
+            
+            total += StatusEffect.objects.filter(
+                pk__in=[pk for pk, _, _ in rows],
+                is_active=True
+            ).update(is_active=False, updated_at=now)
+            
+            effect_types = {}
+            for _, user_id, effect_type in rows:
+                effect_types.setdefault(user_id, []).append(effect_type)
+            invalidate_exp_multipliers(effect_types)
+            mark_player_state_changed(effect_types)
+            
+            with outbox.batch():
+                for user_id, types in effect_types.items():
+                    send_status_effect_expired_notification(user_id, sorted(set(types)))
+        
+        if len(rows) < batch_size:
+            break
+    
+    return total
 
 
 def check_honor_privileges(user):
@@ -1,8 +1,14 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.db import transaction
 from accounts.models import User
+from core.models import Attendance, Boss, ExpDailyRollup, Level, PlayerStats, Punishment, SidequestSubmission, StatusEffect
+from core.levels import invalidate_level_curve
+from core.multipliers import invalidate_exp_multipliers
+from core.player_state import mark_player_state_changed
 from core.services import check_level_up, apply_level_bonus
+from core.stats import STAT_SOURCES, schedule_player_stats_refresh
+from core.ranking import RANKING_FIELDS, schedule_rankings_refresh
 
 
 @receiver(pre_save, sender=User)
@@ -28,3 +34,75 @@ def auto_level_up_on_exp_change(sender, instance, created, **kwargs):
     # Signal ini hanya untuk backup check jika ada perubahan manual
     pass
 
+
+@receiver(post_save, sender=Level)
+@receiver(post_delete, sender=Level)
+def reload_level_curve(sender, instance, **kwargs):
+    """
+    Reload compiled level curve ketika tabel Level berubah
+    Di-invalidate langsung dan sekali lagi setelah commit, supaya curve yang
+    sempat di-load ulang di tengah transaksi tidak tertinggal
+    """
+    invalidate_level_curve()
+    transaction.on_commit(invalidate_level_curve)
+
+
+@receiver(post_save, sender=StatusEffect)
+@receiver(post_delete, sender=StatusEffect)
+def reset_exp_multiplier(sender, instance, **kwargs):
+    """
+    Buang cached EXP multiplier ketika status effect player dibuat, diubah atau dihapus,
+    dan naikkan state version player (ETag dashboard)
+    """
+    invalidate_exp_multipliers([instance.user_id])
+    mark_player_state_changed([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_exp_multiplier_for_user(sender, instance, **kwargs):
+    """
+    Buang cached EXP multiplier untuk user baru/dihapus (ID bisa dipakai ulang)
+    """
+    # post_delete tidak mengirim 'created'
+    if kwargs.get('created', True):
+        invalidate_exp_multipliers([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def create_player_stats(sender, instance, created, **kwargs):
+    """
+    Buat row PlayerStats kosong untuk user baru
+    """
+    if created:
+        PlayerStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=SidequestSubmission)
+@receiver(post_delete, sender=SidequestSubmission)
+@receiver(post_save, sender=Boss)
+@receiver(post_delete, sender=Boss)
+@receiver(post_save, sender=Punishment)
+@receiver(post_delete, sender=Punishment)
+@receiver(post_delete, sender=ExpDailyRollup)
+def refresh_player_stats_on_change(sender, instance, **kwargs):
+    """
+    Hitung ulang lifetime counters player setelah commit
+    (create, update dan delete, termasuk perubahan dari admin)
+    """
+    schedule_player_stats_refresh([instance.user_id], STAT_SOURCES[sender])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_rankings_on_user_change(sender, instance, **kwargs):
+    """
+    Tandai ranking stale ketika kolom ranking user berubah (atau user dibuat/dihapus)
+    Save yang hanya mengubah kolom lain (mis. last_login) dilewati
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & {'role', *RANKING_FIELDS}:
+        return
+    schedule_rankings_refresh()
@@ -0,0 +1,174 @@
+"""
+Lifetime counters per player (PlayerStats)
+
+- EXP totals di-increment oleh record_exp_logs() di transaction yang sama dengan insert
+  ExpLog (row user sudah di-lock).
+- Counter lain dihitung ulang per user setelah commit: signal post_save/post_delete
+  (lihat core/signals/handlers.py) dan bulk path (attendance, absence punishment)
+  memanggil schedule_player_stats_refresh(). Recount bersifat idempotent, jadi
+  tidak ada drift walaupun record diubah dari admin.
+- Command verify_player_stats membandingkan counter dengan data asli dan bisa memperbaiki.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from .models import Attendance, Boss, ExpDailyRollup, PlayerStats, Punishment, SidequestSubmission
+
+# Sumber setiap counter: model -> {field: aggregate}
+# EXP dihitung dari ExpDailyRollup (O(hari), tetap benar setelah ExpLog diarsip)
+STAT_SOURCES = {
+    Attendance: {
+        'dungeons_attended': Count('id', filter=Q(attended=True)),
+    },
+    SidequestSubmission: {
+        'sidequests_submitted': Count('id'),
+        'sidequests_graded': Count('id', filter=Q(grade__isnull=False)),
+    },
+    Boss: {
+        'boss_battles': Count('id'),
+    },
+    Punishment: {
+        'punishments': Count('id'),
+        'resolved_punishments': Count('id', filter=Q(resolved=True)),
+    },
+    ExpDailyRollup: {
+        'exp_earned': Sum('exp_earned'),
+        'exp_lost': Sum('exp_lost'),
+    },
+}
+
+STAT_FIELDS = [field for aggregates in STAT_SOURCES.values() for field in aggregates]
+
+
+def compute_player_stats(user_ids, fields=None):
+    """
+    Hitung counter dari data asli (satu query agregat per model sumber)
+
+    Args:
+        user_ids: Iterable of user IDs
+        fields: List of PlayerStats fields (default: semua)
+
+    Returns:
+        dict: {user_id: {field: int}}
+    """
+    user_ids = list(user_ids)
+    fields = set(fields or STAT_FIELDS)
+    stats = {user_id: dict.fromkeys(fields, 0) for user_id in user_ids}
+    if not user_ids:
+        return stats
+
+    for model, aggregates in STAT_SOURCES.items():
+        wanted = {field: aggregate for field, aggregate in aggregates.items() if field in fields}
+        if not wanted:
+            continue
+        # Alias beda dari nama field (mis. Sum('exp_earned') di ExpDailyRollup)
+        rows = model.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            **{f'{field}_total': aggregate for field, aggregate in wanted.items()}
+        ).order_by()
+        for row in rows:
+            for field in wanted:
+                stats[row['user_id']][field] = row[f'{field}_total'] or 0
+
+    return stats
+
+
+def refresh_player_stats(user_ids, fields=None):
+    """
+    Hitung ulang dan simpan counter untuk user tertentu (satu upsert)
+
+    Row user di-lock dulu supaya tidak bersamaan dengan increment EXP di add_exp.
+    User yang belum punya row PlayerStats dihitung untuk semua field.
+    """
+    from .services import lock_users
+
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    with transaction.atomic():
+        # User yang sudah dihapus (mis. refresh dari cascade delete) dilewati
+        user_ids = set(lock_users(user_ids))
+        if not user_ids:
+            return
+        fields = list(fields or STAT_FIELDS)
+        if set(fields) != set(STAT_FIELDS):
+            existing = set(PlayerStats.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+            if existing != user_ids:
+                fields = STAT_FIELDS
+
+        stats = compute_player_stats(user_ids, fields)
+        PlayerStats.objects.bulk_create(
+            [PlayerStats(user_id=user_id, **values) for user_id, values in stats.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=fields
+        )
+
+
+_pending = threading.local()
+
+
+def _flush_pending_refreshes():
+    pending = getattr(_pending, 'refreshes', None)
+    _pending.refreshes = {}
+    if not pending:
+        return
+
+    # Satu refresh untuk gabungan field: query count tetap, tidak tergantung
+    # berapa kombinasi field yang berbeda di antara user
+    fields = set().union(*pending.values())
+    refresh_player_stats(pending, fields)
+
+
+def schedule_player_stats_refresh(user_ids, fields=None):
+    """
+    Jadwalkan recount counter setelah transaction commit
+
+    Beberapa perubahan di transaction yang sama (mis. cascade delete) digabung
+    menjadi satu refresh per user.
+    """
+    pending = getattr(_pending, 'refreshes', None)
+    if pending is None:
+        pending = _pending.refreshes = {}
+    for user_id in user_ids:
+        pending.setdefault(user_id, set()).update(fields or STAT_FIELDS)
+    transaction.on_commit(_flush_pending_refreshes)
+
+
+def add_exp_totals(totals):
+    """
+    Increment exp_earned/exp_lost dengan satu UPDATE
+    Dipanggil oleh record_exp_logs() di dalam transaction add_exp (row user di-lock)
+
+    Args:
+        totals: {user_id: (exp_earned, exp_lost)}
+    """
+    if not totals:
+        return
+
+    updated = PlayerStats.objects.filter(user_id__in=totals).update(
+        exp_earned=F('exp_earned') + Case(
+            *[When(user_id=user_id, then=Value(earned)) for user_id, (earned, _) in totals.items()],
+            default=Value(0)
+        ),
+        exp_lost=F('exp_lost') + Case(
+            *[When(user_id=user_id, then=Value(lost)) for user_id, (_, lost) in totals.items()],
+            default=Value(0)
+        )
+    )
+    if updated < len(totals):
+        # Ada user tanpa row PlayerStats: hitung lengkap setelah commit
+        schedule_player_stats_refresh(totals)
+
+
+def get_player_stats(user):
+    """
+    PlayerStats untuk user (satu row), dibuat dari data asli jika belum ada
+    """
+    try:
+        return PlayerStats.objects.get(user=user)
+    except PlayerStats.DoesNotExist:
+        refresh_player_stats([user.pk])
+        return PlayerStats.objects.get(user=user)
@@ -0,0 +1,439 @@
+"""
+Query-budget regression tests
+
+Setiap view di core/urls.py dan gamification/urls.py, serta service di core/services.py,
+diukur jumlah query-nya pada dua volume data (kecil dan besar). Jumlah query harus:
+    - tidak melebihi budget yang ditentukan
+    - sama persis untuk kedua volume (tidak tumbuh sesuai jumlah player/row)
+Jika gagal, semua SQL yang dijalankan ditampilkan di pesan error.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.boards import get_period_expiry, get_period_start
+from core.levels import get_level_curve
+from core.models import (
+    ExpLog, LeaderboardScore, Dungeon, Attendance, Sidequest, SidequestSubmission, Boss, Punishment, StatusEffect
+)
+from core.services import (
+    add_exp, add_exp_bulk, check_level_up, apply_level_bonus, check_honor_privileges, PunishmentService
+)
+
+User = get_user_model()
+
+
+class QueryBudgetMixin:
+    """Helper untuk mengukur dan membandingkan jumlah query"""
+
+    # Jumlah row per model untuk volume kecil dan besar
+    # Volume besar melewati semua batas halaman/slice (paginate_by 10, Paginator 20,
+    # top 10/20 leaderboard), supaya N+1 yang baru muncul di halaman penuh ikut terdeteksi
+    SMALL = 3
+    LARGE = 30
+
+    def capture(self, func):
+        """
+        Jalankan func dan return query yang dieksekusi, termasuk callback on_commit
+        (penanda ranking stale, invalidation cache) yang ikut dibayar oleh caller
+        """
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                func()
+        return context.captured_queries
+
+    def statements(self, queries):
+        """
+        Query yang dihitung untuk budget: batch bulk_create yang dipecah karena limit
+        parameter database (INSERT ke tabel dan kolom yang sama berturut-turut)
+        dihitung satu statement, karena jumlahnya tumbuh per ratusan row, bukan per row
+        """
+        statements = []
+        previous = None
+        for query in queries:
+            sql = query['sql']
+            key = sql.split(' VALUES ')[0] if sql.startswith('INSERT ') else None
+            if key is None or key != previous:
+                statements.append(query)
+            previous = key
+        return statements
+
+    def format_queries(self, queries):
+        return '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(queries, start=1))
+
+    def assertQueryBudget(self, name, budget, small_queries, large_queries):
+        """Assert budget dan bahwa query count tidak tumbuh sesuai volume data"""
+        small_queries = self.statements(small_queries)
+        large_queries = self.statements(large_queries)
+        if len(large_queries) > budget:
+            self.fail(
+                f'{name}: {len(large_queries)} queries executed, budget is {budget}\n'
+                f'{self.format_queries(large_queries)}'
+            )
+        if len(small_queries) != len(large_queries):
+            self.fail(
+                f'{name}: query count grows with data volume '
+                f'({len(small_queries)} queries for {self.SMALL} rows, '
+                f'{len(large_queries)} queries for {self.LARGE} rows)\n'
+                f'--- {self.SMALL} rows ---\n{self.format_queries(small_queries)}\n'
+                f'--- {self.LARGE} rows ---\n{self.format_queries(large_queries)}'
+            )
+
+    def seed(self, count):
+        """Tambah `count` player beserta histori dan `count` row untuk setiap model"""
+        now = timezone.now()
+        start = User.objects.filter(role='player').count()
+        players = User.objects.bulk_create([
+            User(username=f'player{start + i}', email=f'player{start + i}@example.com', role='player',
+                 honor_points=500, total_exp=100 * (start + i), current_exp=10)
+            for i in range(count)
+        ])
+        dungeons = Dungeon.objects.bulk_create([
+            Dungeon(name=f'Dungeon {start + i}', description='Seed', scheduled_date=now + timedelta(days=i),
+                    status='active')
+            for i in range(count)
+        ])
+        sidequests = Sidequest.objects.bulk_create([
+            Sidequest(title=f'Sidequest {start + i}', description='Seed', instructions='Seed',
+                      due_date=now + timedelta(days=7), status='active')
+            for i in range(count)
+        ])
+        # Refresh stats yang dijadwalkan signal saat seed dijalankan di sini, bukan di dalam
+        # pengukuran berikutnya (juga membuat row PlayerStats untuk player hasil bulk_create)
+        with self.captureOnCommitCallbacks(execute=True):
+            for player in [self.player] + players:
+                ExpLog.objects.bulk_create([
+                    ExpLog(user=player, activity_type=activity_type, exp_earned=exp, description=description)
+                    for activity_type, exp, description in [
+                        ('quest', 50, 'Seed quest'),
+                        ('assignment', 80, 'Seed assignment'),
+                        ('other', -20, 'Seed penalty'),
+                        ('bonus', 0, 'Level Up! 1 → 2. Bonus: 20 Honor Points'),
+                    ]
+                ])
+                Attendance.objects.bulk_create([
+                    Attendance(user=player, dungeon=dungeon, attended=bool(i % 2), participation_exp=50)
+                    for i, dungeon in enumerate(dungeons)
+                ])
+                SidequestSubmission.objects.bulk_create([
+                    SidequestSubmission(user=player, sidequest=sidequest, submitted_file='submissions/seed.txt',
+                                        grade=80 if i % 2 else None)
+                    for i, sidequest in enumerate(sidequests)
+                ])
+                Boss.objects.create(type='mini_boss', name='Seed boss', description='Seed', base_score=70,
+                                    final_score=70, user=player, battle_date=now.date())
+                Punishment.objects.create(user=player, type='late_submission', severity='minor',
+                                          description='Seed punishment', created_by=self.admin)
+                StatusEffect.objects.create(user=player, effect_type='fatigue', description='Seed effect',
+                                            exp_multiplier=0.8, start_date=now, end_date=now + timedelta(days=3))
+        # Board minggu ini untuk assignment (player utama di urutan terakhir)
+        week_start = get_period_start('week')
+        LeaderboardScore.objects.filter(user=self.player).delete()
+        LeaderboardScore.objects.bulk_create([
+            LeaderboardScore(user=player, period='week', period_start=week_start, activity_type='assignment',
+                             score=80 * (player.pk - self.player.pk + 1),
+                             expires_at=get_period_expiry('week', week_start))
+            for player in [self.player] + players
+        ])
+        return players
+
+
+class ViewQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Query budget untuk setiap URL di core/urls.py dan gamification/urls.py"""
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', role='admin', is_staff=True)
+        self.player = User.objects.create(username='player', role='player', honor_points=500)
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.player_client = Client()
+        self.player_client.force_login(self.player)
+        get_level_curve()
+
+    def measure(self, name, budget, request, prepare=None):
+        """
+        Jalankan request pada volume kecil dan besar, lalu bandingkan query count
+        prepare() (optional) dijalankan di luar pengukuran dan hasilnya dipass ke request()
+        """
+        counts = []
+        for count in (self.SMALL, self.LARGE - self.SMALL):
+            self.seed(count)
+            args = (prepare(),) if prepare else ()
+            cache.clear()
+            get_level_curve()
+            counts.append(self.capture(lambda: self.assertLess(request(*args).status_code, 400, name)))
+        self.assertQueryBudget(name, budget, *counts)
+
+    def admin_get(self, name, budget, url_name, **kwargs):
+        self.measure(name, budget, lambda: self.admin_client.get(reverse(url_name, kwargs=kwargs)))
+
+    def player_get(self, name, budget, url_name, **kwargs):
+        self.measure(name, budget, lambda: self.player_client.get(reverse(url_name, kwargs=kwargs)))
+
+    # Admin views (core/urls.py)
+
+    def test_admin_dashboard(self):
+        self.admin_get('admin_dashboard', 10, 'admin_dashboard:dashboard')
+
+    def test_player_list(self):
+        self.admin_get('player_list', 6, 'admin_dashboard:player_list')
+
+    def test_dungeon_list(self):
+        self.admin_get('dungeon_list', 6, 'admin_dashboard:dungeon_list')
+
+    def test_dungeon_forms(self):
+        dungeon = Dungeon.objects.create(name='Form', description='Form', scheduled_date=timezone.now())
+        self.admin_get('dungeon_create', 4, 'admin_dashboard:dungeon_create')
+        self.admin_get('dungeon_update', 4, 'admin_dashboard:dungeon_update', pk=dungeon.pk)
+        self.admin_get('dungeon_delete', 4, 'admin_dashboard:dungeon_delete', pk=dungeon.pk)
+
+    def test_attendance_update_get(self):
+        dungeon = Dungeon.objects.create(name='Attendance', description='Form', scheduled_date=timezone.now())
+        self.admin_get('attendance_update', 8, 'admin_dashboard:attendance_update', dungeon_pk=dungeon.pk)
+
+    def seed_absences(self):
+        """
+        Dua absen terakhir untuk setiap player, supaya absen berikutnya memicu absence
+        punishment untuk semua player di kedua volume (cabang yang sama)
+        """
+        players = list(User.objects.filter(role='player'))
+        for name in ('Missed 1', 'Missed 2'):
+            dungeon = Dungeon.objects.create(name=name, description='Missed', scheduled_date=timezone.now())
+            Attendance.objects.bulk_create([
+                Attendance(user=player, dungeon=dungeon, attended=False, participation_exp=0)
+                for player in players
+            ])
+
+    def test_attendance_update_bulk_post(self):
+        def prepare():
+            self.seed_absences()
+            dungeon = Dungeon.objects.create(name='Bulk', description='Bulk', scheduled_date=timezone.now())
+            url = reverse('admin_dashboard:attendance_update', kwargs={'dungeon_pk': dungeon.pk})
+            self.admin_client.post(url, {'bulk': 'all'})
+            return url
+        self.measure('attendance_update (bulk all)', 23,
+                     lambda url: self.admin_client.post(url, {'bulk': 'all'}), prepare)
+        # Semua player absen 3x berturut-turut: + absence punishment batch untuk semua player
+        self.measure('attendance_update (bulk none)', 60,
+                     lambda url: self.admin_client.post(url, {'bulk': 'none'}), prepare)
+
+    def test_attendance_update_item_post(self):
+        def prepare():
+            self.seed_absences()
+            dungeon = Dungeon.objects.create(name='Items', description='Items', scheduled_date=timezone.now())
+            url = reverse('admin_dashboard:attendance_update', kwargs={'dungeon_pk': dungeon.pk})
+            self.admin_client.get(url)
+            data = {
+                f'attended_{attendance.pk}': 'on'
+                for attendance in Attendance.objects.filter(dungeon=dungeon)[::2]
+            }
+            return url, data
+        # Player yang tidak dicentang absen 3x berturut-turut: + absence punishment batch
+        self.measure('attendance_update (per item)', 64,
+                     lambda args: self.admin_client.post(*args), prepare)
+
+    def test_sidequest_list(self):
+        self.admin_get('sidequest_list', 6, 'admin_dashboard:sidequest_list')
+
+    def test_sidequest_forms(self):
+        sidequest = Sidequest.objects.create(title='Form', description='Form', instructions='Form',
+                                             due_date=timezone.now() + timedelta(days=1))
+        self.admin_get('sidequest_create', 4, 'admin_dashboard:sidequest_create')
+        self.admin_get('sidequest_update', 4, 'admin_dashboard:sidequest_update', pk=sidequest.pk)
+        self.admin_get('sidequest_delete', 4, 'admin_dashboard:sidequest_delete', pk=sidequest.pk)
+
+    def test_sidequest_create_post(self):
+        def request():
+            return self.admin_client.post(reverse('admin_dashboard:sidequest_create'), {
+                'title': 'Broadcast', 'description': 'New', 'instructions': 'New',
+                'due_date': (timezone.now() + timedelta(days=3)).strftime('%Y-%m-%dT%H:%M'),
+                'exp_reward': 200, 'late_exp_reward': 100, 'status': 'active',
+            })
+        self.measure('sidequest_create (post)', 5, request)
+
+    def test_sidequest_submissions(self):
+        sidequest = Sidequest.objects.create(title='Subs', description='Subs', instructions='Subs',
+                                             due_date=timezone.now() + timedelta(days=1))
+
+        def prepare():
+            for player in User.objects.filter(role='player').exclude(sidequest_submissions__sidequest=sidequest):
+                SidequestSubmission.objects.create(user=player, sidequest=sidequest,
+                                                   submitted_file='submissions/seed.txt')
+            return reverse('admin_dashboard:sidequest_submissions', kwargs={'sidequest_pk': sidequest.pk})
+        self.measure('sidequest_submissions', 5, self.admin_client.get, prepare)
+
+    def test_grade_submission(self):
+        sidequest = Sidequest.objects.create(title='Grade', description='Grade', instructions='Grade',
+                                             due_date=timezone.now() + timedelta(days=1))
+
+        def prepare():
+            submission = SidequestSubmission.objects.create(
+                user=User.objects.create(username=f'grade{User.objects.count()}', role='player', honor_points=500),
+                sidequest=sidequest, submitted_file='submissions/seed.txt'
+            )
+            return reverse('admin_dashboard:grade_submission', kwargs={'submission_pk': submission.pk})
+        self.measure('grade_submission (get)', 5, self.admin_client.get, prepare)
+        self.measure('grade_submission (post)', 34,
+                     lambda url: self.admin_client.post(url, {'grade': 90, 'feedback': 'Nice'}), prepare)
+
+    def test_boss_views(self):
+        boss = Boss.objects.create(type='mini_boss', name='Form', description='Form', base_score=60,
+                                   user=self.player, battle_date=timezone.now().date())
+        self.admin_get('boss_list', 6, 'admin_dashboard:boss_list')
+        self.admin_get('boss_create', 5, 'admin_dashboard:boss_create')
+        self.admin_get('boss_update', 6, 'admin_dashboard:boss_update', pk=boss.pk)
+        self.admin_get('boss_delete', 5, 'admin_dashboard:boss_delete', pk=boss.pk)
+
+    def test_punishment_views(self):
+        punishment = Punishment.objects.create(user=self.player, type='late_submission', severity='minor',
+                                               description='Form')
+        self.admin_get('punishment_list', 6, 'admin_dashboard:punishment_list')
+        self.admin_get('punishment_create', 5, 'admin_dashboard:punishment_create')
+        self.admin_get('punishment_update', 6, 'admin_dashboard:punishment_update', pk=punishment.pk)
+        self.admin_get('punishment_delete', 5, 'admin_dashboard:punishment_delete', pk=punishment.pk)
+        self.admin_get('punishment_resolve', 5, 'admin_dashboard:punishment_resolve', pk=punishment.pk)
+
+    def test_status_effect_list(self):
+        self.admin_get('status_effect_list', 6, 'admin_dashboard:status_effect_list')
+
+    def test_analytics_and_exports(self):
+        self.admin_get('analytics_dashboard', 30, 'admin_dashboard:analytics_dashboard')
+        self.admin_get('export_player_progress_csv', 4, 'admin_dashboard:export_player_progress_csv')
+        self.admin_get('export_grades_pdf', 4, 'admin_dashboard:export_grades_pdf')
+        self.admin_get('export_analytics_excel', 12, 'admin_dashboard:export_analytics_excel')
+
+    # Player views (gamification/urls.py)
+
+    def test_player_dashboard(self):
+        self.player_get('player_dashboard', 12, 'player:dashboard')
+
+    def test_player_profile(self):
+        self.player_get('player_profile', 10, 'player:profile')
+
+    def test_exp_history(self):
+        self.player_get('exp_history', 5, 'player:exp_history')
+
+    def test_punishment_history(self):
+        self.player_get('punishment_history', 5, 'player:punishment_history')
+
+    # Top kecil supaya player (rank terakhir) di luar top di kedua volume:
+    # window around-me selalu ikut diukur
+    @patch('gamification.views.LEADERBOARD_TOP', 2)
+    def test_leaderboard(self):
+        self.player_get('leaderboard', 5, 'player:leaderboard')
+
+    @patch('gamification.views.LEADERBOARD_TOP', 2)
+    def test_leaderboard_board(self):
+        self.measure('leaderboard (week, assignment)', 6, lambda: self.player_client.get(
+            reverse('player:leaderboard'), {'period': 'week', 'activity': 'assignment'}
+        ))
+
+    def test_leaderboard_data(self):
+        self.player_get('leaderboard_data', 3, 'player:leaderboard_data')
+
+    def test_ajax_endpoints(self):
+        self.player_get('ajax_user_stats', 5, 'player:ajax_stats')
+        self.player_get('ajax_recent_activities', 4, 'player:ajax_activities')
+
+    def test_player_sidequests(self):
+        sidequest = Sidequest.objects.create(title='Submit', description='Submit', instructions='Submit',
+                                             due_date=timezone.now() + timedelta(days=1), status='active')
+        submission = SidequestSubmission.objects.filter(user=self.player).first() or SidequestSubmission.objects.create(
+            user=self.player, sidequest=Sidequest.objects.create(
+                title='Own', description='Own', instructions='Own', due_date=timezone.now() + timedelta(days=1)
+            ), submitted_file='submissions/seed.txt'
+        )
+        self.player_get('player_sidequest_list', 4, 'player:sidequest_list')
+        self.player_get('submit_sidequest', 5, 'player:submit_sidequest', sidequest_pk=sidequest.pk)
+        self.player_get('submission_status', 4, 'player:submission_status', submission_pk=submission.pk)
+
+    def test_player_dungeons(self):
+        dungeon = Dungeon.objects.create(name='Detail', description='Detail', scheduled_date=timezone.now())
+        self.player_get('player_dungeon_list', 4, 'player:dungeon_list')
+        self.player_get('player_dungeon_detail', 5, 'player:dungeon_detail', dungeon_pk=dungeon.pk)
+
+    def test_dashboard_card_details(self):
+        self.player_get('exp_summary', 5, 'player:exp_summary')
+        self.player_get('exp_lost', 4, 'player:exp_lost')
+        self.player_get('honor_history', 5, 'player:honor_history')
+        self.player_get('recent_activities', 3, 'player:recent_activities')
+
+
+class ServiceQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Query budget untuk service di core/services.py"""
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', role='admin', is_staff=True)
+        self.player = User.objects.create(username='player', role='player', honor_points=500)
+        get_level_curve()
+
+    def measure_service(self, name, budget, func):
+        """Jalankan service untuk player baru pada volume kecil dan besar"""
+        player = self.seed_target(self.SMALL)
+        small = self.capture(lambda: func(player))
+        player = self.seed_target(self.LARGE - self.SMALL)
+        large = self.capture(lambda: func(player))
+        self.assertQueryBudget(name, budget, small, large)
+
+    def seed_target(self, count):
+        """
+        Seed `count` player dan return player pertama dengan progress yang sama di
+        kedua volume (total_exp hasil seed tumbuh sesuai urutan player, sehingga
+        service bisa mengambil cabang level up yang berbeda)
+        """
+        player = self.seed(count)[0]
+        User.objects.filter(pk=player.pk).update(total_exp=100, current_exp=10, current_level=1)
+        player.refresh_from_db()
+        return player
+
+    def test_add_exp(self):
+        self.measure_service('add_exp', 18, lambda player: add_exp(player, 50, 'quest', 'Budget'))
+
+    def test_add_exp_level_up(self):
+        self.measure_service('add_exp (level up)', 18, lambda player: add_exp(player, 5000, 'quest', 'Budget'))
+
+    def test_add_exp_bulk(self):
+        def func(player):
+            players = list(User.objects.filter(role='player'))
+            add_exp_bulk([(p, 300, 'participation', 'Budget') for p in players])
+        self.measure_service('add_exp_bulk', 19, func)
+
+    def test_check_level_up(self):
+        self.measure_service('check_level_up', 5, check_level_up)
+
+    def test_apply_level_bonus(self):
+        self.measure_service('apply_level_bonus', 6, lambda player: apply_level_bonus(player, 3))
+
+    def test_check_honor_privileges(self):
+        self.measure_service('check_honor_privileges', 0, check_honor_privileges)
+
+    def test_punishment_service(self):
+        self.measure_service(
+            'apply_plagiarism_punishment', 34,
+            lambda player: PunishmentService.apply_plagiarism_punishment(player, 'major', created_by=self.admin)
+        )
+        self.measure_service(
+            'apply_cheating_punishment', 34,
+            lambda player: PunishmentService.apply_cheating_punishment(player, 'mid_boss', created_by=self.admin)
+        )
+        self.measure_service(
+            'check_and_apply_absence_punishment', 23,
+            lambda player: PunishmentService.check_and_apply_absence_punishment(player, created_by=self.admin)
+        )
+        self.measure_service(
+            'apply_absence_punishments_bulk', 12,
+            lambda player: PunishmentService.apply_absence_punishments_bulk(
+                User.objects.filter(role='player'), created_by=self.admin
+            )
+        )
+        self.measure_service(
+            'recover_honor_points', 6,
+            lambda player: PunishmentService.recover_honor_points(player, 5)
+        )
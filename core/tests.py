@@ -1,12 +1,56 @@
 """
 Tests untuk core app
 """
-from django.test import TestCase, Client
+import importlib
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.db import DatabaseError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.urls import reverse
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
-from core.models import Level, ExpLog, Dungeon, Attendance, Sidequest, SidequestSubmission, Boss, Punishment, StatusEffect
-from core.services import add_exp, check_level_up, calculate_final_score, PunishmentService, check_honor_privileges
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from core.models import Level, ExpLog, ExpDailyRollup, ExpLogArchive, LeaderboardScore, LevelUpEvent, PlayerStats, Dungeon, Attendance, Sidequest, SidequestSubmission, Boss, Punishment, StatusEffect, OutboxMessage, Notification
+from core import outbox
+from core.notifications import (
+    send_notification, broadcast_notification, broadcast_leaderboard_update, deliver_broadcast_notification,
+    deliver_leaderboard_update, deliver_notification, deliver_player_update
+)
+from core.levels import GENERATION_CACHE_KEY, LevelCurve, get_level_curve
+from core.checks import check_shared_cache
+from core.multipliers import get_status_effect_multipliers, invalidate_exp_multipliers
+from core.boards import (
+    ALL_TIME_START, get_board_rank, get_board_rows, get_board_top, get_period_expiry, get_period_start, prune_leaderboard_scores,
+    rebuild_leaderboard_scores
+)
+from core.leaderboard import (
+    BROADCAST_SLOT_CACHE_KEY, PUBLISH_LOCK_CACHE_KEY, SNAPSHOT_CACHE_KEY, diff_leaderboard, get_leaderboard_snapshot,
+    get_published_leaderboard
+)
+from core.ranking import (
+    RANKING_REFRESH_SLOT_CACHE_KEY, encode_cursor, ensure_rankings, get_leaderboard_page, get_player_count,
+    get_rank, get_ranking_version, get_top_players, mark_rankings_stale, seek_players
+)
+from core.presence import (
+    PRESENCE_PUBLISH_LOCK_CACHE_KEY, PRESENCE_SET_CACHE_KEY, acquire_presence_flush, get_online_users,
+    get_presence_snapshot, publish_presence, release_presence_flush, remove_presence, sweep_presence, touch_presence
+)
+from core.inbox import get_missed_notifications, get_unread_count, mark_notifications_read
+from core.rollups import build_rollups
+from core.archive import ExpLogHistory
+from core.test_query_budget import QueryBudgetMixin
+from core.services import add_exp, add_exp_bulk, adjust_honor_points, expire_status_effects, check_level_up, calculate_final_score, PunishmentService, check_honor_privileges, lock_users
 
 User = get_user_model()
 
@@ -35,6 +79,56 @@ class LevelModelTest(TestCase):
         self.assertEqual(levels[2].level, 3)
 
 
+class LevelCurveTest(TestCase):
+    """Tests untuk compiled level curve"""
+    
+    def setUp(self):
+        self.curve = LevelCurve([(1, 0, None), (2, 100, 'Two'), (3, 250, None)])
+    
+    def test_level_for_exp(self):
+        self.assertEqual(self.curve.level_for_exp(0), 1)
+        self.assertEqual(self.curve.level_for_exp(99), 1)
+        self.assertEqual(self.curve.level_for_exp(100), 2)
+        self.assertEqual(self.curve.level_for_exp(10000), 3)
+        self.assertIsNone(self.curve.level_for_exp(-5))
+    
+    def test_next_level_and_progress(self):
+        self.assertEqual(self.curve.next_level(1), (2, 100))
+        self.assertIsNone(self.curve.next_level(3))
+        progress = self.curve.progress(175, 2)
+        self.assertEqual(progress['exp_needed'], 75)
+        self.assertEqual(progress['exp_progress'], 50)
+        self.assertEqual(self.curve.progress(300, 3)['exp_progress'], 100)
+    
+    def test_bonus(self):
+        self.assertEqual(self.curve.bonus(2), {'honor_points': 20, 'description': 'Two'})
+        self.assertEqual(self.curve.bonus(3)['description'], 'Reached Level 3!')
+        self.assertIsNone(self.curve.bonus(4))
+    
+    def test_reload_on_level_change(self):
+        get_level_curve()
+        level = Level.objects.create(level=99, exp_required=999999)
+        self.assertEqual(get_level_curve().exp_required(99), 999999)
+        level.delete()
+        self.assertIsNone(get_level_curve().exp_required(99))
+    
+    def test_lookup_without_queries(self):
+        curve = get_level_curve()
+        with self.assertNumQueries(0):
+            get_level_curve().level_for_exp(500)
+            curve.progress(500, 3)
+    
+    def test_reload_on_invalidation_from_other_process(self):
+        Level.objects.create(level=99, exp_required=999999)
+        self.assertEqual(get_level_curve().exp_required(99), 999999)
+        # Process lain mengubah Level: curve process ini tidak dibuang langsung,
+        # hanya generation di shared cache yang naik
+        Level.objects.filter(level=99).update(exp_required=888888)
+        self.assertEqual(get_level_curve().exp_required(99), 999999)
+        cache.incr(GENERATION_CACHE_KEY)
+        self.assertEqual(get_level_curve().exp_required(99), 888888)
+
+
 class ExpLogModelTest(TestCase):
     """Tests untuk ExpLog model"""
     
@@ -110,6 +204,1719 @@ class AddExpServiceTest(TestCase):
         self.assertEqual(self.user.current_exp, 80)
 
 
+class AddExpBulkServiceTest(QueryBudgetMixin, TestCase):
+    """Tests untuk add_exp_bulk service function"""
+    
+    def setUp(self):
+        Level.objects.get_or_create(level=1, defaults={'exp_required': 0})
+        Level.objects.get_or_create(level=2, defaults={'exp_required': 100})
+        Level.objects.get_or_create(level=3, defaults={'exp_required': 250})
+    
+    def _create_players(self, prefix, count):
+        return [
+            User.objects.create(username=f'{prefix}{i}', role='player', honor_points=500)
+            for i in range(count)
+        ]
+    
+    def test_matches_sequential_add_exp(self):
+        sequential = self._create_players('seq', 2)
+        bulk = self._create_players('bulk', 2)
+        StatusEffect.objects.create(
+            user=sequential[0], effect_type='weakness', description='Test',
+            exp_multiplier=0.75, start_date=timezone.now()
+        )
+        StatusEffect.objects.create(
+            user=bulk[0], effect_type='weakness', description='Test',
+            exp_multiplier=0.75, start_date=timezone.now()
+        )
+        
+        plan = [(0, 80, 'quest'), (1, 120, 'assignment'), (0, 60, 'quest'), (1, -30, 'other')]
+        expected = [add_exp(sequential[idx], amount, activity, 'Test') for idx, amount, activity in plan]
+        results = add_exp_bulk([(bulk[idx], amount, activity, 'Test') for idx, amount, activity in plan])
+        
+        keys = ['new_exp', 'new_total_exp', 'level_up', 'new_level', 'old_level', 'exp_multiplier', 'actual_amount']
+        for exp_result, bulk_result in zip(expected, results):
+            for key in keys:
+                self.assertEqual(exp_result[key], bulk_result[key], key)
+        
+        for seq_user, bulk_user in zip(sequential, bulk):
+            seq_user.refresh_from_db()
+            bulk_user.refresh_from_db()
+            self.assertEqual(seq_user.current_exp, bulk_user.current_exp)
+            self.assertEqual(seq_user.total_exp, bulk_user.total_exp)
+            self.assertEqual(seq_user.current_level, bulk_user.current_level)
+            self.assertEqual(seq_user.honor_points, bulk_user.honor_points)
+            self.assertEqual(
+                list(ExpLog.objects.filter(user=seq_user).order_by('id').values_list('exp_earned', 'activity_type')),
+                list(ExpLog.objects.filter(user=bulk_user).order_by('id').values_list('exp_earned', 'activity_type'))
+            )
+    
+    def test_expired_effects_are_ignored(self):
+        player = self._create_players('player', 1)[0]
+        effect = StatusEffect.objects.create(
+            user=player, effect_type='curse', description='Expired',
+            exp_multiplier=0.5, start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() - timedelta(days=1)
+        )
+        results = add_exp_bulk([(player, 50, 'quest', 'Test')])
+        self.assertEqual(results[0]['actual_amount'], 50)
+        # Deactivation diserahkan ke expire_status_effects(), bukan hot path EXP
+        effect.refresh_from_db()
+        self.assertTrue(effect.is_active)
+    
+    def test_level_up_event_matches_log_timestamp(self):
+        players = self._create_players('lvl', 2)
+        add_exp_bulk([(player, 120, 'quest', 'Test') for player in players])
+        
+        for player in players:
+            event = LevelUpEvent.objects.get(user=player)
+            bonus_log = ExpLog.objects.get(user=player, activity_type='bonus')
+            self.assertEqual(event.created_at, bonus_log.created_at)
+    
+    def test_query_count_is_constant(self):
+        small = self._create_players('small', 3)
+        large = self._create_players('large', 30)
+        
+        get_level_curve()
+        
+        with CaptureQueriesContext(connection) as small_queries:
+            add_exp_bulk([(player, 120, 'participation', 'Attended') for player in small])
+        with CaptureQueriesContext(connection) as large_queries:
+            add_exp_bulk([(player, 120, 'participation', 'Attended') for player in large])
+        
+        # savepoint + lock users + effects + insert + player stats
+        # + rollups (select + upsert) + level up events + update + savepoint real-time update
+        # + state version + inbox insert + outbox insert + release (x2)
+        # (upsert yang dipecah karena limit parameter SQLite dihitung satu statement)
+        self.assertLessEqual(len(self.statements(small_queries)), 18)
+        self.assertEqual(len(self.statements(small_queries)), len(self.statements(large_queries)))
+
+
+class AtomicExpUpdateTest(TestCase):
+    """Tests bahwa mutasi EXP dan honor tidak memakai nilai in-memory yang basi"""
+    
+    def setUp(self):
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+    
+    def test_add_exp_ignores_stale_instance(self):
+        stale = User.objects.get(pk=self.user.pk)
+        add_exp(self.user, 40, 'quest', 'First')
+        add_exp(stale, 30, 'quest', 'Second')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_exp, 70)
+        self.assertEqual(stale.total_exp, 70)
+    
+    def test_add_exp_only_writes_progress_columns(self):
+        User.objects.filter(pk=self.user.pk).update(email='changed@example.com')
+        add_exp(self.user, 10, 'quest', 'Test')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'changed@example.com')
+    
+    def test_honor_changes_are_relative(self):
+        stale = User.objects.get(pk=self.user.pk)
+        PunishmentService.recover_honor_points(self.user, 5)
+        PunishmentService.recover_honor_points(stale, 5)
+        self.assertEqual(stale.honor_points, 510)
+        
+        User.objects.filter(pk=self.user.pk).update(honor_points=998)
+        self.assertTrue(PunishmentService.recover_honor_points(self.user, 5))
+        self.assertEqual(self.user.honor_points, 1000)
+        self.assertFalse(PunishmentService.recover_honor_points(self.user, 5))
+
+
+class ExpMultiplierCacheTest(TestCase):
+    """Tests untuk cached EXP multiplier dari status effects"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+    
+    def add_effect(self, multiplier, end_date=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StatusEffect.objects.create(
+                user=self.user, effect_type='curse', description='Test',
+                exp_multiplier=multiplier, start_date=timezone.now(), end_date=end_date
+            )
+    
+    def award(self, amount=100):
+        """add_exp dengan on_commit callbacks dijalankan (cache diisi seperti di production)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return add_exp(self.user, amount, 'quest', 'Test')
+    
+    def test_cached_multiplier_skips_effect_reads(self):
+        self.add_effect(0.5)
+        self.assertEqual(self.award()['actual_amount'], 50)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.award()['actual_amount'], 50)
+        self.assertFalse([q for q in queries.captured_queries if 'core_statuseffect' in q['sql']])
+    
+    def test_new_effect_invalidates_cache(self):
+        self.assertEqual(self.award()['actual_amount'], 100)
+        self.add_effect(0.5)
+        self.assertEqual(self.award()['actual_amount'], 50)
+    
+    def test_deactivated_effect_invalidates_cache(self):
+        effect = self.add_effect(0.5)
+        self.award()
+        with self.captureOnCommitCallbacks(execute=True):
+            effect.deactivate()
+        self.assertEqual(self.award()['actual_amount'], 100)
+    
+    def test_expired_effect_recomputed_without_invalidation(self):
+        self.add_effect(0.5, end_date=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.award()['actual_amount'], 50)
+        
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch('core.multipliers.timezone.now', return_value=later):
+            self.assertEqual(self.award()['actual_amount'], 100)
+    
+    def test_honor_tier_change_applies_immediately(self):
+        self.assertEqual(self.award()['actual_amount'], 100)
+        User.objects.filter(pk=self.user.pk).update(honor_points=900)
+        self.assertEqual(self.award()['actual_amount'], 120)
+    
+    def test_rolled_back_transaction_does_not_fill_cache(self):
+        self.add_effect(0.5)
+        # Tanpa commit, entry tidak ditulis ke cache
+        get_status_effect_multipliers([self.user.pk])
+        StatusEffect.objects.filter(user=self.user).update(is_active=False)
+        self.assertEqual(get_status_effect_multipliers([self.user.pk]), {self.user.pk: 1.0})
+    
+    def test_late_write_after_invalidation_is_ignored(self):
+        self.add_effect(0.5)
+        # Pembaca menghitung multiplier dari snapshot sebelum effect dinonaktifkan
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(get_status_effect_multipliers([self.user.pk]), {self.user.pk: 0.5})
+        StatusEffect.objects.filter(user=self.user).update(is_active=False)
+        invalidate_exp_multipliers([self.user.pk])
+        # on_commit set_many pembaca berjalan setelah invalidation
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_status_effect_multipliers([self.user.pk]), {self.user.pk: 1.0})
+
+
+class SharedCacheCheckTest(TestCase):
+    """Tests untuk deploy check core.W001 (cache harus di-share antar process)"""
+    
+    def test_process_local_cache_warns(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['core.W001'])
+    
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/1'
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class ExpireStatusEffectsTest(TestCase):
+    """Tests untuk expire_status_effects sweeper"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        now = timezone.now()
+        self.expired = [
+            StatusEffect.objects.create(
+                user=self.user, effect_type='curse', description='Expired',
+                exp_multiplier=0.5, start_date=now - timedelta(days=2), end_date=now - timedelta(days=1)
+            )
+            for _ in range(3)
+        ]
+        self.running = StatusEffect.objects.create(
+            user=self.user, effect_type='fatigue', description='Running',
+            exp_multiplier=0.8, start_date=now, end_date=now + timedelta(days=1)
+        )
+        self.permanent = StatusEffect.objects.create(
+            user=self.user, effect_type='silence', description='Permanent',
+            exp_multiplier=0.9, start_date=now
+        )
+    
+    def test_deactivates_only_expired_effects(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_status_effects(batch_size=2), 3)
+        self.assertFalse(StatusEffect.objects.filter(pk__in=[e.pk for e in self.expired], is_active=True).exists())
+        self.assertEqual(StatusEffect.objects.filter(pk__in=[self.running.pk, self.permanent.pk], is_active=True).count(), 2)
+        self.assertEqual(expire_status_effects(), 0)
+    
+    def test_invalidates_cache_and_notifies(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            get_status_effect_multipliers([self.user.pk])
+        with mock.patch('core.notifications.send_notification') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                expire_status_effects()
+        send.assert_called_once()
+        self.assertEqual(send.call_args.kwargs['user_id'], self.user.pk)
+        self.assertEqual(send.call_args.kwargs['data'], {'effect_types': ['curse']})
+        self.assertIsNone(cache.get(f'exp_multiplier_{self.user.pk}'))
+    
+    def test_management_command(self):
+        out = StringIO()
+        call_command('expire_status_effects', stdout=out)
+        self.assertIn('3 effects', out.getvalue())
+
+
+class OutboxTest(TestCase):
+    """Tests untuk transactional outbox notifications"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+    
+    def test_level_up_writes_outbox_without_channel_layer(self):
+        with mock.patch('core.notifications.get_channel_layer') as get_layer:
+            add_exp(self.user, 150, 'quest', 'Level up')
+        get_layer.assert_not_called()
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('kind', flat=True)),
+            ['leaderboard', 'notification', 'player_update']
+        )
+        notification = OutboxMessage.objects.get(kind='notification')
+        self.assertEqual(notification.payload['user_id'], self.user.pk)
+        self.assertEqual(notification.payload['notification_type'], 'level_up')
+    
+    def test_sidequest_create_enqueues_single_broadcast(self):
+        for i in range(5):
+            User.objects.create(username=f'class{i}', role='player')
+        admin = User.objects.create(username='boss', role='admin', is_staff=True)
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin_dashboard:sidequest_create'), {
+            'title': 'Broadcast', 'description': 'New', 'instructions': 'New',
+            'due_date': (timezone.now() + timedelta(days=3)).strftime('%Y-%m-%dT%H:%M'),
+            'exp_reward': 200, 'late_exp_reward': 100, 'status': 'active',
+        })
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.kind, 'broadcast')
+        self.assertEqual(message.payload['role'], 'player')
+        self.assertEqual(message.payload['notification_type'], 'sidequest')
+        self.assertIsNone(message.payload['user_ids'])
+        
+        with mock.patch('core.notifications.get_channel_layer') as get_layer:
+            outbox.deliver_outbox()
+        get_layer.return_value.group_send.assert_called_once()
+        self.assertEqual(get_layer.return_value.group_send.call_args.args[0], 'notifications_role_player')
+    
+    def test_add_exp_pushes_player_update(self):
+        add_exp(self.user, 20, 'quest', 'Small quest')
+        message = OutboxMessage.objects.get(kind='player_update')
+        self.assertEqual(message.payload['user_id'], self.user.pk)
+        self.assertEqual(message.payload['stats']['total_exp'], 20)
+        self.assertEqual(message.payload['stats']['current_level'], 1)
+        self.assertEqual(
+            [activity['description'] for activity in message.payload['activities']],
+            ['Small quest']
+        )
+    
+    def test_outbox_failure_keeps_exp_change(self):
+        other = User.objects.create(username='other', role='player', honor_points=500)
+        failing = mock.patch('core.outbox.OutboxMessage.objects.bulk_create', side_effect=DatabaseError('outbox down'))
+        with failing, self.assertLogs('core.services', 'ERROR') as logs:
+            with transaction.atomic():
+                add_exp(self.user, 20, 'quest', 'Quest')
+                add_exp_bulk([(other, 30, 'quest', 'Quest')])
+                adjust_honor_points(self.user, -10)
+                # Transaction caller tetap bisa dipakai
+                User.objects.filter(pk=self.user.pk).exists()
+        self.assertEqual(len(logs.records), 3)
+        
+        self.assertEqual(User.objects.get(pk=self.user.pk).total_exp, 20)
+        self.assertEqual(User.objects.get(pk=self.user.pk).honor_points, 490)
+        self.assertEqual(User.objects.get(pk=other.pk).total_exp, 30)
+        self.assertFalse(OutboxMessage.objects.exists())
+    
+    def test_honor_change_pushes_honor_stats_only(self):
+        adjust_honor_points(self.user, -10)
+        message = OutboxMessage.objects.get(kind='player_update')
+        self.assertEqual(message.payload['stats'], {
+            'honor_points': 490,
+            'honor_tier': check_honor_privileges(self.user)['honor_tier']
+        })
+        self.assertEqual(message.payload['activities'], [])
+    
+    def test_deliver_player_update(self):
+        add_exp(self.user, 20, 'quest', 'Small quest')
+        with mock.patch('core.notifications.deliver_player_update') as deliver:
+            outbox.deliver_outbox()
+        deliver.assert_called_once()
+        self.assertEqual(deliver.call_args.kwargs['user_id'], self.user.pk)
+        self.assertTrue(OutboxMessage.objects.get(kind='player_update').delivered_at)
+    
+    def test_rolled_back_transaction_leaves_no_messages(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                send_notification(self.user.pk, 'Hello')
+                raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+    
+    def test_batch_uses_single_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            with outbox.batch():
+                for _ in range(5):
+                    send_notification(self.user.pk, 'Hello')
+                broadcast_leaderboard_update()
+        # Satu INSERT inbox (Notification) + satu INSERT outbox
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(OutboxMessage.objects.count(), 6)
+        self.assertEqual(Notification.objects.count(), 5)
+    
+    def test_deliver_coalesces_leaderboard_updates(self):
+        send_notification(self.user.pk, 'Hello', data={'x': 1})
+        broadcast_leaderboard_update()
+        broadcast_leaderboard_update()
+        with mock.patch('core.notifications.deliver_notification') as deliver, \
+                mock.patch('core.notifications.deliver_leaderboard_update') as deliver_leaderboard:
+            result = outbox.deliver_outbox()
+        self.assertEqual(result, {'delivered': 3, 'retried': 0, 'failed': 0, 'deferred': 0})
+        deliver.assert_called_once_with(
+            user_id=self.user.pk, message='Hello', notification_type='info', data={'x': 1},
+            seq=Notification.objects.get().pk
+        )
+        deliver_leaderboard.assert_called_once_with()
+        self.assertFalse(OutboxMessage.objects.exclude(status='delivered').exists())
+        self.assertEqual(outbox.deliver_outbox(), {'delivered': 0, 'retried': 0, 'failed': 0, 'deferred': 0})
+    
+    def test_failed_delivery_is_retried_then_failed(self):
+        send_notification(self.user.pk, 'Hello')
+        with mock.patch('core.notifications.deliver_notification', side_effect=ConnectionError('down')):
+            self.assertEqual(outbox.deliver_outbox(max_attempts=2)['retried'], 1)
+            message = OutboxMessage.objects.get()
+            self.assertEqual(message.attempts, 1)
+            self.assertIn('down', message.last_error)
+            self.assertGreater(message.available_at, timezone.now())
+            
+            # Belum waktunya retry
+            self.assertEqual(outbox.deliver_outbox(max_attempts=2)['retried'], 0)
+            
+            OutboxMessage.objects.update(available_at=timezone.now())
+            self.assertEqual(outbox.deliver_outbox(max_attempts=2)['failed'], 1)
+        self.assertEqual(OutboxMessage.objects.get().status, 'failed')
+
+
+class LeaderboardBroadcastTest(TestCase):
+    """Tests untuk debounced leaderboard broadcast dan shared snapshot"""
+    
+    def setUp(self):
+        cache.clear()
+        self.players = [
+            User.objects.create(username=f'player{i}', role='player', honor_points=500, total_exp=i * 10)
+            for i in range(3)
+        ]
+        # Snapshot yang sudah dikirim ke client
+        self.seq, self.rows = get_published_leaderboard()
+    
+    def move_player0(self):
+        """player0: rank 3 -> 2, player1: rank 2 -> 3, player2 tetap"""
+        User.objects.filter(pk=self.players[0].pk).update(total_exp=15)
+        mark_rankings_stale()
+    
+    def deliver(self):
+        with mock.patch('core.notifications.get_channel_layer') as get_layer:
+            result = outbox.deliver_outbox()
+        return result, get_layer.return_value
+    
+    def test_one_broadcast_per_window(self):
+        self.move_player0()
+        for _ in range(50):
+            broadcast_leaderboard_update()
+        with mock.patch('core.notifications.async_to_sync') as async_to_sync:
+            result, _ = self.deliver()
+        self.assertEqual(result['delivered'], 50)
+        self.assertEqual(async_to_sync.return_value.call_count, 1)
+        
+        # Update baru di window yang sama ditunda, bukan dikirim
+        broadcast_leaderboard_update()
+        with mock.patch('core.notifications.async_to_sync') as async_to_sync:
+            result, _ = self.deliver()
+        self.assertEqual(result['deferred'], 1)
+        async_to_sync.assert_not_called()
+        message = OutboxMessage.objects.get(status='pending')
+        self.assertEqual(message.attempts, 0)
+        self.assertGreater(message.available_at, timezone.now())
+        
+        # Window berikutnya
+        cache.delete(BROADCAST_SLOT_CACHE_KEY)
+        OutboxMessage.objects.update(available_at=timezone.now())
+        with mock.patch('core.notifications.async_to_sync'):
+            self.assertEqual(self.deliver()[0]['delivered'], 1)
+    
+    def test_broadcast_sends_delta(self):
+        self.move_player0()
+        broadcast_leaderboard_update()
+        with mock.patch('core.notifications.async_to_sync') as async_to_sync:
+            self.deliver()
+        event = async_to_sync.return_value.call_args.args[1]
+        self.assertEqual(event['type'], 'leaderboard_delta')
+        delta = json.loads(event['text'])
+        self.assertEqual(delta['seq'], self.seq + 1)
+        self.assertEqual([(row['username'], row['rank']) for row in delta['upsert']], [('player0', 2), ('player1', 3)])
+        self.assertEqual(delta['remove'], [])
+        
+        # Snapshot untuk client baru = hasil delta diterapkan ke snapshot lama
+        seq, rows = get_published_leaderboard()
+        self.assertEqual(seq, delta['seq'])
+        self.assertEqual(rows, get_leaderboard_snapshot())
+    
+    def test_busy_publish_keeps_update_pending(self):
+        self.move_player0()
+        broadcast_leaderboard_update()
+        # Publish lain (worker lain) sedang memegang lock
+        cache.add(PUBLISH_LOCK_CACHE_KEY, True)
+        with mock.patch('core.notifications.async_to_sync') as async_to_sync:
+            result, _ = self.deliver()
+        self.assertEqual(result['deferred'], 1)
+        async_to_sync.assert_not_called()
+        self.assertEqual(OutboxMessage.objects.get().status, 'pending')
+        
+        # Lock dilepas: update dikirim di window berikutnya
+        cache.delete_many([PUBLISH_LOCK_CACHE_KEY, BROADCAST_SLOT_CACHE_KEY])
+        OutboxMessage.objects.update(available_at=timezone.now())
+        with mock.patch('core.notifications.async_to_sync') as async_to_sync:
+            self.assertEqual(self.deliver()[0]['delivered'], 1)
+        self.assertEqual(async_to_sync.return_value.call_count, 1)
+    
+    def test_no_broadcast_without_changes(self):
+        broadcast_leaderboard_update()
+        with mock.patch('core.notifications.async_to_sync') as async_to_sync:
+            result, _ = self.deliver()
+        self.assertEqual(result['delivered'], 1)
+        async_to_sync.assert_not_called()
+        self.assertEqual(get_published_leaderboard()[0], self.seq)
+    
+    def test_diff_removed_rows(self):
+        old = [{'id': 1, 'rank': 1}, {'id': 2, 'rank': 2}]
+        new = [{'id': 2, 'rank': 1}, {'id': 3, 'rank': 2}]
+        self.assertEqual(diff_leaderboard(old, new), {'upsert': new, 'remove': [1]})
+    
+    def test_snapshot_computed_once_per_version(self):
+        mark_rankings_stale()
+        with self.assertNumQueries(1):
+            get_leaderboard_snapshot()
+            get_leaderboard_snapshot()
+    
+    def test_snapshot_cached_as_columns(self):
+        get_leaderboard_snapshot()
+        columns = cache.get(SNAPSHOT_CACHE_KEY.format(
+            period='all', activity_type='', start=ALL_TIME_START.isoformat(), version=get_ranking_version()
+        ))
+        self.assertEqual(columns[1], ('player2', 'player1', 'player0'))
+        self.assertTrue(all(isinstance(column, tuple) for column in columns))
+    
+    def test_exp_change_bumps_version(self):
+        self.assertEqual(get_leaderboard_snapshot()[0]['username'], 'player2')
+        version = get_ranking_version()
+        
+        player = User.objects.get(username='player0')
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp(player, 50, 'attendance', 'Test')
+        
+        self.assertGreater(get_ranking_version(), version)
+        self.assertEqual(get_leaderboard_snapshot()[0]['username'], 'player0')
+    
+    @override_settings(LEADERBOARD_SNAPSHOT_TIMEOUT=5)
+    def test_snapshot_expires_without_version_bump(self):
+        # Version bump di process lain tidak terlihat dengan cache per process:
+        # snapshot lama hanya dipakai sampai TTL habis
+        self.assertEqual(get_leaderboard_snapshot()[0]['username'], 'player2')
+        User.objects.filter(pk=self.players[0].pk).update(total_exp=100)
+        self.assertEqual(get_leaderboard_snapshot()[0]['username'], 'player2')
+        
+        now = time.time()
+        with mock.patch('time.time', return_value=now + 6):
+            self.assertEqual(get_leaderboard_snapshot()[0]['username'], 'player0')
+    
+    def test_version_survives_cache_eviction(self):
+        version = get_ranking_version()
+        cache.clear()
+        mark_rankings_stale()
+        self.assertGreaterEqual(get_ranking_version(), version)
+
+
+@override_settings(LEADERBOARD_RANK_REFRESH_INTERVAL=0)
+class RankingServiceTest(TestCase):
+    """Tests untuk ranking service (PlayerRank + window function)"""
+    
+    def setUp(self):
+        cache.clear()
+        # Urutan: (level, total_exp, honor_points) desc, lalu id
+        self.players = [
+            User.objects.create(username=f'p{i}', role='player', honor_points=honor)
+            for i, honor in enumerate([500, 600, 500, 500])
+        ]
+        User.objects.filter(pk=self.players[0].pk).update(current_level=3, total_exp=300)
+        User.objects.filter(pk=self.players[1].pk).update(total_exp=50)
+        User.objects.filter(pk=self.players[2].pk).update(total_exp=50)
+        User.objects.filter(pk=self.players[3].pk).update(total_exp=80)
+        self.admin = User.objects.create(username='admin', role='admin', is_staff=True)
+        mark_rankings_stale()
+        ensure_rankings()
+    
+    def usernames(self, players):
+        return [player.username for player in players]
+    
+    def test_rank_top_and_page(self):
+        self.assertEqual(get_rank(self.players[0]), 1)
+        self.assertEqual(get_rank(self.players[2]), 4)
+        self.assertIsNone(get_rank(self.admin))
+        self.assertEqual(self.usernames(get_top_players(2)), ['p0', 'p3'])
+        self.assertEqual(self.usernames(get_leaderboard_page(2, per_page=2)), ['p1', 'p2'])
+        self.assertEqual([player.rank for player in get_leaderboard_page(2, per_page=2)], [3, 4])
+        self.assertEqual(get_player_count(), 4)
+    
+    def test_lookups_use_index_without_refresh(self):
+        # Reader tidak me-refresh walaupun version stale
+        mark_rankings_stale()
+        with self.assertNumQueries(1):
+            get_rank(self.players[2])
+        with self.assertNumQueries(1):
+            get_top_players(3)
+    
+    def test_exp_change_marks_rankings_stale(self):
+        ensure_rankings()
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp(self.players[2], 40, 'quest', 'Quest')
+        # Writer hanya menandai stale; worker yang me-refresh
+        self.assertEqual(get_rank(self.players[2]), 4)
+        self.assertTrue(ensure_rankings())
+        self.assertEqual(get_rank(self.players[2]), 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp_bulk([(self.players[1], 500, 'quest', 'Quest')])
+        ensure_rankings()
+        self.assertEqual(get_rank(self.players[1]), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.players[0].role = 'admin'
+            self.players[0].save()
+        ensure_rankings()
+        self.assertIsNone(get_rank(self.players[0]))
+        self.assertEqual(get_player_count(), 3)
+    
+    @override_settings(LEADERBOARD_RANK_REFRESH_INTERVAL=60)
+    def test_refresh_at_most_once_per_window(self):
+        cache.add(RANKING_REFRESH_SLOT_CACHE_KEY, True, timeout=60)
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp(self.players[2], 40, 'quest', 'Quest')
+        self.assertFalse(ensure_rankings())
+        # Rank lama dipakai sampai window berikutnya
+        self.assertEqual(get_rank(self.players[2]), 4)
+        # Putaran worker di window berikutnya
+        cache.delete(RANKING_REFRESH_SLOT_CACHE_KEY)
+        self.assertTrue(ensure_rankings())
+        self.assertEqual(get_rank(self.players[2]), 2)
+        self.assertFalse(ensure_rankings())
+    
+    def test_failed_refresh_keeps_version_stale(self):
+        mark_rankings_stale()
+        with mock.patch('core.ranking.refresh_rankings', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                ensure_rankings()
+        self.assertTrue(ensure_rankings())
+    
+    def test_writer_does_not_refresh_rankings(self):
+        with mock.patch('core.ranking.refresh_rankings') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                add_exp(self.players[2], 40, 'quest', 'Quest')
+        refresh.assert_not_called()
+        self.assertEqual(get_rank(self.players[2]), 4)
+        self.assertTrue(ensure_rankings())
+        self.assertEqual(get_rank(self.players[2]), 2)
+    
+    def test_views_share_ranking(self):
+        client = Client()
+        client.force_login(self.players[3])
+        response = client.get(reverse('player:leaderboard'))
+        self.assertEqual(response.context['user_rank'], 2)
+        self.assertEqual(self.usernames(response.context['top_players']), ['p0', 'p3', 'p1', 'p2'])
+        
+        client.force_login(self.admin)
+        response = client.get(reverse('admin_dashboard:player_list'))
+        self.assertEqual(self.usernames(response.context['players']), ['p0', 'p3', 'p1', 'p2'])
+
+
+@override_settings(LEADERBOARD_RANK_REFRESH_INTERVAL=0)
+class LeaderboardKeysetTest(TestCase):
+    """Tests untuk leaderboard 'around me' dan keyset pagination"""
+    
+    def setUp(self):
+        cache.clear()
+        # 30 players; p0 teratas, p29 terakhir
+        self.players = [User.objects.create(username=f'p{i}', role='player', email=f'p{i}@example.com') for i in range(30)]
+        for i, player in enumerate(self.players):
+            User.objects.filter(pk=player.pk).update(total_exp=1000 - i * 10, current_level=1)
+        # Dua player dengan tuple sama: urutan ditentukan id
+        User.objects.filter(pk=self.players[11].pk).update(total_exp=900)
+        # Update langsung tidak lewat writer: refresh PlayerRank seperti worker
+        mark_rankings_stale()
+        ensure_rankings()
+        self.client = Client()
+    
+    def usernames(self, players):
+        return [player['username'] if isinstance(player, dict) else player.username for player in players]
+    
+    def test_around_me_window(self):
+        self.client.force_login(self.players[20])
+        response = self.client.get(reverse('player:leaderboard'))
+        self.assertEqual(response.context['user_rank'], 21)
+        self.assertEqual(len(response.context['top_players']), 10)
+        self.assertEqual(self.usernames(response.context['around_players']), [f'p{i}' for i in range(15, 26)])
+        self.assertIsNotNone(response.context['next_cursor'])
+        
+        # User di top: tanpa window tambahan
+        self.client.force_login(self.players[2])
+        response = self.client.get(reverse('player:leaderboard'))
+        self.assertEqual(response.context['around_players'], [])
+    
+    def test_top_and_around_me_from_same_ranking(self):
+        # p15 naik ke top sebelum worker me-refresh PlayerRank: kedua list tetap
+        # memakai rank yang sama, jadi tidak ada player yang muncul dua kali
+        User.objects.filter(pk=self.players[15].pk).update(total_exp=5000)
+        mark_rankings_stale()
+        self.client.force_login(self.players[20])
+        response = self.client.get(reverse('player:leaderboard'))
+        shown = self.usernames(response.context['top_players']) + self.usernames(response.context['around_players'])
+        self.assertEqual(len(shown), len(set(shown)))
+        self.assertEqual(shown, [f'p{i}' for i in range(10)] + [f'p{i}' for i in range(15, 26)])
+    
+    def test_json_endpoint_walks_whole_ranking(self):
+        self.client.force_login(self.players[0])
+        seen = []
+        cursor = ''
+        while True:
+            data = self.client.get(reverse('player:leaderboard_data'), {'after': cursor, 'limit': 7}).json()
+            seen.extend(data['players'])
+            if not data['next']:
+                break
+            cursor = data['next']
+        self.assertEqual(self.usernames(seen), [f'p{i}' for i in range(30)])
+        self.assertEqual([player['rank'] for player in seen], list(range(1, 31)))
+        
+        response = self.client.get(reverse('player:leaderboard_data'), {'after': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_keyset_page_is_constant_cost(self):
+        queryset = User.objects.filter(role='player')
+        first = seek_players(queryset, 5)
+        cursor = encode_cursor(User.objects.get(pk=self.players[24].pk))
+        with self.assertNumQueries(1):
+            deep = seek_players(queryset, 5, after=cursor)
+        self.assertEqual(self.usernames(deep['players']), [f'p{i}' for i in range(25, 30)])
+        self.assertIsNone(deep['next'])
+        
+        back = seek_players(queryset, 5, before=deep['previous'])
+        self.assertEqual(self.usernames(back['players']), [f'p{i}' for i in range(20, 25)])
+        self.assertIsNone(first['previous'])
+    
+    def test_player_list_keyset_pagination(self):
+        admin = User.objects.create(username='admin', role='admin', is_staff=True)
+        self.client.force_login(admin)
+        url = reverse('admin_dashboard:player_list')
+        
+        response = self.client.get(url)
+        self.assertEqual(self.usernames(response.context['players']), [f'p{i}' for i in range(10)])
+        self.assertIsNone(response.context['previous_cursor'])
+        
+        response = self.client.get(url, {'after': response.context['next_cursor']})
+        self.assertEqual(self.usernames(response.context['players']), [f'p{i}' for i in range(10, 20)])
+        
+        response = self.client.get(url, {'before': response.context['previous_cursor']})
+        self.assertEqual(self.usernames(response.context['players']), [f'p{i}' for i in range(10)])
+        
+        response = self.client.get(url, {'q': 'p2'})
+        self.assertEqual(self.usernames(response.context['players']), ['p2'] + [f'p{i}' for i in range(20, 29)])
+
+
+@override_settings(LEADERBOARD_RANK_REFRESH_INTERVAL=0)
+class LeaderboardBoardTest(TestCase):
+    """Tests untuk leaderboard per periode / activity (LeaderboardScore)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.players = [
+            User.objects.create(username=f'b{i}', role='player', honor_points=500) for i in range(3)
+        ]
+        self.client = Client()
+    
+    def award(self, player, amount, activity_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp(player, amount, activity_type, 'Test')
+        # Putaran worker deliver_outbox
+        ensure_rankings()
+    
+    def expected(self, activity_type=None):
+        logs = ExpLog.objects.all()
+        if activity_type:
+            logs = logs.filter(activity_type=activity_type)
+        totals = logs.values('user__username').annotate(total=Sum('exp_earned')).order_by('-total', 'user_id')
+        return [(row['user__username'], row['total']) for row in totals]
+    
+    def board(self, board):
+        return [(row[2], row[-1]) for row in get_board_top(board, 100, fields=['username'])]
+    
+    def test_scores_follow_exp_logs(self):
+        self.award(self.players[0], 50, 'quest')
+        self.award(self.players[1], 80, 'assignment')
+        self.award(self.players[2], 30, 'assignment')
+        self.award(self.players[2], 40, 'quest')
+        
+        self.assertEqual(self.board(('week', '')), self.expected())
+        self.assertEqual(self.board(('month', '')), self.expected())
+        self.assertEqual(self.board(('all', 'assignment')), self.expected('assignment'))
+        self.assertEqual(self.board(('week', 'assignment')), self.expected('assignment'))
+        
+        self.assertEqual(get_board_rank(self.players[1], ('week', 'assignment')), 1)
+        self.assertIsNone(get_board_rank(self.players[0], ('week', 'assignment')))
+    
+    def test_rank_lookups_use_stored_rank(self):
+        self.award(self.players[0], 50, 'quest')
+        self.award(self.players[1], 80, 'quest')
+        self.award(self.players[2], 30, 'quest')
+        
+        with CaptureQueriesContext(connection) as queries:
+            rank = get_board_rank(self.players[2], ('week', 'quest'))
+            rows = get_board_rows(('week', 'quest'), 2, 3, fields=['username'])
+        self.assertEqual(rank, 3)
+        self.assertEqual([row[:3] for row in rows], [(2, self.players[0].pk, 'b0'), (3, self.players[2].pk, 'b2')])
+        sql = ' '.join(query['sql'] for query in queries.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+    
+    def test_rebuild_matches_incremental(self):
+        self.award(self.players[0], 50, 'quest')
+        self.award(self.players[1], 80, 'assignment')
+        fields = ('user_id', 'period', 'period_start', 'activity_type', 'score')
+        incremental = set(LeaderboardScore.objects.values_list(*fields))
+        
+        rebuild_leaderboard_scores([player.pk for player in self.players])
+        self.assertEqual(set(LeaderboardScore.objects.values_list(*fields)), incremental)
+    
+    def test_rebuild_all_locks_every_user(self):
+        self.award(self.players[0], 50, 'quest')
+        with mock.patch('core.services.lock_users', wraps=lock_users) as lock:
+            rebuild_leaderboard_scores()
+        lock.assert_called_once()
+        self.assertEqual(set(lock.call_args.args[0]), set(User.objects.values_list('pk', flat=True)))
+    
+    def test_migration_populates_from_exp_logs(self):
+        from django.apps import apps
+        migration = importlib.import_module('core.migrations.0015_leaderboardscore')
+        
+        # Log lama tanpa ExpDailyRollup (deploy sebelum migration 0010)
+        ExpLog.objects.create(user=self.players[0], activity_type='quest', exp_earned=50, description='Old')
+        ExpLog.objects.create(user=self.players[0], activity_type='assignment', exp_earned=-10, description='Old')
+        old = ExpLog.objects.create(user=self.players[1], activity_type='quest', exp_earned=30, description='Old')
+        ExpLog.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+        migration.populate_leaderboard_scores(apps, None)
+        
+        self.assertEqual(self.board(('month', '')), [('b0', 40)])
+        self.assertEqual(self.board(('all', 'quest')), [('b0', 50), ('b1', 30)])
+        self.assertEqual(self.board(('week', 'assignment')), [('b0', -10)])
+    
+    def test_prune_removes_expired_buckets(self):
+        self.award(self.players[0], 50, 'quest')
+        last_week = get_period_start('week') - timedelta(days=7)
+        LeaderboardScore.objects.create(
+            user=self.players[0], period='week', period_start=last_week, score=10,
+            expires_at=get_period_expiry('week', last_week)
+        )
+        
+        self.assertEqual(prune_leaderboard_scores(), 1)
+        self.assertFalse(LeaderboardScore.objects.filter(period_start=last_week).exists())
+        self.assertTrue(LeaderboardScore.objects.filter(period='all').exists())
+    
+    def test_board_snapshot_follows_ranking_version(self):
+        self.award(self.players[0], 50, 'quest')
+        self.assertEqual([row['username'] for row in get_leaderboard_snapshot(('week', ''))], ['b0'])
+        
+        self.award(self.players[1], 80, 'quest')
+        snapshot = get_leaderboard_snapshot(('week', ''))
+        self.assertEqual([row['username'] for row in snapshot], ['b1', 'b0'])
+        self.assertEqual(snapshot[0]['score'], self.expected()[0][1])
+    
+    def test_leaderboard_view_params(self):
+        self.award(self.players[1], 80, 'assignment')
+        self.award(self.players[2], 50, 'quest')
+        self.client.force_login(self.players[2])
+        
+        response = self.client.get(reverse('player:leaderboard'), {'period': 'week', 'activity': 'assignment'})
+        self.assertEqual([player.username for player in response.context['top_players']], ['b1'])
+        self.assertIsNone(response.context['user_rank'])
+        self.assertTrue(response.context['show_score'])
+        self.assertIsNone(response.context['next_cursor'])
+        
+        # Nilai tidak dikenal: leaderboard utama
+        response = self.client.get(reverse('player:leaderboard'), {'period': 'decade'})
+        self.assertEqual(response.context['period'], 'all')
+        self.assertFalse(response.context['show_score'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class NotificationInboxTest(TestCase):
+    """Tests untuk inbox notification + seq cursor (core/inbox.py)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        self.other = User.objects.create(username='other', role='player', honor_points=500)
+    
+    def test_send_notification_stores_inbox_with_seq(self):
+        send_notification(self.user.pk, 'Hello', 'level_up', {'new_level': 2})
+        notification = Notification.objects.get()
+        self.assertEqual((notification.user, notification.notification_type), (self.user, 'level_up'))
+        self.assertEqual(OutboxMessage.objects.get().payload['seq'], notification.seq)
+    
+    def test_catch_up_is_single_range_read(self):
+        with outbox.batch():
+            for i in range(5):
+                send_notification(self.user.pk, f'Hello {i}')
+                send_notification(self.other.pk, f'Other {i}')
+        seqs = list(Notification.objects.filter(user=self.user).values_list('pk', flat=True))
+        
+        with self.assertNumQueries(1):
+            missed = get_missed_notifications(self.user.pk, seqs[1])
+        self.assertEqual([notification['message'] for notification in missed], ['Hello 2', 'Hello 3', 'Hello 4'])
+        self.assertEqual([notification['seq'] for notification in missed], seqs[2:])
+        self.assertEqual(get_missed_notifications(self.user.pk, seqs[-1]), [])
+        # Tertinggal jauh: hanya yang terbaru
+        self.assertEqual([n['message'] for n in get_missed_notifications(self.user.pk, 0, limit=2)], ['Hello 3', 'Hello 4'])
+    
+    def test_broadcast_stored_once_and_caught_up(self):
+        send_notification(self.user.pk, 'Before')
+        after = Notification.objects.get().seq
+        broadcast_notification('New sidequest', 'sidequest', {'id': 1}, overlays={self.user.pk: {'due': 'soon'}})
+        broadcast_notification('Private', user_ids=[self.other.pk])
+        broadcast_notification('Admins only', role='admin')
+        send_notification(self.user.pk, 'After')
+        
+        # Satu row bersama per broadcast, seq ikut di payload outbox
+        broadcast = Notification.objects.get(message='New sidequest')
+        self.assertIsNone(broadcast.user)
+        self.assertEqual(Notification.objects.filter(user__isnull=True).count(), 3)
+        self.assertEqual(OutboxMessage.objects.get(kind='broadcast', payload__message='New sidequest').payload['seq'],
+                         broadcast.seq)
+        
+        with self.assertNumQueries(1):
+            missed = get_missed_notifications(self.user.pk, after, 'player')
+        self.assertEqual([n['message'] for n in missed], ['New sidequest', 'After'])
+        self.assertEqual(missed[0]['data'], {'id': 1, 'due': 'soon'})
+        self.assertEqual([n['message'] for n in get_missed_notifications(self.other.pk, after, 'player')],
+                         ['New sidequest', 'Private'])
+        # Row bersama tidak dihitung sebagai unread per user
+        self.assertEqual(get_unread_count(self.user.pk), 2)
+    
+    def test_unread_counter_and_mark_read(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(4):
+                send_notification(self.user.pk, f'Hello {i}')
+        seqs = list(Notification.objects.filter(user=self.user).values_list('pk', flat=True))
+        self.assertEqual(get_unread_count(self.user.pk), 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user.pk), 4)
+        
+        self.assertEqual(mark_notifications_read(self.user.pk, seqs=[seqs[0]]), 1)
+        self.assertEqual(get_unread_count(self.user.pk), 3)
+        self.assertEqual(mark_notifications_read(self.user.pk, up_to=seqs[2]), 2)
+        self.assertEqual(get_unread_count(self.user.pk), 1)
+        self.assertEqual(mark_notifications_read(self.user.pk), 1)
+        self.assertEqual(get_unread_count(self.user.pk), 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            send_notification(self.user.pk, 'New')
+        self.assertEqual(get_unread_count(self.user.pk), 1)
+    
+    @override_settings(NOTIFICATION_TTL_DAYS=30)
+    def test_prune_notifications(self):
+        send_notification(self.user.pk, 'Old')
+        send_notification(self.user.pk, 'New')
+        Notification.objects.filter(message='Old').update(created_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(get_unread_count(self.user.pk), 2)
+        
+        out = StringIO()
+        call_command('prune_notifications', stdout=out)
+        self.assertIn('1 notification', out.getvalue())
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)), ['New'])
+        self.assertEqual(get_unread_count(self.user.pk), 1)
+
+
+class PresenceTest(TestCase):
+    """Tests untuk presence set + heartbeat (core/presence.py)"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_touch_and_remove(self):
+        self.assertTrue(touch_presence(1, 'alice', now=1000))
+        self.assertFalse(touch_presence(1, 'alice', now=1030))
+        self.assertTrue(touch_presence(2, 'bob', now=1030))
+        
+        with self.assertNumQueries(0):
+            users = get_online_users(now=1040)
+        self.assertEqual([(user['id'], user['username']) for user in users], [(1, 'alice'), (2, 'bob')])
+        
+        remove_presence(1)
+        self.assertEqual([user['id'] for user in get_online_users(now=1040)], [2])
+    
+    def test_heartbeat_keeps_user_online(self):
+        touch_presence(1, 'alice', now=1000)
+        touch_presence(1, 'alice', now=1080)
+        self.assertEqual([user['id'] for user in get_online_users(now=1150)], [1])
+    
+    @override_settings(PRESENCE_TIMEOUT=90)
+    def test_sweep_removes_expired(self):
+        touch_presence(1, 'alice', now=1000)
+        touch_presence(2, 'bob', now=1050)
+        active, expired = sweep_presence(now=1100)
+        self.assertEqual((set(active), expired), ({2}, [1]))
+        self.assertEqual(cache.get(PRESENCE_SET_CACHE_KEY), {2})
+        
+        # User yang expired dihitung join lagi pada heartbeat berikutnya
+        self.assertTrue(touch_presence(1, 'alice', now=1100))
+    
+    def test_publish_batches_changes_into_one_diff(self):
+        snapshot = get_presence_snapshot()
+        self.assertEqual(snapshot['users'], [])
+        
+        for user_id in range(1, 51):
+            touch_presence(user_id, f'user{user_id:02d}')
+        remove_presence(50)
+        diff = publish_presence()
+        self.assertEqual(diff['seq'], snapshot['seq'] + 1)
+        self.assertEqual([user['id'] for user in diff['joined']], list(range(1, 50)))
+        self.assertEqual(diff['left'], [])
+        self.assertIsNone(publish_presence())
+        
+        remove_presence(1)
+        remove_presence(2)
+        touch_presence(60, 'late')
+        diff = publish_presence()
+        self.assertEqual(diff['seq'], snapshot['seq'] + 2)
+        self.assertEqual([user['id'] for user in diff['joined']], [60])
+        self.assertEqual(diff['left'], [1, 2])
+        self.assertEqual(get_presence_snapshot()['seq'], diff['seq'])
+    
+    def test_publish_busy_is_distinct_from_no_change(self):
+        get_presence_snapshot()
+        touch_presence(1, 'user01')
+        cache.add(PRESENCE_PUBLISH_LOCK_CACHE_KEY, True)
+        self.assertIs(publish_presence(), False)
+        cache.delete(PRESENCE_PUBLISH_LOCK_CACHE_KEY)
+        self.assertEqual([user['id'] for user in publish_presence()['joined']], [1])
+        self.assertIsNone(publish_presence())
+    
+    def test_flush_slot_once_per_window(self):
+        self.assertTrue(acquire_presence_flush())
+        self.assertFalse(acquire_presence_flush())
+        release_presence_flush()
+        self.assertTrue(acquire_presence_flush())
+
+
+class WebSocketRoutingTest(TransactionTestCase):
+    """Integration tests untuk ASGI routing + consumers lewat Channels communicator"""
+    
+    def setUp(self):
+        cache.clear()
+        self.players = [
+            User.objects.create(username=f'ws{i}', role='player', honor_points=500, total_exp=i * 10)
+            for i in range(3)
+        ]
+        client = Client()
+        client.force_login(self.players[0])
+        self.cookie = f'sessionid={client.cookies["sessionid"].value}'.encode()
+    
+    async def connect(self, path, cookie=True):
+        from classcraft.asgi import application
+        
+        headers = [(b'origin', b'http://testserver')]
+        if cookie:
+            headers.append((b'cookie', self.cookie))
+        communicator = WebsocketCommunicator(application, path, headers=headers)
+        connected, _ = await communicator.connect()
+        return communicator, connected
+    
+    async def test_leaderboard_requires_login(self):
+        communicator, connected = await self.connect('/ws/leaderboard/', cookie=False)
+        self.assertFalse(connected)
+    
+    async def test_leaderboard_snapshot_delta_and_resync(self):
+        communicator, connected = await self.connect('/ws/leaderboard/')
+        self.assertTrue(connected)
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'leaderboard_snapshot')
+        self.assertEqual([row['username'] for row in snapshot['data']], ['ws2', 'ws1', 'ws0'])
+        
+        def move_player():
+            User.objects.filter(pk=self.players[0].pk).update(total_exp=15)
+            mark_rankings_stale()
+            deliver_leaderboard_update()
+        await database_sync_to_async(move_player)()
+        
+        delta = await communicator.receive_json_from()
+        self.assertEqual(delta['type'], 'leaderboard_delta')
+        self.assertEqual(delta['seq'], snapshot['seq'] + 1)
+        self.assertEqual([row['username'] for row in delta['upsert']], ['ws0', 'ws1'])
+        
+        await communicator.send_json_to({'action': 'resync'})
+        resync = await communicator.receive_json_from()
+        self.assertEqual(resync['seq'], delta['seq'])
+        self.assertEqual([row['username'] for row in resync['data']], ['ws2', 'ws0', 'ws1'])
+        await communicator.disconnect()
+    
+    async def test_connect_reads_published_snapshot_only(self):
+        def move_player():
+            get_published_leaderboard()
+            User.objects.filter(pk=self.players[0].pk).update(total_exp=15)
+            mark_rankings_stale()
+        await database_sync_to_async(move_player)()
+        
+        # Connect tidak mem-publish perubahan yang pending (tidak melewati debounce broadcast)
+        with mock.patch('core.notifications.deliver_leaderboard_update') as deliver:
+            communicator, connected = await self.connect('/ws/leaderboard/')
+            snapshot = await communicator.receive_json_from()
+        deliver.assert_not_called()
+        self.assertEqual([row['username'] for row in snapshot['data']], ['ws2', 'ws1', 'ws0'])
+        
+        # Perubahan sampai lewat delta worker berikutnya
+        await database_sync_to_async(deliver_leaderboard_update)()
+        delta = await communicator.receive_json_from()
+        self.assertEqual(delta['seq'], snapshot['seq'] + 1)
+        self.assertEqual([row['username'] for row in delta['upsert']], ['ws0', 'ws1'])
+        await communicator.disconnect()
+    
+    async def test_board_delta_published_per_board(self):
+        communicator, connected = await self.connect('/ws/leaderboard/?period=week&activity=quest')
+        self.assertTrue(connected)
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot['period'], snapshot['activity'], snapshot['data']), ('week', 'quest', []))
+        
+        def award():
+            add_exp(self.players[1], 40, 'quest', 'Test')
+            deliver_leaderboard_update()
+        await database_sync_to_async(award)()
+        
+        # Hanya delta board week/quest yang diterima, bukan delta leaderboard utama
+        delta = await communicator.receive_json_from()
+        self.assertEqual((delta['period'], delta['activity'], delta['seq']), ('week', 'quest', snapshot['seq'] + 1))
+        self.assertEqual([(row['username'], row['score']) for row in delta['upsert']], [('ws1', 40)])
+        self.assertTrue(await communicator.receive_nothing())
+        
+        # Pindah board: snapshot board baru, delta board lama tidak diterima lagi
+        await communicator.send_json_to({'action': 'subscribe', 'period': 'month', 'activity': 'assignment'})
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot['period'], snapshot['activity'], snapshot['data']), ('month', 'assignment', []))
+        
+        def award_again():
+            add_exp(self.players[2], 40, 'quest', 'Test')
+            deliver_leaderboard_update()
+        await database_sync_to_async(award_again)()
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+    
+    @override_settings(PRESENCE_BROADCAST_INTERVAL=0.05)
+    async def test_online_status_presence(self):
+        communicator, connected = await self.connect('/ws/online-status/')
+        self.assertTrue(connected)
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot['type'], snapshot['users']), ('online_users', []))
+        
+        # Join dikirim sebagai diff di akhir window, bukan per connect
+        diff = await communicator.receive_json_from()
+        self.assertEqual(diff['type'], 'presence_diff')
+        self.assertEqual(diff['seq'], snapshot['seq'] + 1)
+        self.assertEqual([user['username'] for user in diff['joined']], ['ws0'])
+        
+        await communicator.send_json_to({'action': 'heartbeat'})
+        await communicator.send_json_to({'action': 'get_online_users'})
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'online_users')
+        self.assertEqual(message['seq'], diff['seq'])
+        self.assertEqual([user['username'] for user in message['users']], ['ws0'])
+        await communicator.disconnect()
+        
+        self.assertEqual(await database_sync_to_async(get_online_users)(), [])
+    
+    @override_settings(PRESENCE_BROADCAST_INTERVAL=0.05)
+    async def test_presence_flush_rescheduled_while_publish_busy(self):
+        # Publish lain (process lain) sedang berjalan saat flush pertama
+        await database_sync_to_async(cache.add)(PRESENCE_PUBLISH_LOCK_CACHE_KEY, True)
+        communicator, connected = await self.connect('/ws/online-status/')
+        self.assertTrue(connected)
+        snapshot = await communicator.receive_json_from()
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        
+        # Join tetap dikirim oleh flush berikutnya setelah lock dilepas
+        await database_sync_to_async(cache.delete)(PRESENCE_PUBLISH_LOCK_CACHE_KEY)
+        diff = await communicator.receive_json_from()
+        self.assertEqual((diff['type'], diff['seq']), ('presence_diff', snapshot['seq'] + 1))
+        self.assertEqual([user['username'] for user in diff['joined']], ['ws0'])
+        await communicator.disconnect()
+    
+    @override_settings(PRESENCE_BROADCAST_INTERVAL=0.05, PRESENCE_SWEEP_INTERVAL=0.05, PRESENCE_TIMEOUT=1)
+    async def test_expired_presence_swept_in_asgi_process(self):
+        communicator, connected = await self.connect('/ws/online-status/')
+        self.assertTrue(connected)
+        snapshot = await communicator.receive_json_from()
+        
+        # ws1 online tanpa socket (heartbeat terakhir hampir expire), tanpa worker
+        other = self.players[1]
+        await database_sync_to_async(touch_presence)(other.pk, other.username, time.time() - 0.8)
+        
+        seq = snapshot['seq']
+        joined, left = set(), set()
+        while other.pk not in left:
+            diff = await communicator.receive_json_from(timeout=2)
+            self.assertEqual(diff['seq'], seq + 1)
+            seq = diff['seq']
+            joined.update(user['username'] for user in diff['joined'])
+            left.update(diff['left'])
+        self.assertEqual(joined, {'ws0', 'ws1'})
+        self.assertEqual(left, {other.pk})
+        await communicator.disconnect()
+    
+    async def test_malformed_frames_get_error_reply(self):
+        communicator, connected = await self.connect('/ws/stream/')
+        self.assertTrue(connected)
+        await communicator.send_json_to({'action': 'subscribe', 'stream': 'notifications'})
+        await communicator.receive_json_from()
+        
+        for frame in ('{not json', '[1, 2]', json.dumps({'action': 'subscribe', 'stream': ['x']})):
+            await communicator.send_to(text_data=frame)
+            self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        for content in ({'action': 'catch_up', 'after': 'abc'}, {'action': 'mark_read', 'seqs': ['x']}):
+            await communicator.send_json_to({'stream': 'notifications', **content})
+            self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        
+        # Socket tetap hidup
+        await communicator.send_json_to({'stream': 'notifications', 'action': 'catch_up', 'after': 0})
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['payload']['type'], 'notifications_missed')
+        await communicator.disconnect()
+        
+        communicator, connected = await self.connect(f'/ws/notifications/{self.players[0].pk}/')
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        await communicator.send_to(text_data='{not json')
+        self.assertEqual(await communicator.receive_json_from(), {
+            'type': 'error', 'message': 'Invalid message: expected a JSON object'
+        })
+        await communicator.disconnect()
+    
+    async def test_broadcast_notification_with_overlay(self):
+        communicator, connected = await self.connect(f'/ws/notifications/{self.players[0].pk}/')
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        
+        # Broadcast untuk user lain tidak sampai ke client ini
+        await database_sync_to_async(deliver_broadcast_notification)(
+            'player', 'Hanya ws1', user_ids=[self.players[1].pk]
+        )
+        await database_sync_to_async(deliver_broadcast_notification)(
+            'player', 'Kuis baru', 'sidequest', data={'sidequest_id': 7},
+            overlays={str(self.players[0].pk): {'due_in': 2}}, seq=42
+        )
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['message'], message['seq']), ('Kuis baru', 42))
+        self.assertEqual(message['data'], {'sidequest_id': 7, 'due_in': 2})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+    
+    async def test_notifications_catch_up_after_reconnect(self):
+        communicator, connected = await self.connect(f'/ws/notifications/{self.players[0].pk}/')
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['unread'], 0)
+        await communicator.disconnect()
+        
+        # Terkirim selama socket terputus
+        def send_while_offline():
+            send_notification(self.players[0].pk, 'Level up', 'level_up')
+            send_notification(self.players[0].pk, 'Punishment', 'punishment')
+            broadcast_notification('New sidequest', 'sidequest')
+            return Notification.objects.order_by('pk').values_list('pk', flat=True)[0]
+        first = await database_sync_to_async(send_while_offline)()
+        
+        communicator, connected = await self.connect(f'/ws/notifications/{self.players[0].pk}/?after={first - 1}')
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['unread'], 2)
+        missed = await communicator.receive_json_from()
+        self.assertEqual(missed['type'], 'notifications_missed')
+        self.assertEqual([n['notification_type'] for n in missed['notifications']],
+                         ['level_up', 'punishment', 'sidequest'])
+        
+        await communicator.send_json_to({'action': 'mark_read', 'up_to': missed['notifications'][-1]['seq']})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'unread', 'count': 0})
+        await communicator.disconnect()
+    
+    async def test_notifications_only_for_own_user(self):
+        communicator, connected = await self.connect(f'/ws/notifications/{self.players[1].pk}/')
+        self.assertFalse(connected)
+        
+        communicator, connected = await self.connect(f'/ws/notifications/{self.players[0].pk}/')
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'connection')
+        
+        await database_sync_to_async(deliver_notification)(self.players[0].pk, 'Halo', 'info')
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['type'], message['message']), ('notification', 'Halo'))
+        await communicator.disconnect()
+    
+    @override_settings(PRESENCE_BROADCAST_INTERVAL=0.05)
+    async def test_multiplexed_streams_over_one_socket(self):
+        communicator, connected = await self.connect('/ws/stream/')
+        self.assertTrue(connected)
+        
+        for stream in ('notifications', 'stats', 'leaderboard'):
+            await communicator.send_json_to({'action': 'subscribe', 'stream': stream})
+        self.assertEqual(await communicator.receive_json_from(), {
+            'stream': 'notifications', 'payload': {'type': 'connection', 'message': 'Connected to notifications', 'unread': 0}
+        })
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot['stream'], snapshot['payload']['type']), ('leaderboard', 'leaderboard_snapshot'))
+        
+        # notifications dan stats berbagi group notifications_{user_id}: satu pesan per event
+        await database_sync_to_async(deliver_notification)(self.players[0].pk, 'Halo', 'info')
+        await database_sync_to_async(deliver_player_update)(self.players[0].pk, {'level': 2}, [])
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['stream'], message['payload']['message']), ('notifications', 'Halo'))
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['stream'], message['payload']['stats']), ('stats', {'level': 2}))
+        self.assertTrue(await communicator.receive_nothing())
+        
+        # Pesan yang sudah di-encode (delta leaderboard, diff presence) ikut dibungkus
+        def move_player():
+            User.objects.filter(pk=self.players[0].pk).update(total_exp=15)
+            mark_rankings_stale()
+            deliver_leaderboard_update()
+        await database_sync_to_async(move_player)()
+        delta = await communicator.receive_json_from()
+        self.assertEqual((delta['stream'], delta['payload']['seq']), ('leaderboard', snapshot['payload']['seq'] + 1))
+        
+        await communicator.send_json_to({'action': 'subscribe', 'stream': 'presence'})
+        self.assertEqual((await communicator.receive_json_from())['payload']['type'], 'online_users')
+        diff = await communicator.receive_json_from()
+        self.assertEqual(diff['stream'], 'presence')
+        self.assertEqual([user['username'] for user in diff['payload']['joined']], ['ws0'])
+        
+        # Action dikirim ke stream yang disebut; unsubscribe menghentikan stream-nya
+        await communicator.send_json_to({'stream': 'notifications', 'action': 'mark_read'})
+        self.assertEqual(await communicator.receive_json_from(), {
+            'stream': 'notifications', 'payload': {'type': 'unread', 'count': 0}
+        })
+        await communicator.send_json_to({'action': 'unsubscribe', 'stream': 'leaderboard'})
+        def move_back():
+            User.objects.filter(pk=self.players[0].pk).update(total_exp=0)
+            mark_rankings_stale()
+            deliver_leaderboard_update()
+        await database_sync_to_async(move_back)()
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.send_json_to({'stream': 'leaderboard', 'action': 'resync'})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.disconnect()
+        
+        self.assertEqual(await database_sync_to_async(get_online_users)(), [])
+
+
+class ExpDailyRollupTest(TestCase):
+    """Tests untuk ExpDailyRollup yang di-maintain bersama ExpLog"""
+    
+    def setUp(self):
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        self.other = User.objects.create(username='other', role='player', honor_points=500)
+    
+    def rollup_rows(self, user):
+        return sorted(
+            ExpDailyRollup.objects.filter(user=user).values_list(
+                'day', 'activity_type', 'exp_earned', 'earned_count', 'exp_lost', 'lost_count', 'log_count'
+            )
+        )
+    
+    def test_services_keep_rollups_in_sync(self):
+        add_exp(self.user, 40, 'quest', 'Quest')
+        add_exp(self.user, 80, 'quest', 'Level up')  # + bonus log dengan EXP 0
+        add_exp(self.user, -30, 'other', 'Penalty')
+        add_exp_bulk([(self.user, 20, 'participation', 'Attended'), (self.other, 20, 'participation', 'Attended')])
+        
+        today = timezone.localdate()
+        self.assertEqual(self.rollup_rows(self.user), [
+            (today, 'bonus', 0, 0, 0, 0, 1),
+            (today, 'other', 0, 0, 30, 1, 1),
+            (today, 'participation', 20, 1, 0, 0, 1),
+            (today, 'quest', 120, 2, 0, 0, 2),
+        ])
+        # Sama dengan hasil rebuild dari ExpLog
+        rebuilt = sorted(
+            (r.day, r.activity_type, r.exp_earned, r.earned_count, r.exp_lost, r.lost_count, r.log_count)
+            for r in build_rollups([self.user.pk])
+        )
+        self.assertEqual(self.rollup_rows(self.user), rebuilt)
+    
+    def test_backfill_command(self):
+        logs = ExpLog.objects.bulk_create([
+            ExpLog(user=self.user, activity_type='quest', exp_earned=exp, description='Old')
+            for exp in (10, 20, -5)
+        ])
+        two_days_ago = timezone.now() - timedelta(days=2)
+        ExpLog.objects.filter(pk=logs[0].pk).update(created_at=two_days_ago)
+        
+        out = StringIO()
+        call_command('backfill_exp_rollups', stdout=out)
+        call_command('backfill_exp_rollups', stdout=out)  # idempotent
+        
+        self.assertEqual(self.rollup_rows(self.user), [
+            (timezone.localdate(two_days_ago), 'quest', 10, 1, 0, 0, 1),
+            (timezone.localdate(), 'quest', 20, 1, 5, 1, 2),
+        ])
+    
+    def test_dashboard_reads_rollups(self):
+        add_exp(self.user, 40, 'quest', 'Quest')
+        add_exp(self.user, -10, 'other', 'Penalty')
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('player:dashboard'))
+        self.assertEqual(response.context['total_exp_earned'], 40)
+        self.assertEqual(response.context['total_exp_lost'], 10)
+        self.assertEqual(response.context['exp_growth_data'][-1]['total_exp'], 40)
+        self.assertEqual(
+            sorted((item['activity_type'], item['count']) for item in response.context['activity_distribution']),
+            [('other', 1), ('quest', 1)]
+        )
+
+
+class PlayerStatsTest(TestCase):
+    """Tests untuk lifetime counters di PlayerStats"""
+    
+    def setUp(self):
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        self.dungeon = Dungeon.objects.create(name='D1', description='D', scheduled_date=timezone.now())
+    
+    def stats(self):
+        return PlayerStats.objects.get(user=self.user)
+    
+    def test_created_with_user(self):
+        stats = self.stats()
+        self.assertEqual(stats.dungeons_attended, 0)
+        self.assertEqual(stats.exp_earned, 0)
+    
+    def test_exp_totals_incremented_in_transaction(self):
+        add_exp(self.user, 40, 'quest', 'Quest')
+        add_exp(self.user, -15, 'other', 'Penalty')
+        add_exp_bulk([(self.user, 20, 'participation', 'Attended')])
+        
+        stats = self.stats()
+        self.assertEqual(stats.exp_earned, 60)
+        self.assertEqual(stats.exp_lost, 15)
+    
+    def test_counters_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance = Attendance.objects.create(user=self.user, dungeon=self.dungeon, attended=True)
+            Boss.objects.create(
+                type='mini_boss', name='Quiz', description='Quiz', base_score=80,
+                user=self.user, battle_date=timezone.localdate()
+            )
+            punishment = Punishment.objects.create(
+                user=self.user, type='absence', severity='minor', description='Absent'
+            )
+        stats = self.stats()
+        self.assertEqual(stats.dungeons_attended, 1)
+        self.assertEqual(stats.boss_battles, 1)
+        self.assertEqual(stats.punishments, 1)
+        self.assertEqual(stats.resolved_punishments, 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            punishment.resolved = True
+            punishment.save()
+            attendance.delete()
+        stats = self.stats()
+        self.assertEqual(stats.resolved_punishments, 1)
+        self.assertEqual(stats.dungeons_attended, 0)
+    
+    def test_refresh_not_applied_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Attendance.objects.create(user=self.user, dungeon=self.dungeon, attended=True)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.stats().dungeons_attended, 0)
+    
+    def test_profile_reads_single_row(self):
+        Attendance.objects.create(user=self.user, dungeon=self.dungeon, attended=True)
+        PlayerStats.objects.filter(user=self.user).delete()
+        client = Client()
+        client.force_login(self.user)
+        
+        # Row yang hilang dibuat ulang dari data asli
+        response = client.get(reverse('player:profile'))
+        self.assertEqual(response.context['total_dungeons_attended'], 1)
+        self.assertTrue(PlayerStats.objects.filter(user=self.user).exists())
+    
+    def test_verify_and_repair_command(self):
+        add_exp(self.user, 40, 'quest', 'Quest')
+        Attendance.objects.create(user=self.user, dungeon=self.dungeon, attended=True)
+        PlayerStats.objects.filter(user=self.user).update(exp_earned=999)
+        
+        out = StringIO()
+        call_command('verify_player_stats', stdout=out)
+        self.assertIn('exp_earned 999 != 40', out.getvalue())
+        self.assertIn('dungeons_attended 0 != 1', out.getvalue())
+        self.assertEqual(self.stats().exp_earned, 999)
+        
+        call_command('verify_player_stats', '--repair', stdout=out)
+        stats = self.stats()
+        self.assertEqual(stats.exp_earned, 40)
+        self.assertEqual(stats.dungeons_attended, 1)
+        
+        out = StringIO()
+        call_command('verify_player_stats', stdout=out)
+        self.assertIn('Semua player stats sesuai', out.getvalue())
+
+
+class LevelUpEventTest(TestCase):
+    """Tests untuk LevelUpEvent yang menggantikan pencarian 'Level Up' di ExpLog"""
+    
+    def setUp(self):
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        self.other = User.objects.create(username='other', role='player', honor_points=500)
+    
+    def test_services_record_events(self):
+        add_exp(self.user, 150, 'quest', 'Quest')
+        add_exp_bulk([(self.user, 10, 'quest', 'Small'), (self.other, 150, 'quest', 'Quest')])
+        
+        events = list(LevelUpEvent.objects.order_by('user_id').values_list('user_id', 'old_level', 'new_level'))
+        self.assertEqual(events, [(self.user.pk, 1, self.user.current_level), (self.other.pk, 1, 2)])
+        event = LevelUpEvent.objects.get(user=self.other)
+        self.assertEqual(event.honor_points_bonus, event.new_level * 10)
+    
+    def test_readers_use_events(self):
+        add_exp(self.user, 150, 'quest', 'Quest')
+        client = Client()
+        client.force_login(self.user)
+        
+        data = client.get(reverse('player:ajax_stats')).json()
+        self.assertEqual(data['level_up']['new_level'], self.user.current_level)
+        self.assertIn('Level Up!', data['level_up']['message'])
+        
+        response = client.get(reverse('player:honor_history'))
+        self.assertEqual(len(response.context['level_up_logs']), 1)
+        
+        # Event lama tidak lagi dilaporkan oleh polling
+        LevelUpEvent.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        self.assertIsNone(client.get(reverse('player:ajax_stats')).json()['level_up'])
+    
+    def test_migration_converts_historical_logs(self):
+        from django.apps import apps
+        migration = importlib.import_module('core.migrations.0013_levelupevent')
+        
+        ExpLog.objects.create(
+            user=self.user, activity_type='bonus', exp_earned=0,
+            description='Level Up! 2 → 4. Bonus: 40 Honor Points'
+        )
+        ExpLog.objects.create(user=self.user, activity_type='bonus', exp_earned=0, description='Weekly bonus')
+        migration.convert_level_up_logs(apps, None)
+        
+        self.assertEqual(
+            list(LevelUpEvent.objects.values_list('user_id', 'old_level', 'new_level', 'honor_points_bonus')),
+            [(self.user.pk, 2, 4, 40)]
+        )
+
+
+
+class PlayerStateETagTest(TestCase):
+    """Tests untuk ETag/304 pada endpoint AJAX player (core/player_state.py)"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        self.client.force_login(self.user)
+    
+    def get(self, url_name, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse(url_name), headers=headers)
+    
+    def test_not_modified_with_single_lookup(self):
+        for url_name in ('player:ajax_stats', 'player:ajax_activities'):
+            etag = self.get(url_name)['ETag']
+            self.assertTrue(etag)
+            with self.assertNumQueries(1):
+                response = self.get(url_name, etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+    
+    def test_add_exp_changes_etag(self):
+        etag = self.get('player:ajax_stats')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp(self.user, 20, 'quest', 'Quest')
+        response = self.get('player:ajax_stats', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_exp'], 20)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_honor_and_status_effect_change_etag(self):
+        etag = self.get('player:ajax_activities')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            adjust_honor_points(self.user, -10)
+        self.assertEqual(self.get('player:ajax_activities', etag).status_code, 200)
+        
+        etag = self.get('player:ajax_activities')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            StatusEffect.objects.create(
+                user=self.user, effect_type='curse', description='Test', start_date=timezone.now()
+            )
+        self.assertEqual(self.get('player:ajax_activities', etag).status_code, 200)
+    
+    def test_version_shared_without_cache(self):
+        # Version dibaca dari database: cache per process yang kosong/lama tidak
+        # membuat process lain menjawab 304 dengan data lama
+        etag = self.get('player:ajax_stats')['ETag']
+        add_exp(self.user, 20, 'quest', 'Quest')
+        cache.clear()
+        self.assertEqual(self.get('player:ajax_stats', etag).status_code, 200)
+        
+        etag = self.get('player:ajax_stats')['ETag']
+        cache.clear()
+        self.assertEqual(self.get('player:ajax_stats', etag).status_code, 304)
+    
+    def test_other_player_changes_keep_etag(self):
+        other = User.objects.create(username='other', role='player', honor_points=500)
+        etag = self.get('player:ajax_stats')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            add_exp(other, 20, 'quest', 'Quest')
+        self.assertEqual(self.get('player:ajax_stats', etag).status_code, 304)
+    
+    def test_anonymous_gets_no_etag(self):
+        self.client.logout()
+        response = self.client.get(reverse('player:ajax_stats'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.has_header('ETag'))
+
+class ExpLogArchiveTest(TestCase):
+    """Tests untuk archive ExpLog lama ke gzip JSONL segments"""
+    
+    def setUp(self):
+        self.archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_root.cleanup)
+        settings_override = override_settings(EXP_ARCHIVE_ROOT=self.archive_root.name, EXP_ARCHIVE_DAYS=30)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.user = User.objects.create(username='testplayer', role='player', honor_points=500)
+        self.other = User.objects.create(username='other', role='player', honor_points=500)
+        # 5 log lama (40-44 hari lalu) + 3 log baru untuk user, 2 log lama untuk other
+        now = timezone.now()
+        for i in range(5):
+            self.create_log(self.user, 10 + i, now - timedelta(days=40 + i), 'quest' if i % 2 else 'other')
+        for i in range(3):
+            self.create_log(self.user, 100 + i, now - timedelta(hours=i))
+        for i in range(2):
+            self.create_log(self.other, -5, now - timedelta(days=50 + i))
+        call_command('backfill_exp_rollups', stdout=StringIO())
+    
+    def create_log(self, user, exp, created_at, activity_type='quest'):
+        log = ExpLog.objects.create(user=user, activity_type=activity_type, exp_earned=exp, description=f'Log {exp}')
+        ExpLog.objects.filter(pk=log.pk).update(created_at=created_at)
+    
+    def rollup_rows(self):
+        return sorted(ExpDailyRollup.objects.values_list('user_id', 'day', 'activity_type', 'exp_earned', 'exp_lost', 'log_count'))
+    
+    def test_archive_moves_old_logs_and_keeps_rollups(self):
+        expected_history = [(log.pk, log.exp_earned) for log in ExpLog.objects.filter(user=self.user).order_by('-created_at')]
+        rollups = self.rollup_rows()
+        
+        call_command('archive_exp_logs', stdout=StringIO())
+        
+        self.assertEqual(ExpLog.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(ExpLog.objects.filter(user=self.other).exists())
+        self.assertEqual(self.rollup_rows(), rollups)
+        # Satu segment, satu gzip member per user
+        self.assertEqual(ExpLogArchive.objects.count(), 2)
+        self.assertEqual(ExpLogArchive.objects.values('path').distinct().count(), 1)
+        
+        history = ExpLogHistory(self.user)
+        self.assertEqual(history.count(), 8)
+        self.assertEqual([(log.pk, log.exp_earned) for log in history[0:8]], expected_history)
+        # Halaman yang melewati batas hot table / archive
+        self.assertEqual([log.pk for log in history[2:6]], [pk for pk, _ in expected_history[2:6]])
+        
+        filtered = ExpLogHistory(self.user, 'other')
+        self.assertEqual(filtered.count(), 3)
+        self.assertEqual([log.exp_earned for log in filtered[0:3]], [10, 12, 14])
+        
+        # Rebuild rollup tidak menghapus hari yang sudah diarsip
+        call_command('backfill_exp_rollups', stdout=StringIO())
+        self.assertEqual(self.rollup_rows(), rollups)
+    
+    def test_exp_history_pages_into_archive(self):
+        call_command('archive_exp_logs', stdout=StringIO())
+        client = Client()
+        client.force_login(self.user)
+        
+        response = client.get(reverse('player:exp_history'), {'page': 1})
+        self.assertEqual(len(response.context['exp_logs']), 8)
+        self.assertContains(response, 'Log 14')
+    
+    def test_dry_run_and_failed_archive_keep_logs(self):
+        out = StringIO()
+        call_command('archive_exp_logs', '--dry-run', stdout=out)
+        self.assertIn('7 ExpLog', out.getvalue())
+        self.assertEqual(ExpLog.objects.count(), 10)
+        
+        with mock.patch('core.archive.ExpLogArchive.objects.bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                call_command('archive_exp_logs', stdout=StringIO())
+        self.assertEqual(ExpLog.objects.count(), 10)
+        self.assertEqual(list(Path(self.archive_root.name).rglob('*.gz')), [])
+
+
+class ConcurrentExpStressTest(TransactionTestCase):
+    """
+    Stress test: banyak award EXP paralel ke satu user tidak boleh kehilangan update
+    Berjalan di PostgreSQL (SELECT ... FOR UPDATE) dan SQLite (write lock lock_users,
+    test database berbasis file)
+    """
+    
+    THREADS = 8
+    AWARDS_PER_THREAD = 40
+    
+    def setUp(self):
+        self.user = User.objects.create(username='stressplayer', role='player', honor_points=500)
+    
+    def test_concurrent_awards_keep_totals(self):
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+        
+        def worker():
+            try:
+                barrier.wait()
+                player = User.objects.get(pk=self.user.pk)
+                for _ in range(self.AWARDS_PER_THREAD):
+                    add_exp(player, 10, 'quest', 'Stress')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+        
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        total_awards = self.THREADS * self.AWARDS_PER_THREAD
+        logs = ExpLog.objects.filter(user=self.user)
+        self.assertEqual(logs.filter(activity_type='quest').count(), total_awards)
+        
+        # Tidak ada lost update: total_exp sama dengan jumlah semua ExpLog
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_exp, logs.aggregate(total=Sum('exp_earned'))['total'])
+        
+        # Setiap level up tercatat tepat sekali dan bonusnya masuk ke honor points
+        curve = get_level_curve()
+        self.assertEqual(self.user.current_level, curve.level_for_exp(self.user.total_exp))
+        self.assertEqual(logs.filter(activity_type='bonus').count(), self.user.current_level - 1)
+        expected_honor = 500 + sum(curve.bonus(level)['honor_points'] for level in range(2, self.user.current_level + 1))
+        self.assertEqual(self.user.honor_points, expected_honor)
+
+
 class CheckLevelUpTest(TestCase):
     """Tests untuk check_level_up function"""
     
@@ -243,6 +2050,40 @@ class PunishmentServiceTest(TestCase):
         self.assertEqual(self.user.honor_points, 80)  # 100 - 20
 
 
+class AbsencePunishmentBulkTest(TestCase):
+    """Tests untuk PunishmentService.apply_absence_punishments_bulk"""
+    
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', role='admin')
+        self.players = [
+            User.objects.create(username=f'absent{i}', role='player', honor_points=500, current_exp=80, total_exp=80)
+            for i in range(3)
+        ]
+        now = timezone.now()
+        for day in range(3):
+            dungeon = Dungeon.objects.create(name=f'D{day}', description='D', scheduled_date=now)
+            for i, player in enumerate(self.players):
+                # absent2 hadir di dungeon terakhir
+                Attendance.objects.create(user=player, dungeon=dungeon, attended=(i == 2 and day == 2))
+        # absent1 sudah punya absence punishment yang belum resolved
+        Punishment.objects.create(user=self.players[1], type='absence', severity='minor', description='Existing')
+    
+    def test_matches_single_rules(self):
+        punishments = PunishmentService.apply_absence_punishments_bulk(self.players, created_by=self.admin)
+        
+        self.assertEqual([p.user for p in punishments], [self.players[0]])
+        punished = self.players[0]
+        punished.refresh_from_db()
+        self.assertEqual(punished.honor_points, 495)
+        self.assertEqual(punished.current_exp, 30)
+        self.assertTrue(StatusEffect.objects.filter(user=punished, effect_type='fatigue', is_active=True).exists())
+        self.assertEqual(Punishment.objects.filter(type='absence').count(), 2)
+        self.assertFalse(StatusEffect.objects.filter(user__in=self.players[1:]).exists())
+    
+    def test_no_users(self):
+        self.assertEqual(PunishmentService.apply_absence_punishments_bulk([]), [])
+
+
 class CheckHonorPrivilegesTest(TestCase):
     """Tests untuk check_honor_privileges function"""
     
@@ -13,9 +13,12 @@ import csv
 import json
 from accounts.models import User
 from core.models import ExpLog, Dungeon, Attendance, Sidequest, SidequestSubmission, Boss, Punishment, StatusEffect, Level
-from core.services import add_exp, calculate_final_score, PunishmentService, check_honor_privileges
-from core.notifications import send_sidequest_notification, broadcast_leaderboard_update, send_punishment_notification
+from core.services import add_exp, add_exp_bulk, calculate_final_score, PunishmentService, check_honor_privileges
+from core.notifications import broadcast_sidequest_notification, broadcast_leaderboard_update, send_punishment_notification
 from core.services import PLAGIARISM_RULES
+from core.multipliers import invalidate_exp_multipliers
+from core.stats import STAT_SOURCES, schedule_player_stats_refresh
+from core.ranking import seek_players
 from core.forms import SidequestForm, SubmissionForm, GradeSubmissionForm, BossForm, PunishmentForm
 
 
@@ -100,7 +103,7 @@ class PlayerListView(ListView):
     model = User
     template_name = 'admin/player_list.html'
     context_object_name = 'players'
-    paginate_by = 10
+    page_size = 10
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated or not request.user.is_admin():
@@ -108,8 +111,8 @@ class PlayerListView(ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        """Tampilkan hanya users dengan role player, dengan pencarian opsional"""
-        queryset = User.objects.filter(role='player').order_by('-total_exp', '-current_level', 'username')
+        """Tampilkan hanya users dengan role player (urut ranking), dengan pencarian opsional"""
+        queryset = User.objects.filter(role='player').annotate(rank=F('ranking__rank'))
         search = self.request.GET.get('q')
         if search:
             queryset = queryset.filter(
@@ -118,6 +121,25 @@ class PlayerListView(ListView):
             )
         return queryset
 
+    def get_context_data(self, **kwargs):
+        """Keyset pagination (?after= / ?before=) pada urutan ranking, tanpa OFFSET/COUNT"""
+        context = super().get_context_data(**kwargs)
+        try:
+            page = seek_players(
+                self.object_list,
+                self.page_size,
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before')
+            )
+        except ValueError:
+            page = seek_players(self.object_list, self.page_size)
+        context.update({
+            'players': page['players'],
+            'next_cursor': page['next'],
+            'previous_cursor': page['previous'],
+        })
+        return context
+
 
 class DungeonListView(ListView):
     """List view untuk semua dungeons dengan query optimization"""
@@ -132,8 +154,11 @@ class DungeonListView(ListView):
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        """Optimize query dengan select_related dan prefetch_related"""
-        return Dungeon.objects.select_related().prefetch_related('attendances').all()
+        """Optimize query dengan annotate attendance counts (hindari N+1 per row)"""
+        return Dungeon.objects.annotate(
+            attendance_count=Count('attendances'),
+            attended_count=Count('attendances', filter=Q(attendances__attended=True))
+        )
 
 
 class DungeonCreateView(CreateView):
@@ -198,119 +223,97 @@ def attendance_update(request, dungeon_pk):
     dungeon = get_object_or_404(Dungeon, pk=dungeon_pk)
     players = User.objects.filter(role='player')
     
-    # Get atau create attendance untuk setiap player
-    attendances = []
-    for player in players:
-        attendance, created = Attendance.objects.get_or_create(
-            user=player,
-            dungeon=dungeon,
-            defaults={'attended': False, 'participation_exp': 0}
-        )
-        attendances.append(attendance)
+    # Get atau create attendance untuk setiap player (query konstan)
+    players = list(players)
+    Attendance.objects.bulk_create(
+        [Attendance(user=player, dungeon=dungeon, attended=False, participation_exp=0) for player in players],
+        ignore_conflicts=True
+    )
+    attendance_by_user = {
+        attendance.user_id: attendance
+        for attendance in Attendance.objects.filter(dungeon=dungeon, user__in=players).select_related('user')
+    }
+    attendances = [attendance_by_user[player.pk] for player in players if player.pk in attendance_by_user]
     
     if request.method == 'POST':
         try:
             bulk_action = request.POST.get('bulk')
             with transaction.atomic():
-                if bulk_action in ('all', 'none'):
-                    # Bulk mark all attended or none
-                    mark_attended = bulk_action == 'all'
-                    updated = 0
-                    for attendance in attendances:
-                        old_attended = attendance.attended
-                        new_attended = mark_attended
-                        attendance.attended = new_attended
-
-                        if new_attended and not old_attended:
-                            honor_privileges = check_honor_privileges(attendance.user)
-                            if not honor_privileges['can_join_dungeon']:
-                                # skip give EXP but keep attended False
-                                attendance.attended = False
-                                attendance.save()
-                                continue
-                            attendance.participation_exp = dungeon.exp_reward
-                            attendance.save()
-                            add_exp(
-                                user=attendance.user,
-                                amount=dungeon.exp_reward,
-                                activity_type='participation',
-                                description=f"Attended dungeon: {dungeon.name}"
-                            )
-                            updated += 1
-                        elif not new_attended and old_attended:
-                            attendance.participation_exp = 0
-                            attendance.save()
-                            add_exp(
-                                user=attendance.user,
-                                amount=-dungeon.exp_reward,
-                                activity_type='participation',
-                                description=f"Removed attendance for dungeon: {dungeon.name}"
-                            )
-                            updated += 1
-                        else:
-                            attendance.save()
-
-                        if not new_attended:
-                            try:
-                                PunishmentService.check_and_apply_absence_punishment(
-                                    user=attendance.user,
-                                    created_by=request.user
-                                )
-                            except Exception:
-                                import logging
-                                logger = logging.getLogger(__name__)
-                                logger.error('Error checking absence punishment during bulk attendance update')
-                    if mark_attended:
-                        messages.success(request, f'Semua player ditandai hadir (kecuali yang tidak memenuhi honor). Diperbarui: {updated}')
+                updated = 0
+                awards = []
+                absentees = []
+                for attendance in attendances:
+                    old_attended = attendance.attended
+                    if bulk_action in ('all', 'none'):
+                        # Bulk mark all attended or none
+                        new_attended = bulk_action == 'all'
                     else:
-                        messages.success(request, f'Semua player ditandai tidak hadir. Diperbarui: {updated}')
-                    return redirect('admin_dashboard:attendance_update', dungeon_pk=dungeon.pk)
-                else:
-                    # Per-item update (existing behavior)
-                    for attendance in attendances:
-                        old_attended = attendance.attended
+                        # Per-item update (existing behavior)
                         new_attended = request.POST.get(f'attended_{attendance.id}') == 'on'
-                        attendance.attended = new_attended
-                        if new_attended and not old_attended:
-                            honor_privileges = check_honor_privileges(attendance.user)
-                            if not honor_privileges['can_join_dungeon']:
+                    attendance.attended = new_attended
+
+                    if new_attended and not old_attended:
+                        honor_privileges = check_honor_privileges(attendance.user)
+                        if not honor_privileges['can_join_dungeon']:
+                            if bulk_action not in ('all', 'none'):
                                 messages.warning(
                                     request,
                                     f'{attendance.user.username} tidak dapat join dungeon karena honor points terlalu rendah. '
                                     f'Attendance tidak diberikan EXP.'
                                 )
-                                attendance.attended = False
-                                attendance.save()
-                                continue
-                            attendance.participation_exp = dungeon.exp_reward
-                            attendance.save()
-                            add_exp(
-                                user=attendance.user,
-                                amount=dungeon.exp_reward,
-                                activity_type='participation',
-                                description=f"Attended dungeon: {dungeon.name}"
-                            )
-                        elif not new_attended and old_attended:
-                            attendance.participation_exp = 0
-                            attendance.save()
-                            add_exp(
-                                user=attendance.user,
-                                amount=-dungeon.exp_reward,
-                                activity_type='participation',
-                                description=f"Removed attendance for dungeon: {dungeon.name}"
-                            )
-                        else:
-                            attendance.save()
-                        if not new_attended:
-                            try:
-                                PunishmentService.check_and_apply_absence_punishment(
-                                    user=attendance.user,
-                                    created_by=request.user
-                                )
-                            except Exception as e:
-                                import logging
-                                logger = logging.getLogger(__name__)
-                                logger.error(f'Error checking absence punishment: {str(e)}')
+                            # skip give EXP but keep attended False
+                            attendance.attended = False
+                            continue
+                        attendance.participation_exp = dungeon.exp_reward
+                        awards.append((
+                            attendance.user,
+                            dungeon.exp_reward,
+                            'participation',
+                            f"Attended dungeon: {dungeon.name}"
+                        ))
+                        updated += 1
+                    elif not new_attended and old_attended:
+                        attendance.participation_exp = 0
+                        awards.append((
+                            attendance.user,
+                            -dungeon.exp_reward,
+                            'participation',
+                            f"Removed attendance for dungeon: {dungeon.name}"
+                        ))
+                        updated += 1
+
+                    if not new_attended:
+                        absentees.append(attendance.user)
+
+                # Simpan semua attendance sekaligus (bulk_update tidak menjalankan auto_now)
+                now = timezone.now()
+                for attendance in attendances:
+                    attendance.updated_at = now
+                Attendance.objects.bulk_update(attendances, ['attended', 'participation_exp', 'updated_at'])
+                schedule_player_stats_refresh(
+                    [attendance.user_id for attendance in attendances],
+                    STAT_SOURCES[Attendance]
+                )
+
+                # Semua EXP award diproses sekaligus (query konstan)
+                add_exp_bulk(awards)
+
+                try:
+                    PunishmentService.apply_absence_punishments_bulk(
+                        absentees,
+                        created_by=request.user
+                    )
+                except Exception as e:
+                    import logging
+                    logger = logging.getLogger(__name__)
+                    logger.error(f'Error checking absence punishment: {str(e)}')
+
+                if bulk_action in ('all', 'none'):
+                    if bulk_action == 'all':
+                        messages.success(request, f'Semua player ditandai hadir (kecuali yang tidak memenuhi honor). Diperbarui: {updated}')
+                    else:
+                        messages.success(request, f'Semua player ditandai tidak hadir. Diperbarui: {updated}')
+                    return redirect('admin_dashboard:attendance_update', dungeon_pk=dungeon.pk)
             messages.success(request, f'Attendance untuk "{dungeon.name}" berhasil diupdate!')
             return redirect('admin_dashboard:dungeon_list')
         except Exception as e:
@@ -342,8 +345,11 @@ class SidequestListView(ListView):
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        """Optimize query dengan prefetch_related untuk submissions"""
-        return Sidequest.objects.prefetch_related('submissions').all()
+        """Optimize query dengan annotate submission counts (hindari N+1 per row)"""
+        return Sidequest.objects.annotate(
+            submission_count=Count('submissions'),
+            graded_count=Count('submissions', filter=Q(submissions__grade__isnull=False))
+        )
 
 
 class SidequestCreateView(CreateView):
@@ -365,14 +371,11 @@ class SidequestCreateView(CreateView):
         # Send notification to all players if sidequest is active
         if sidequest.status == 'active':
             try:
-                from accounts.models import User
-                players = User.objects.filter(role='player')
-                for player in players:
-                    send_sidequest_notification(
-                        user_id=player.id,
-                        sidequest_title=sidequest.title,
-                        sidequest_id=sidequest.id
-                    )
+                # Satu broadcast ke group player, bukan satu notification per player
+                broadcast_sidequest_notification(
+                    sidequest_title=sidequest.title,
+                    sidequest_id=sidequest.id
+                )
             except Exception as e:
                 # Silently fail if notification system is not available
                 pass
@@ -598,6 +601,10 @@ class BossListView(ListView):
         if not request.user.is_authenticated or not request.user.is_admin():
             return redirect('accounts:login')
         return super().dispatch(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        """Optimize query dengan select_related"""
+        return Boss.objects.select_related('user')
 
 
 class BossCreateView(CreateView):
@@ -863,6 +870,7 @@ def resolve_punishment(request, pk):
                 is_active=True,
                 description__startswith=f"Punishment effect: {punishment.description}"
             ).update(is_active=False)
+            invalidate_exp_multipliers([punishment.user_id])
             
             messages.success(request, f'Punishment untuk {punishment.user.username} berhasil di-resolve!')
             return redirect('admin_dashboard:punishment_list')
@@ -881,6 +889,10 @@ class StatusEffectListView(ListView):
         if not request.user.is_authenticated or not request.user.is_admin():
             return redirect('accounts:login')
         return super().dispatch(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        """Optimize query dengan select_related"""
+        return StatusEffect.objects.select_related('user')
 
 
 # Analytics & Reporting Views
@@ -1012,11 +1024,12 @@ def export_player_progress_csv(request):
         'Boss Battles', 'Punishments', 'Last Activity'
     ])
     
+    # distinct=True karena beberapa join sekaligus menggandakan baris
     players = User.objects.filter(role='player').annotate(
-        dungeons_attended=Count('attendances', filter=Q(attendances__attended=True)),
-        sidequests_submitted=Count('sidequest_submissions'),
-        boss_battles=Count('boss_battles'),
-        punishments_count=Count('punishments'),
+        dungeons_attended=Count('attendances', filter=Q(attendances__attended=True), distinct=True),
+        sidequests_submitted=Count('sidequest_submissions', distinct=True),
+        boss_battles_count=Count('boss_battles', distinct=True),
+        punishments_count=Count('punishments', distinct=True),
         last_activity=Max('exp_logs__created_at')
     )
     
@@ -1030,7 +1043,7 @@ def export_player_progress_csv(request):
             player.honor_points,
             player.dungeons_attended or 0,
             player.sidequests_submitted or 0,
-            player.boss_battles or 0,
+            player.boss_battles_count or 0,
             player.punishments_count or 0,
             player.last_activity.strftime('%Y-%m-%d %H:%M:%S') if player.last_activity else ''
         ])
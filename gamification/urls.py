@@ -10,6 +10,7 @@ urlpatterns = [
     path('exp-history/', views.exp_history, name='exp_history'),
     path('punishment-history/', views.punishment_history, name='punishment_history'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard/data/', views.leaderboard_data, name='leaderboard_data'),
     # AJAX endpoints
     path('ajax/stats/', views.ajax_user_stats, name='ajax_stats'),
     path('ajax/activities/', views.ajax_recent_activities, name='ajax_activities'),
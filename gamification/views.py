@@ -1,15 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
-from django.db.models.functions import TruncDate
+from django.db.models import Sum, F
 from django.http import JsonResponse
+from django.views.decorators.http import condition
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import User
-from core.models import ExpLog, Level, Punishment, StatusEffect, Dungeon, Attendance, SidequestSubmission, Boss
+from core.models import ExpLog, ExpDailyRollup, LeaderboardScore, LevelUpEvent, Punishment, StatusEffect
 from core.services import check_honor_privileges
+from core.notifications import build_player_stats, serialize_activity
+from core.player_state import player_state_etag
+from core.levels import get_level_curve
+from core.stats import get_player_stats
+from core.archive import ExpLogHistory
+from core.boards import MAIN_BOARD, get_board_rank, get_board_rows, parse_board
+from core.leaderboard import USER_FIELDS, LeaderboardEntry
+from core.ranking import encode_cursor, get_rank, get_ranked_players, get_top_players, seek_players
 from core.services import PLAGIARISM_RULES, CHEATING_RULES, ABSENCE_RULES
 
+# Leaderboard page: jumlah top players dan radius window di sekitar user
+LEADERBOARD_TOP = 10
+LEADERBOARD_RADIUS = 5
+
 
 @login_required
 def player_dashboard(request):
@@ -19,36 +31,24 @@ def player_dashboard(request):
     
     user = request.user
     
-    # Get current level info
-    try:
-        current_level_obj = Level.objects.get(level=user.current_level)
-        next_level_obj = Level.objects.filter(level__gt=user.current_level).order_by('level').first()
-        
-        if next_level_obj:
-            exp_for_current_level = current_level_obj.exp_required
-            exp_for_next_level = next_level_obj.exp_required
-            exp_needed = exp_for_next_level - user.total_exp
-            exp_progress = ((user.total_exp - exp_for_current_level) / (exp_for_next_level - exp_for_current_level) * 100) if (exp_for_next_level - exp_for_current_level) > 0 else 0
-        else:
-            exp_for_current_level = current_level_obj.exp_required
-            exp_for_next_level = user.total_exp
-            exp_needed = 0
-            exp_progress = 100
-    except Level.DoesNotExist:
-        exp_for_current_level = 0
-        exp_for_next_level = 1000
-        exp_needed = 1000 - user.total_exp
-        exp_progress = (user.total_exp / 1000 * 100) if 1000 > 0 else 0
-    
-    # Get statistics
-    total_exp_earned = ExpLog.objects.filter(user=user, exp_earned__gt=0).aggregate(Sum('exp_earned'))['exp_earned__sum'] or 0
-    total_exp_lost = abs(ExpLog.objects.filter(user=user, exp_earned__lt=0).aggregate(Sum('exp_earned'))['exp_earned__sum'] or 0)
+    # Get current level info (compiled level curve, tanpa query)
+    progress = get_level_curve().progress(user.total_exp, user.current_level)
+    exp_for_current_level = progress['exp_for_current_level']
+    exp_for_next_level = progress['exp_for_next_level']
+    exp_needed = progress['exp_needed']
+    exp_progress = progress['exp_progress']
+    
+    # Get statistics (lifetime counters + daily rollup, bukan full scan ExpLog)
+    stats = get_player_stats(user)
+    total_exp_earned = stats.exp_earned
+    total_exp_lost = stats.exp_lost
+    rollups = ExpDailyRollup.objects.filter(user=user)
     
     # Activity distribution
-    activity_stats = ExpLog.objects.filter(user=user).values('activity_type').annotate(
-        total=Sum('exp_earned'),
-        count=Count('id')
-    ).order_by('-total')
+    activity_stats = list(rollups.values('activity_type').annotate(
+        total=Sum(F('exp_earned') - F('exp_lost')),
+        count=Sum('log_count')
+    ).order_by('-total'))
     
     # Recent activities (last 10)
     recent_activities = ExpLog.objects.filter(user=user).order_by('-created_at')[:10]
@@ -63,11 +63,7 @@ def player_dashboard(request):
     honor_privileges = check_honor_privileges(user)
     
     # Recent achievements (level ups)
-    recent_level_ups = ExpLog.objects.filter(
-        user=user,
-        activity_type='bonus',
-        description__icontains='Level Up'
-    ).order_by('-created_at')[:5]
+    recent_level_ups = LevelUpEvent.objects.filter(user=user).order_by('-created_at')[:5]
     
     # Stats for charts
     # EXP growth (last 30 days)
@@ -76,14 +72,9 @@ def player_dashboard(request):
     start_date = today - timedelta(days=29)  # 30 hari termasuk hari ini
 
     raw_growth = (
-        ExpLog.objects.filter(
-            user=user,
-            created_at__date__gte=start_date,
-            exp_earned__gt=0  # hanya exp positif
-        )
-        .annotate(day=TruncDate('created_at'))
+        rollups.filter(day__gte=start_date)
         .values('day')
-        .annotate(total_exp=Sum('exp_earned'))
+        .annotate(total_exp=Sum('exp_earned'))  # hanya exp positif
         .order_by('day')
     )
 
@@ -99,14 +90,9 @@ def player_dashboard(request):
             'total_exp': day_to_total.get(key, 0)
         })
     
-    # Activity distribution
-    activity_distribution = ExpLog.objects.filter(user=user).values('activity_type').annotate(
-        count=Count('id')
-    )
-    
-    # Format untuk Chart.js
+    # Format untuk Chart.js (activity distribution)
     activity_chart_data = []
-    for item in activity_distribution:
+    for item in activity_stats:
         activity_chart_data.append({
             'activity_type': item['activity_type'],
             'count': item['count']
@@ -141,13 +127,14 @@ def player_profile(request):
     
     user = request.user
     
-    # Get all statistics
-    total_dungeons_attended = Attendance.objects.filter(user=user, attended=True).count()
-    total_sidequests_submitted = SidequestSubmission.objects.filter(user=user).count()
-    total_sidequests_graded = SidequestSubmission.objects.filter(user=user, grade__isnull=False).count()
-    total_boss_battles = Boss.objects.filter(user=user).count()
-    total_punishments = Punishment.objects.filter(user=user).count()
-    resolved_punishments = Punishment.objects.filter(user=user, resolved=True).count()
+    # Get all statistics (lifetime counters, satu row)
+    stats = get_player_stats(user)
+    total_dungeons_attended = stats.dungeons_attended
+    total_sidequests_submitted = stats.sidequests_submitted
+    total_sidequests_graded = stats.sidequests_graded
+    total_boss_battles = stats.boss_battles
+    total_punishments = stats.punishments
+    resolved_punishments = stats.resolved_punishments
     
     # Calculate achievements (simple achievements based on stats)
     achievements = []
@@ -193,13 +180,11 @@ def exp_history(request):
     
     user = request.user
     
-    # Get all EXP logs (optimized query)
-    exp_logs = ExpLog.objects.filter(user=user).select_related('user').order_by('-created_at')
-    
     # Filter by activity type if provided
     activity_type = request.GET.get('activity_type', '')
-    if activity_type:
-        exp_logs = exp_logs.filter(activity_type=activity_type)
+    
+    # Hot table ExpLog, lalu log yang sudah diarsip (dibaca hanya untuk halaman lama)
+    exp_logs = ExpLogHistory(user, activity_type)
     
     # Pagination (optional, bisa ditambahkan)
     from django.core.paginator import Paginator
@@ -245,41 +230,102 @@ def punishment_history(request):
 
 @login_required
 def leaderboard(request):
-    """Leaderboard untuk semua players dengan query optimization dan caching"""
+    """
+    Leaderboard: top players + window di sekitar user saat ini
+    Sisa leaderboard utama dimuat lewat leaderboard_data (keyset pagination)
+    
+    Query params:
+        period: 'week', 'month' atau 'all' (default)
+        activity: activity_type untuk board per activity (kosong = semua activity)
+    """
     if request.user.is_admin():
         return redirect('admin_dashboard:dashboard')
     
-    # Get leaderboard with caching (5 minutes cache)
-    from core.utils import get_or_set_cache
-    
-    def get_leaderboard_data():
-        return list(User.objects.filter(role='player').only(
-            'username', 'current_level', 'total_exp', 'honor_points', 'id'
-        ).order_by('-current_level', '-total_exp', '-honor_points'))
-    
-    players = get_or_set_cache('leaderboard_all_players', get_leaderboard_data, timeout=300)
-    
-    # Get current user's rank
-    user_rank = None
-    for idx, player in enumerate(players, start=1):
-        if player.id == request.user.id:
-            user_rank = idx
-            break
+    board = parse_board(request.GET.get('period'), request.GET.get('activity'))
+    is_main_board = board == MAIN_BOARD
+    
+    # Top players, rank user dan window di sekitarnya dibaca dari rank tersimpan yang sama
+    # (PlayerRank / LeaderboardScore.rank), jadi tidak ada player yang muncul dua kali
+    # atau terlewat di antara kedua list (lookup lewat index, tanpa scan)
+    def ranked_rows(first_rank, last_rank):
+        if is_main_board:
+            return get_ranked_players(first_rank, last_rank)
+        return [LeaderboardEntry(*row) for row in get_board_rows(board, first_rank, last_rank, fields=USER_FIELDS)]
+    
+    top_players = get_top_players(LEADERBOARD_TOP) if is_main_board else ranked_rows(1, LEADERBOARD_TOP)
+    user_rank = get_rank(request.user) if is_main_board else get_board_rank(request.user, board)
+    
+    # ±LEADERBOARD_RADIUS player di sekitar user (jika user di luar top)
+    around_players = []
+    if user_rank and user_rank > LEADERBOARD_TOP:
+        around_players = ranked_rows(
+            max(user_rank - LEADERBOARD_RADIUS, LEADERBOARD_TOP + 1),
+            user_rank + LEADERBOARD_RADIUS
+        )
     
-    # Top 10 players
-    top_players = players[:10]
+    next_cursor = None
+    if is_main_board and len(top_players) == LEADERBOARD_TOP:
+        next_cursor = encode_cursor(top_players[-1])
     
     context = {
-        'players': players,
         'top_players': top_players,
+        'around_players': around_players,
         'user_rank': user_rank,
         'current_user': request.user,
+        'next_cursor': next_cursor,
+        'leaderboard_top': LEADERBOARD_TOP,
+        'period': board[0],
+        'activity': board[1],
+        'show_score': not is_main_board,
+        'periods': LeaderboardScore.PERIODS,
+        'activity_types': ExpLog.ACTIVITY_TYPES,
     }
     
     return render(request, 'player/leaderboard.html', context)
 
 
+@login_required
+def leaderboard_data(request):
+    """
+    JSON leaderboard untuk infinite scroll (keyset pagination)
+    
+    Query params:
+        after: Cursor dari response sebelumnya ('next'), kosong = dari rank 1
+        limit: Jumlah player (default 20, maksimal 100)
+    """
+    try:
+        limit = max(1, min(100, int(request.GET.get('limit', '20'))))
+    except ValueError:
+        limit = 20
+    
+    players = User.objects.filter(role='player').annotate(rank=F('ranking__rank')).only(
+        'username', 'current_level', 'current_exp', 'total_exp', 'honor_points'
+    )
+    try:
+        page = seek_players(players, limit, after=request.GET.get('after') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Cursor tidak valid'}, status=400)
+    
+    return JsonResponse({
+        'players': [
+            {
+                'rank': player.rank,
+                'username': player.username,
+                'level': player.current_level,
+                'current_exp': player.current_exp,
+                'total_exp': player.total_exp,
+                'honor_points': player.honor_points,
+                'is_current_user': player.pk == request.user.pk,
+            }
+            for player in page['players']
+        ],
+        'next': page['next'],
+    })
+
+
 # AJAX Views untuk real-time updates
+# ETag = state version player; If-None-Match yang cocok dijawab 304 setelah satu lookup PlayerStats
+@condition(etag_func=player_state_etag)
 @login_required
 def ajax_user_stats(request):
     """AJAX endpoint untuk mendapatkan user stats real-time"""
@@ -289,57 +335,27 @@ def ajax_user_stats(request):
     user = request.user
     user.refresh_from_db()  # Refresh dari database
     
-    # Get current level info
-    try:
-        current_level_obj = Level.objects.get(level=user.current_level)
-        next_level_obj = Level.objects.filter(level__gt=user.current_level).order_by('level').first()
-        
-        if next_level_obj:
-            exp_for_current_level = current_level_obj.exp_required
-            exp_for_next_level = next_level_obj.exp_required
-            exp_needed = exp_for_next_level - user.total_exp
-            exp_progress = ((user.total_exp - exp_for_current_level) / (exp_for_next_level - exp_for_current_level) * 100) if (exp_for_next_level - exp_for_current_level) > 0 else 0
-        else:
-            exp_for_current_level = current_level_obj.exp_required
-            exp_for_next_level = user.total_exp
-            exp_needed = 0
-            exp_progress = 100
-    except Level.DoesNotExist:
-        exp_for_current_level = 0
-        exp_for_next_level = 1000
-        exp_needed = 1000 - user.total_exp
-        exp_progress = (user.total_exp / 1000 * 100) if 1000 > 0 else 0
-    
     # Check for new level ups
-    recent_level_up = ExpLog.objects.filter(
+    recent_level_up = LevelUpEvent.objects.filter(
         user=user,
-        activity_type='bonus',
-        description__icontains='Level Up',
         created_at__gte=timezone.now() - timedelta(seconds=5)
-    ).first()
+    ).order_by('-created_at').first()
     
     level_up_info = None
     if recent_level_up:
         level_up_info = {
             'message': recent_level_up.description,
-            'new_level': user.current_level,
+            'new_level': recent_level_up.new_level,
         }
     
-    # Get honor privileges
-    honor_privileges = check_honor_privileges(user)
-    
+    # Format stats sama dengan push player_update via WebSocket
     return JsonResponse({
-        'current_exp': user.current_exp,
-        'total_exp': user.total_exp,
-        'current_level': user.current_level,
-        'honor_points': user.honor_points,
-        'exp_progress': round(exp_progress, 2),
-        'exp_needed': exp_needed,
+        **build_player_stats(user),
         'level_up': level_up_info,
-        'honor_tier': honor_privileges['honor_tier'],
     })
 
 
+@condition(etag_func=player_state_etag)
 @login_required
 def ajax_recent_activities(request):
     """AJAX endpoint untuk mendapatkan recent activities"""
@@ -351,18 +367,8 @@ def ajax_recent_activities(request):
     # Get last 5 activities
     recent_activities = ExpLog.objects.filter(user=user).order_by('-created_at')[:5]
     
-    activities_data = []
-    for activity in recent_activities:
-        activities_data.append({
-            'id': activity.id,
-            'activity_type': activity.get_activity_type_display(),
-            'exp_earned': activity.exp_earned,
-            'description': activity.description,
-            'created_at': activity.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        })
-    
     return JsonResponse({
-        'activities': activities_data,
+        'activities': [serialize_activity(activity) for activity in recent_activities],
     })
 
 
@@ -374,9 +380,12 @@ def exp_summary(request):
     
     user = request.user
     logs = ExpLog.objects.filter(user=user, exp_earned__gt=0).order_by('-created_at')
-    total_earned = logs.aggregate(Sum('exp_earned'))['exp_earned__sum'] or 0
-    by_activity = logs.values('activity_type').annotate(total=Sum('exp_earned'), count=Count('id')).order_by('-total')
-    levels = Level.objects.all().order_by('level')
+    rollups = ExpDailyRollup.objects.filter(user=user, earned_count__gt=0)
+    total_earned = get_player_stats(user).exp_earned
+    by_activity = rollups.values('activity_type').annotate(
+        total=Sum('exp_earned'), count=Sum('earned_count')
+    ).order_by('-total')
+    levels = get_level_curve().table()
     
     context = {
         'user': user,
@@ -395,7 +404,7 @@ def exp_lost(request):
     
     user = request.user
     logs = ExpLog.objects.filter(user=user, exp_earned__lt=0).order_by('-created_at')
-    total_lost = abs(logs.aggregate(Sum('exp_earned'))['exp_earned__sum'] or 0)
+    total_lost = get_player_stats(user).exp_lost
     
     context = {
         'user': user,
@@ -411,7 +420,7 @@ def honor_history(request):
         return redirect('admin_dashboard:dashboard')
     
     user = request.user
-    level_up_logs = ExpLog.objects.filter(user=user, activity_type='bonus', description__icontains='Level Up').order_by('-created_at')
+    level_up_logs = LevelUpEvent.objects.filter(user=user).order_by('-created_at')
     punishments = Punishment.objects.filter(user=user).order_by('-created_at')
     inferred = []
     for p in punishments:
@@ -1,65 +1,153 @@
 /**
  * WebSocket client untuk real-time features
+ *
+ * Semua stream (notifications, stats, leaderboard, presence) memakai satu koneksi
+ * ke /ws/stream/. Client subscribe per stream dan server membungkus setiap pesan
+ * dengan {stream, payload}.
  */
-
 class WebSocketClient {
     constructor(userId) {
         this.userId = userId;
-        this.notificationSocket = null;
-        this.leaderboardSocket = null;
-        this.onlineStatusSocket = null;
+        this.socket = null;
+        // Stream yang di-subscribe (nama -> params); dikirim ulang setiap reconnect
+        this.streams = new Map();
         this.notificationQueue = [];
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
+        // Seq notification terakhir yang diterima (untuk catch-up setelah reconnect)
+        this.notificationSeqKey = `notificationSeq_${userId}`;
+        this.lastNotificationSeq = parseInt(localStorage.getItem(this.notificationSeqKey), 10) || null;
     }
 
-    // Initialize notification WebSocket
-    initNotificationSocket() {
+    // Open the multiplexed WebSocket
+    connect() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws/notifications/${this.userId}/`;
+        const wsUrl = `${protocol}//${window.location.host}/ws/stream/`;
         
-        this.notificationSocket = new WebSocket(wsUrl);
+        this.socket = new WebSocket(wsUrl);
         
-        this.notificationSocket.onopen = () => {
-            console.log('Notification WebSocket connected');
+        this.socket.onopen = () => {
+            console.log('WebSocket connected');
             this.reconnectAttempts = 0;
+            this.streams.forEach((params, stream) => this.sendSubscribe(stream, params));
+            if (this.streams.has('presence')) {
+                this.startPresenceHeartbeat();
+            }
             // Process queued notifications
             this.processNotificationQueue();
         };
         
-        this.notificationSocket.onmessage = (event) => {
+        this.socket.onmessage = (event) => {
             const data = JSON.parse(event.data);
-            this.handleNotification(data);
+            if (data.type === 'error') {
+                console.error('WebSocket error:', data.message);
+                return;
+            }
+            const handler = {
+                notifications: message => this.handleNotification(message),
+                stats: message => this.handleNotification(message),
+                leaderboard: message => this.handleLeaderboard(message),
+                presence: message => this.handlePresence(message)
+            }[data.stream];
+            if (handler) handler(data.payload);
         };
         
-        this.notificationSocket.onerror = (error) => {
-            console.error('Notification WebSocket error:', error);
+        this.socket.onerror = (error) => {
+            console.error('WebSocket error:', error);
         };
         
-        this.notificationSocket.onclose = () => {
-            console.log('Notification WebSocket disconnected');
+        this.socket.onclose = () => {
+            console.log('WebSocket disconnected');
+            clearInterval(this.presenceHeartbeat);
             // Attempt to reconnect
-            this.reconnectNotificationSocket();
+            this.reconnect();
         };
     }
 
-    // Reconnect notification socket
-    reconnectNotificationSocket() {
+    // Reconnect socket (stream di-subscribe ulang di onopen)
+    reconnect() {
+        if (this.closing) return;
         if (this.reconnectAttempts < this.maxReconnectAttempts) {
             this.reconnectAttempts++;
             setTimeout(() => {
-                console.log(`Reconnecting notification socket (attempt ${this.reconnectAttempts})...`);
-                this.initNotificationSocket();
+                console.log(`Reconnecting WebSocket (attempt ${this.reconnectAttempts})...`);
+                this.connect();
             }, 3000 * this.reconnectAttempts);
         }
     }
 
+    isOpen() {
+        return this.socket && this.socket.readyState === WebSocket.OPEN;
+    }
+
+    // Subscribe stream; dikirim sekarang jika socket sudah terbuka, atau saat onopen
+    subscribe(stream, params = {}) {
+        this.streams.set(stream, params);
+        if (this.isOpen()) {
+            this.sendSubscribe(stream, params);
+        }
+    }
+
+    sendSubscribe(stream, params) {
+        const message = { action: 'subscribe', stream, ...params };
+        if (stream === 'notifications' && this.lastNotificationSeq) {
+            // Catch-up notification yang terlewat selama socket terputus
+            message.after = this.lastNotificationSeq;
+        }
+        this.socket.send(JSON.stringify(message));
+    }
+
+    // Kirim action ke stream tertentu
+    sendToStream(stream, action, fields = {}) {
+        if (this.isOpen()) {
+            this.socket.send(JSON.stringify({ stream, action, ...fields }));
+        }
+    }
+
     // Handle notification message
     handleNotification(data) {
         if (data.type === 'notification') {
+            this.rememberNotificationSeq(data.seq);
             this.showNotification(data);
+        } else if (data.type === 'notifications_missed') {
+            // Notification yang terkirim selama socket terputus
+            data.notifications.forEach(notification => {
+                this.rememberNotificationSeq(notification.seq);
+                this.showNotification(notification);
+            });
+            this.updateUnreadCount(data.unread);
+        } else if (data.type === 'unread') {
+            this.updateUnreadCount(data.count);
+        } else if (data.type === 'player_update') {
+            // Stats/activities terbaru dari server (dashboard player)
+            if (typeof window.applyPlayerUpdate === 'function') {
+                window.applyPlayerUpdate(data);
+            }
         } else if (data.type === 'connection') {
             console.log('Connected to notification service');
+            this.updateUnreadCount(data.unread);
+        }
+    }
+
+    rememberNotificationSeq(seq) {
+        if (seq && (!this.lastNotificationSeq || seq > this.lastNotificationSeq)) {
+            this.lastNotificationSeq = seq;
+            localStorage.setItem(this.notificationSeqKey, seq);
+        }
+    }
+
+    updateUnreadCount(count) {
+        const badge = document.getElementById('notification-unread-count');
+        if (badge && count !== undefined) {
+            badge.textContent = count;
+            badge.style.display = count ? '' : 'none';
+        }
+    }
+
+    // Tandai semua notification sampai seq terakhir sudah dibaca
+    markNotificationsRead() {
+        if (this.lastNotificationSeq) {
+            this.sendToStream('notifications', 'mark_read', { up_to: this.lastNotificationSeq });
         }
     }
 
@@ -82,6 +170,7 @@ class WebSocketClient {
             <p class="mb-0">${message}</p>
             <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
         `;
+        notification.querySelector('.btn-close').addEventListener('click', () => this.markNotificationsRead());
         
         document.body.appendChild(notification);
         
@@ -188,82 +277,122 @@ class WebSocketClient {
         }
     }
 
-    // Initialize leaderboard WebSocket
-    initLeaderboardSocket() {
-        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws/leaderboard/`;
+    // Subscribe leaderboard stream (board dari data-period/data-activity tabel)
+    subscribeLeaderboard() {
+        const table = document.getElementById('leaderboard-table');
+        const params = {};
+        if (table && table.dataset.period) params.period = table.dataset.period;
+        if (table && table.dataset.activity) params.activity = table.dataset.activity;
         
-        this.leaderboardSocket = new WebSocket(wsUrl);
+        // Row per player id + seq terakhir yang sudah diterapkan
+        this.leaderboardRows = new Map();
+        this.leaderboardSeq = null;
         
-        this.leaderboardSocket.onopen = () => {
-            console.log('Leaderboard WebSocket connected');
-        };
-        
-        this.leaderboardSocket.onmessage = (event) => {
-            const data = JSON.parse(event.data);
-            if (data.type === 'leaderboard_update') {
-                this.updateLeaderboard(data.data);
-            }
-        };
-        
-        this.leaderboardSocket.onerror = (error) => {
-            console.error('Leaderboard WebSocket error:', error);
-        };
-        
-        this.leaderboardSocket.onclose = () => {
-            console.log('Leaderboard WebSocket disconnected');
-        };
+        this.subscribe('leaderboard', params);
     }
 
-    // Update leaderboard display
-    updateLeaderboard(leaderboardData) {
-        const leaderboardTable = document.querySelector('#leaderboard-table tbody');
+    handleLeaderboard(data) {
+        if (data.type === 'leaderboard_snapshot') {
+            this.leaderboardRows = new Map(data.data.map(row => [row.id, row]));
+            this.leaderboardSeq = data.seq;
+            this.updateLeaderboard();
+        } else if (data.type === 'leaderboard_delta') {
+            this.applyLeaderboardDelta(data);
+        }
+    }
+
+    // Apply delta; minta snapshot baru jika ada message yang terlewat
+    applyLeaderboardDelta(delta) {
+        if (this.leaderboardSeq === null || delta.seq <= this.leaderboardSeq) return;
+        if (delta.seq !== this.leaderboardSeq + 1) {
+            this.leaderboardSeq = null;
+            this.sendToStream('leaderboard', 'resync');
+            return;
+        }
+        delta.remove.forEach(id => this.leaderboardRows.delete(id));
+        delta.upsert.forEach(row => this.leaderboardRows.set(row.id, row));
+        this.leaderboardSeq = delta.seq;
+        this.updateLeaderboard();
+    }
+
+    // Update leaderboard display (baris top players saja; baris hasil infinite scroll dibiarkan)
+    updateLeaderboard() {
+        const leaderboardTable = document.getElementById('leaderboard-table');
         if (!leaderboardTable) return;
         
-        leaderboardTable.innerHTML = '';
+        const liveRows = Number(leaderboardTable.dataset.liveTop || 0);
+        const players = [...this.leaderboardRows.values()]
+            .sort((a, b) => a.rank - b.rank)
+            .slice(0, liveRows);
+        const showScore = leaderboardTable.dataset.showScore === 'true';
         
-        leaderboardData.forEach(player => {
+        Array.from(leaderboardTable.rows).slice(0, liveRows).forEach(row => row.remove());
+        
+        const fragment = document.createDocumentFragment();
+        players.forEach(player => {
             const row = document.createElement('tr');
+            if (player.id === this.userId) row.className = 'current-user-row';
+            const rank = player.rank <= 3
+                ? `<span class="rank-badge rank-${player.rank}">${player.rank}</span>`
+                : `<span class="badge bg-secondary">#${player.rank}</span>`;
             row.innerHTML = `
-                <td><span class="badge bg-secondary">#${player.rank}</span></td>
-                <td><strong>${player.username}</strong></td>
+                <td>${rank}</td>
+                <td><strong></strong>${player.id === this.userId ? ' <span class="badge bg-primary">You</span>' : ''}</td>
                 <td><span class="badge bg-info">Level ${player.level}</span></td>
                 <td><strong>${player.total_exp}</strong></td>
-                <td>${player.honor_points}</td>
+                <td>${player.current_exp}</td>
+                <td><span class="badge bg-${player.honor_points ? 'success' : 'warning'}">${player.honor_points}</span></td>
+                ${showScore ? `<td><strong>${player.score}</strong></td>` : ''}
             `;
-            leaderboardTable.appendChild(row);
+            row.querySelector('strong').textContent = player.username;
+            fragment.appendChild(row);
         });
+        leaderboardTable.insertBefore(fragment, leaderboardTable.firstChild);
     }
 
-    // Initialize online status WebSocket
-    initOnlineStatusSocket() {
-        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws/online-status/`;
-        
-        this.onlineStatusSocket = new WebSocket(wsUrl);
-        
-        this.onlineStatusSocket.onopen = () => {
-            console.log('Online status WebSocket connected');
-            // Request online users list
-            this.onlineStatusSocket.send(JSON.stringify({ action: 'get_online_users' }));
-        };
-        
-        this.onlineStatusSocket.onmessage = (event) => {
-            const data = JSON.parse(event.data);
-            if (data.type === 'online_users') {
-                this.updateOnlineUsers(data.users);
-            } else if (data.type === 'user_status') {
-                this.updateUserStatus(data.user_id, data.username, data.status);
-            }
-        };
-        
-        this.onlineStatusSocket.onerror = (error) => {
-            console.error('Online status WebSocket error:', error);
-        };
-        
-        this.onlineStatusSocket.onclose = () => {
-            console.log('Online status WebSocket disconnected');
-        };
+    // Subscribe presence stream (snapshot online users dikirim server saat subscribe)
+    subscribePresence() {
+        this.subscribe('presence');
+        if (this.isOpen()) {
+            this.startPresenceHeartbeat();
+        }
+    }
+
+    // Heartbeat supaya presence tidak expire (PRESENCE_TIMEOUT di server, default 90 detik)
+    startPresenceHeartbeat() {
+        clearInterval(this.presenceHeartbeat);
+        this.presenceHeartbeat = setInterval(() => this.sendToStream('presence', 'heartbeat'), 30000);
+    }
+
+    handlePresence(data) {
+        if (data.type === 'online_users') {
+            this.onlineUsers = new Map(data.users.map(user => [user.id, user]));
+            this.presenceSeq = data.seq;
+            this.updateOnlineUsers(data.users);
+        } else if (data.type === 'presence_diff') {
+            this.applyPresenceDiff(data);
+        }
+    }
+
+    // Terapkan diff presence (joined + left); seq yang melompat berarti ada diff yang terlewat
+    applyPresenceDiff(diff) {
+        if (!this.onlineUsers || diff.seq !== this.presenceSeq + 1) {
+            this.sendToStream('presence', 'get_online_users');
+            return;
+        }
+        this.presenceSeq = diff.seq;
+        diff.joined.forEach(user => {
+            this.onlineUsers.set(user.id, user);
+            this.updateUserStatus(user.id, user.username, 'online');
+        });
+        diff.left.forEach(userId => {
+            const user = this.onlineUsers.get(userId);
+            this.onlineUsers.delete(userId);
+            this.updateUserStatus(userId, user ? user.username : '', 'offline');
+        });
+        const users = Array.from(this.onlineUsers.values());
+        users.sort((a, b) => a.username.localeCompare(b.username));
+        this.updateOnlineUsers(users);
     }
 
     // Update online users display
@@ -306,33 +435,32 @@ class WebSocketClient {
         }
     }
 
-    // Initialize all WebSocket connections
+    // Initialize WebSocket connection and streams
     init() {
         if (this.userId) {
-            this.initNotificationSocket();
+            this.subscribe('notifications');
+            this.subscribe('stats');
         }
         
-        // Only init leaderboard socket on leaderboard page
+        // Only subscribe leaderboard on leaderboard page
         if (window.location.pathname.includes('leaderboard')) {
-            this.initLeaderboardSocket();
+            this.subscribeLeaderboard();
         }
         
-        // Only init online status socket if element exists
+        // Only subscribe online status if element exists
         if (document.getElementById('online-users-list')) {
-            this.initOnlineStatusSocket();
+            this.subscribePresence();
         }
+        
+        this.connect();
     }
 
-    // Disconnect all sockets
+    // Disconnect socket
     disconnect() {
-        if (this.notificationSocket) {
-            this.notificationSocket.close();
-        }
-        if (this.leaderboardSocket) {
-            this.leaderboardSocket.close();
-        }
-        if (this.onlineStatusSocket) {
-            this.onlineStatusSocket.close();
+        this.closing = true;
+        clearInterval(this.presenceHeartbeat);
+        if (this.socket) {
+            this.socket.close();
         }
     }
 }